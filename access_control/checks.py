@@ -0,0 +1,118 @@
+# access_control/checks.py
+from django.contrib.auth import get_user_model
+from rest_framework.exceptions import AuthenticationFailed
+
+from accounts.authentication import JWTAuthentication
+from accounts.cache import get_auth_version, token_cache
+from accounts.models import AuthToken
+from em_auth.db_router import filter_with_primary_fallback
+
+from .matrix import ACTION_FLAGS, FLAG_BITS, permission_matrix
+from .utils import get_role_id
+
+User = get_user_model()
+
+
+def resolve_checks(request_user, checks):
+    """
+    Пакетная проверка прав для POST /api/access/check/.
+
+    checks — список dict c ключами element, action и необязательными
+    user_id / token (без них проверяется сам вызывающий пользователь).
+
+    Число запросов к БД не зависит от длины списка: все токены и все
+    пользователи загружаются двумя запросами, правила берутся из матрицы.
+    Если чтения идут в реплику, не найденные в ней токены и пользователи
+    (отставание репликации) дочитываются ещё одним запросом из основной БД.
+    """
+    authenticator = JWTAuthentication()
+
+    # 1. Разбираем токены (без БД)
+    payloads = {}
+    token_errors = {}
+    for check in checks:
+        raw_token = check.get("token")
+        if raw_token and raw_token not in payloads and raw_token not in token_errors:
+            try:
+                payloads[raw_token] = authenticator.decode_token(raw_token)
+            except AuthenticationFailed as exc:
+                token_errors[raw_token] = str(exc.detail)
+
+    # 2. Записи AuthToken — одним запросом (мимо кэша только промахи)
+    token_objs = {}
+    missing_jtis = {}  # jti -> версия пользователя до загрузки из БД
+    for payload in payloads.values():
+        if payload.get("stateless"):
+            continue
+        token_obj = token_cache.get_token(payload["jti"])
+        if token_obj is None:
+            missing_jtis[payload["jti"]] = get_auth_version(payload["sub"])
+        else:
+            token_objs[payload["jti"]] = token_obj
+    if missing_jtis:
+        queryset = AuthToken.objects.select_related("user__user_role")
+        for token_obj in filter_with_primary_fallback(queryset, "jti", missing_jtis):
+            token_cache.put_token(token_obj, missing_jtis.get(str(token_obj.jti)))
+            token_objs[str(token_obj.jti)] = token_obj
+
+    # 3. Пользователи по user_id и по stateless-токенам — одним запросом
+    user_ids = {str(check["user_id"]) for check in checks if check.get("user_id") is not None}
+    user_ids.update(str(p["sub"]) for p in payloads.values() if p.get("stateless"))
+    users = {}
+    if user_ids:
+        users = {
+            str(user.pk): user
+            for user in filter_with_primary_fallback(User.objects.select_related("user_role"), "pk", user_ids)
+        }
+
+    # 4. Итоговые пользователи для токенов
+    token_users = {}
+    for raw_token, payload in payloads.items():
+        try:
+            if payload.get("stateless"):
+                user = users.get(str(payload["sub"]))
+                if user is None:
+                    raise authenticator.fail("not_found", "Пользователь не найден")
+                token_users[raw_token], _ = authenticator.check_stateless(user, payload)
+            else:
+                token_obj = token_objs.get(payload["jti"])
+                if token_obj is None:
+                    raise authenticator.fail("not_found", "Токен не найден или отозван")
+                token_users[raw_token], _ = authenticator.check_token(token_obj)
+        except AuthenticationFailed as exc:
+            token_errors[raw_token] = str(exc.detail)
+
+    # 5. Решения по матрице
+    results = []
+    for check in checks:
+        result = {"element": check["element"], "action": check["action"]}
+
+        if check.get("token"):
+            user = token_users.get(check["token"])
+            error = token_errors.get(check["token"])
+        elif check.get("user_id") is not None:
+            user = users.get(str(check["user_id"]))
+            error = None if user is not None else "Пользователь не найден"
+        else:
+            user, error = request_user, None
+
+        if user is not None and not user.is_active:
+            user, error = None, "Пользователь деактивирован"
+
+        if user is None:
+            result.update({"user_id": None, "allowed": False, "own": False, "all": False, "error": error})
+            results.append(result)
+            continue
+
+        own_flag, all_flag = ACTION_FLAGS[check["action"]]
+        role_id = get_role_id(user)
+        mask = 0
+        if role_id is not None:
+            mask = permission_matrix.get_role_masks(role_id).get(check["element"], 0)
+        own = bool(mask & FLAG_BITS[own_flag])
+        all_ = bool(mask & FLAG_BITS[all_flag])
+
+        result.update({"user_id": user.pk, "allowed": own or all_, "own": own, "all": all_})
+        results.append(result)
+
+    return results
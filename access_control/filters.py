@@ -0,0 +1,56 @@
+# access_control/filters.py
+from rest_framework.filters import BaseFilterBackend
+
+from .matrix import ACTION_FLAGS
+from .utils import get_request_rule
+
+METHOD_ACTIONS = {
+    "GET": "read",
+    "HEAD": "read",
+    "POST": "create",
+    "PUT": "update",
+    "PATCH": "update",
+    "DELETE": "delete",
+}
+
+
+def scope_queryset(queryset, user, rule, action: str, owner_field: str = "owner"):
+    """
+    Переводит флаги правила в условие WHERE:
+    - *_all_permission — весь queryset;
+    - только *_permission — объекты, где owner_field = пользователь;
+    - ничего — пустой queryset.
+
+    Фильтрация идёт в БД, так что результат можно сразу отдать
+    в .values(), .update() или .delete() одним SQL-запросом.
+    """
+    if rule is None:
+        return queryset.none()
+
+    own_flag, all_flag = ACTION_FLAGS[action]
+    if getattr(rule, all_flag):
+        return queryset
+    if getattr(rule, own_flag):
+        return queryset.filter(**{owner_field: user.pk})
+    return queryset.none()
+
+
+class AccessScopeFilterBackend(BaseFilterBackend):
+    """
+    Filter backend для GenericAPIView с element_code (и, при необходимости,
+    owner_field): ограничивает queryset объектами, доступными по правилу
+    для действия, соответствующего HTTP-методу.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        element_code = getattr(view, "element_code", None)
+        if not element_code:
+            return queryset
+
+        action = METHOD_ACTIONS.get(request.method.upper())
+        if action is None:
+            return queryset.none()
+
+        rule = get_request_rule(request, element_code)
+        owner_field = getattr(view, "owner_field", "owner")
+        return scope_queryset(queryset, request.user, rule, action, owner_field)
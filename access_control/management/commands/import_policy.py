@@ -0,0 +1,42 @@
+# access_control/management/commands/import_policy.py
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from access_control.policy import import_policy
+from access_control.serializers import PolicyDocumentSerializer
+
+
+class Command(BaseCommand):
+    help = "Импортирует политику доступа (роли, элементы, правила) из JSON-файла одной транзакцией."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к JSON-документу политики или '-' для stdin")
+
+    def handle(self, *args, **options):
+        try:
+            if options["path"] == "-":
+                document = json.load(sys.stdin)
+            else:
+                with open(options["path"], encoding="utf-8") as f:
+                    document = json.load(f)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Не удалось прочитать документ: {exc}")
+
+        serializer = PolicyDocumentSerializer(data=document)
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors, ensure_ascii=False))
+
+        try:
+            counts = import_policy(serializer.validated_data)
+        except ValidationError as exc:
+            raise CommandError(json.dumps(exc.detail, ensure_ascii=False))
+
+        for section, section_counts in counts.items():
+            self.stdout.write(
+                f"{section}: created={section_counts['created']} "
+                f"updated={section_counts['updated']} "
+                f"unchanged={section_counts['unchanged']}"
+            )
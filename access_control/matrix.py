@@ -0,0 +1,214 @@
+# access_control/matrix.py
+import threading
+import time
+import zlib
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import AccessRoleRule, Role
+
+# Порядок флагов задаёт биты маски: read_permission — 1, read_all_permission — 2 и т.д.
+FLAG_FIELDS = (
+    "read_permission",
+    "read_all_permission",
+    "create_permission",
+    "update_permission",
+    "update_all_permission",
+    "delete_permission",
+    "delete_all_permission",
+)
+FLAG_BITS = {name: 1 << i for i, name in enumerate(FLAG_FIELDS)}
+
+# Действие -> (флаг «на свои объекты», флаг «на все объекты»).
+# У создания нет деления на свои/чужие — оба флага совпадают.
+ACTION_FLAGS = {
+    "read": ("read_permission", "read_all_permission"),
+    "create": ("create_permission", "create_permission"),
+    "update": ("update_permission", "update_all_permission"),
+    "delete": ("delete_permission", "delete_all_permission"),
+}
+
+VERSION_CACHE_KEY = "access_control:matrix_version"
+
+
+class CompiledRule:
+    """
+    Правило из скомпилированной матрицы.
+    Атрибуты *_permission — те же, что у AccessRoleRule, но читаются из битовой маски.
+    """
+
+    __slots__ = ("role_id", "element_code", "mask")
+
+    def __init__(self, role_id, element_code, mask):
+        self.role_id = role_id
+        self.element_code = element_code
+        self.mask = mask
+
+    def __repr__(self):
+        return f"CompiledRule(role_id={self.role_id}, element_code={self.element_code!r}, mask={self.mask:07b})"
+
+
+for _name, _bit in FLAG_BITS.items():
+    setattr(CompiledRule, _name, property(lambda self, bit=_bit: bool(self.mask & bit)))
+
+
+class MatrixSnapshot(NamedTuple):
+    version: int  # счётчик версии из общего кэша на момент сборки
+    rules: dict  # role_id -> {element_code: маска}
+    role_names: dict  # role_id -> имя роли
+    policy_version: str  # хэш содержимого: одинаков во всех воркерах при одинаковых правилах
+    built_at: float  # time.monotonic() на момент сборки
+
+
+def compute_policy_version(rules: dict, role_names: dict) -> str:
+    content = repr((
+        sorted((role_id, sorted(masks.items())) for role_id, masks in rules.items()),
+        sorted(role_names.items()),
+    ))
+    return format(zlib.crc32(content.encode("utf-8")), "08x")
+
+
+class PermissionMatrix:
+    """
+    Все правила доступа в памяти процесса: (role_id, element_code) -> маска флагов,
+    плюс role_id -> имя роли и версия политики (хэш содержимого).
+
+    Собирается одним запросом при первом обращении и пересобирается целиком
+    после изменения Role / BusinessElement / AccessRoleRule (см. signals.py).
+    Готовый снимок подменяется одной операцией присваивания, так что читатели
+    всегда видят либо старую, либо новую матрицу целиком.
+
+    Другие воркеры узнают об изменениях по счётчику версии в кэше Django
+    (нужен общий бэкенд — Redis/Memcached/БД): он проверяется не чаще раза
+    в ACCESS_MATRIX_CHECK_INTERVAL секунд. С кэшем в памяти процесса (LocMemCache
+    по умолчанию) счётчик другим воркерам не виден, поэтому снимок старше
+    ACCESS_MATRIX_MAX_AGE секунд пересобирается в любом случае — это верхняя
+    граница, сколько отозванное право может действовать в другом воркере.
+    """
+
+    def __init__(self):
+        self._snapshot = None  # MatrixSnapshot
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    @property
+    def check_interval(self) -> float:
+        return getattr(settings, "ACCESS_MATRIX_CHECK_INTERVAL", 1.0)
+
+    @property
+    def max_age(self):
+        return getattr(settings, "ACCESS_MATRIX_MAX_AGE", 30.0)
+
+    def get_rule(self, role_id, element_code):
+        mask = self.get_role_masks(role_id).get(element_code)
+        if mask is None:
+            return None
+        return CompiledRule(role_id, element_code, mask)
+
+    def get_role_masks(self, role_id) -> dict:
+        return self.get_snapshot().rules.get(role_id, {})
+
+    def get_role_name(self, role_id):
+        return self.get_snapshot().role_names.get(role_id)
+
+    def get_claim(self, role_id) -> dict:
+        """
+        Дайджест прав роли для claim "acl" в JWT: маски по кодам элементов
+        и версия политики, по которой их можно проверить на свежесть.
+        """
+        snapshot = self.get_snapshot()
+        return {
+            "role_id": role_id,
+            "role": snapshot.role_names.get(role_id),
+            "policy": snapshot.policy_version,
+            "perms": dict(snapshot.rules.get(role_id, {})),
+        }
+
+    def get_snapshot(self):
+        snapshot = self.get_fresh_snapshot()
+        if snapshot is None:
+            snapshot = self.build()
+        return snapshot
+
+    def get_fresh_snapshot(self):
+        """
+        Текущий снимок, если он не устарел; None — нужна пересборка
+        (async-код делает её через sync_to_async).
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+
+        now = time.monotonic()
+        max_age = self.max_age
+        if max_age is not None and now - snapshot.built_at >= max_age:
+            return None
+        if now - self._checked_at < self.check_interval:
+            return snapshot
+
+        if cache.get(VERSION_CACHE_KEY, 0) != snapshot.version:
+            return None
+
+        self._checked_at = now
+        return snapshot
+
+    def build(self):
+        with self._lock:
+            # Пока ждали блокировку, матрицу мог собрать другой поток
+            snapshot = self.get_fresh_snapshot()
+            if snapshot is not None:
+                return snapshot
+
+            version = cache.get(VERSION_CACHE_KEY, 0)
+            rules = {}
+            # Только из основной БД: у матрицы нет TTL, и собранная по отстающей
+            # реплике она осталась бы устаревшей до следующего изменения правил
+            for role_id, element_code, *flags in AccessRoleRule.objects.using(DEFAULT_DB_ALIAS).values_list(
+                "role_id", "element__code", *FLAG_FIELDS
+            ):
+                mask = 0
+                for flag, bit in zip(flags, FLAG_BITS.values()):
+                    if flag:
+                        mask |= bit
+                rules.setdefault(role_id, {})[element_code] = mask
+
+            role_names = dict(Role.objects.using(DEFAULT_DB_ALIAS).values_list("id", "name"))
+
+            snapshot = MatrixSnapshot(
+                version=version,
+                rules=rules,
+                role_names=role_names,
+                policy_version=compute_policy_version(rules, role_names),
+                built_at=time.monotonic(),
+            )
+            self._snapshot = snapshot
+            # Версию сверим при следующем обращении: правила могли поменяться,
+            # пока шли запросы, и тогда снимок сразу будет признан устаревшим
+            self._checked_at = 0.0
+            self.builds += 1
+            return snapshot
+
+    def invalidate(self):
+        """
+        Сбрасывает матрицу в этом процессе и увеличивает общий счётчик версии,
+        чтобы остальные воркеры тоже пересобрали её.
+        """
+        cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+        try:
+            cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            # Ключ успели вытеснить между add и incr
+            cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+        self._snapshot = None
+
+    @property
+    def version(self):
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else None
+
+
+permission_matrix = PermissionMatrix()
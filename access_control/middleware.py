@@ -0,0 +1,71 @@
+# access_control/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .utils import get_request_access_cache
+
+DEBUG_HEADER = "X-Access-Debug"
+
+
+class QueryCounter:
+    """
+    Считает SQL-запросы через connection.execute_wrapper.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class AccessDebugHeaderMiddleware:
+    """
+    Добавляет к ответу заголовок
+        X-Access-Debug: lookups=2, resolutions=1, db_queries=3, from_token=0
+    lookups — сколько раз за запрос спросили правило доступа,
+    resolutions — сколько раз его реально вычислили,
+    db_queries — сколько SQL-запросов выполнил весь запрос,
+    from_token — сколько решений принято по claim "acl" из токена.
+
+    Включается настройкой ACCESS_DEBUG_HEADER; если она выключена,
+    Django вообще не подключает middleware (MiddlewareNotUsed).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "ACCESS_DEBUG_HEADER", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        return self.add_header(request, response, counter)
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = await self.get_response(request)
+        return self.add_header(request, response, counter)
+
+    def add_header(self, request, response, counter):
+        access_cache = get_request_access_cache(request)
+        response[DEBUG_HEADER] = (
+            f"lookups={access_cache.lookups}, "
+            f"resolutions={access_cache.resolutions}, "
+            f"db_queries={counter.count}, "
+            f"from_token={access_cache.from_token}"
+        )
+        return response
@@ -0,0 +1,57 @@
+# access_control/pagination.py
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import CursorPagination
+
+from em_auth.renderers import dumps
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация по id: следующая страница — WHERE id > <последний id>,
+    без OFFSET, поэтому стоимость страницы не растёт с номером.
+    """
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+def stream_json_array(queryset, fields: dict, chunk_size: int = 2000):
+    """
+    Отдаёт queryset JSON-массивом по мере чтения из БД (.iterator()),
+    не собирая весь список в памяти.
+
+    fields — {ключ в JSON: поле модели}, например {"role": "role_id"}.
+    """
+    names = list(fields)
+    rows = queryset.values_list(*fields.values()).iterator(chunk_size=chunk_size)
+
+    def generate():
+        # Строки кодируются тем же dumps (orjson), что и JSONRenderer для страниц
+        yield b"["
+        separator = b""
+        for row in rows:
+            yield separator + dumps(dict(zip(names, row)))
+            separator = b","
+        yield b"]"
+
+    return StreamingHttpResponse(generate(), content_type="application/json")
+
+
+class KeysetListMixin:
+    """
+    GET-список для APIView по ValuesSerializer:
+    - по умолчанию — страницы IdCursorPagination ({"next", "previous", "results"}),
+      прочитанные через .values(), без экземпляров моделей;
+    - ?stream=1 — вся таблица одним потоковым JSON-массивом с полями того же сериализатора.
+    """
+
+    pagination_class = IdCursorPagination
+
+    def list_response(self, request, queryset, serializer_class):
+        if request.query_params.get("stream") in ("1", "true"):
+            return stream_json_array(queryset.order_by("id"), serializer_class.fields)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(serializer_class.values(queryset), request, view=self)
+        return paginator.get_paginated_response(serializer_class.from_rows(page))
@@ -2,7 +2,10 @@
 # access_control/permissions.py
 from rest_framework.permissions import BasePermission
 
-from .utils import get_rule_for
+from em_auth.metrics import access_decisions
+
+from .matrix import permission_matrix
+from .utils import get_request_rule, get_role_id
 
 
 class AccessRequiredPermission(BasePermission):
@@ -18,12 +21,15 @@ class AccessRequiredPermission(BasePermission):
             # Если элемент не задан — не ограничиваем
             return True
 
-        rule = get_rule_for(request.user, element_code)
+        allowed = self.is_allowed(get_request_rule(request, element_code), request.method.upper())
+        access_decisions.inc(element_code, "allow" if allowed else "deny")
+        return allowed
+
+    @staticmethod
+    def is_allowed(rule, method):
         if not rule:
             return False
 
-        method = request.method.upper()
-
         if method == "GET":
             return bool(rule.read_permission or rule.read_all_permission)
 
@@ -49,8 +55,8 @@ class IsAdminRolePermission(BasePermission):
         if not user or not user.is_authenticated:
             return False
 
-        user_role = getattr(user, "user_role", None)
-        if not user_role or not user_role.role:
+        role_id = get_role_id(user)
+        if role_id is None:
             return False
 
-        return user_role.role.name == "admin"
+        return permission_matrix.get_role_name(role_id) == "admin"
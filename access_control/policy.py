@@ -0,0 +1,117 @@
+# access_control/policy.py
+from django.db import transaction
+from rest_framework import serializers
+
+from .matrix import FLAG_FIELDS, permission_matrix
+from .models import AccessRoleRule, BusinessElement, Role
+
+
+def _upsert(model, items, key, fields):
+    """
+    Создаёт/обновляет объекты model по уникальному полю key одним
+    bulk_create(update_conflicts=True). Строки, совпадающие с БД, не трогаем.
+    Возвращает (счётчики, {key: id}).
+    """
+    keys = [item[key] for item in items]
+    existing = {
+        row[key]: row
+        for row in model.objects.filter(**{f"{key}__in": keys}).values("id", key, *fields)
+    }
+
+    counts = {"created": 0, "updated": 0, "unchanged": 0}
+    to_write = []
+    for item in items:
+        current = existing.get(item[key])
+        if current is None:
+            counts["created"] += 1
+        elif any(current[f] != item[f] for f in fields):
+            counts["updated"] += 1
+        else:
+            counts["unchanged"] += 1
+            continue
+        to_write.append(model(**{key: item[key], **{f: item[f] for f in fields}}))
+
+    if to_write:
+        model.objects.bulk_create(
+            to_write,
+            update_conflicts=True,
+            unique_fields=[key],
+            update_fields=list(fields),
+        )
+
+    return counts, dict(model.objects.filter(**{f"{key}__in": keys}).values_list(key, "id"))
+
+
+def import_policy(document: dict) -> dict:
+    """
+    Загружает политику доступа целиком, в одной транзакции:
+    роли (по name), бизнес-элементы (по code) и правила (по паре role+element).
+
+    Флаги правила, не указанные в документе, считаются False.
+    Правила, которых нет в документе, не удаляются.
+    Матрица прав сбрасывается один раз на весь документ, а не на каждую строку
+    (bulk_create не отправляет post_save).
+    """
+    with transaction.atomic():
+        role_counts, role_ids = _upsert(Role, document.get("roles", []), "name", ("description",))
+        element_counts, element_ids = _upsert(
+            BusinessElement, document.get("elements", []), "code", ("name",)
+        )
+
+        rules = document.get("rules", [])
+        missing_roles = {r["role"] for r in rules} - set(role_ids)
+        missing_elements = {r["element"] for r in rules} - set(element_ids)
+        if missing_roles or missing_elements:
+            # Роли/элементы могли быть созданы раньше, не этим документом
+            role_ids.update(Role.objects.filter(name__in=missing_roles).values_list("name", "id"))
+            element_ids.update(
+                BusinessElement.objects.filter(code__in=missing_elements).values_list("code", "id")
+            )
+            unknown = sorted(
+                [f"role:{name}" for name in missing_roles - set(role_ids)]
+                + [f"element:{code}" for code in missing_elements - set(element_ids)]
+            )
+            if unknown:
+                raise serializers.ValidationError({"rules": f"Неизвестные роли/элементы: {', '.join(unknown)}"})
+
+        existing = {
+            (row["role_id"], row["element_id"]): row
+            for row in AccessRoleRule.objects.filter(
+                role_id__in={role_ids[r["role"]] for r in rules},
+                element_id__in={element_ids[r["element"]] for r in rules},
+            ).values("role_id", "element_id", *FLAG_FIELDS)
+        }
+
+        rule_counts = {"created": 0, "updated": 0, "unchanged": 0}
+        to_write = []
+        for rule in rules:
+            pair = (role_ids[rule["role"]], element_ids[rule["element"]])
+            flags = {name: rule.get(name, False) for name in FLAG_FIELDS}
+            current = existing.get(pair)
+            if current is None:
+                rule_counts["created"] += 1
+            elif any(current[name] != value for name, value in flags.items()):
+                rule_counts["updated"] += 1
+            else:
+                rule_counts["unchanged"] += 1
+                continue
+            to_write.append(AccessRoleRule(role_id=pair[0], element_id=pair[1], **flags))
+
+        if to_write:
+            AccessRoleRule.objects.bulk_create(
+                to_write,
+                update_conflicts=True,
+                unique_fields=["role", "element"],
+                update_fields=list(FLAG_FIELDS),
+            )
+
+        changed = any(
+            counts["created"] or counts["updated"]
+            for counts in (role_counts, element_counts, rule_counts)
+        )
+        if changed:
+            # Как в signals.py: сразу в этом процессе и ещё раз после коммита
+            permission_matrix.invalidate()
+            transaction.on_commit(permission_matrix.invalidate)
+
+    return {"roles": role_counts, "elements": element_counts, "rules": rule_counts}
@@ -1,6 +1,9 @@
 # access_control/serializers.py
 from rest_framework import serializers
 
+from em_auth.serializers import ValuesSerializer
+
+from .matrix import ACTION_FLAGS, FLAG_FIELDS
 from .models import AccessRoleRule, BusinessElement, Role
 
 
@@ -31,3 +34,81 @@ class AccessRoleRuleSerializer(serializers.ModelSerializer):
             "delete_permission",
             "delete_all_permission",
         )
+
+
+# Read-only варианты для списков: dict прямо из .values(), без ModelSerializer
+
+class RoleValuesSerializer(ValuesSerializer):
+    fields = {"id": "id", "name": "name", "description": "description"}
+
+
+class BusinessElementValuesSerializer(ValuesSerializer):
+    fields = {"id": "id", "code": "code", "name": "name"}
+
+
+class AccessRoleRuleValuesSerializer(ValuesSerializer):
+    fields = {
+        "id": "id",
+        "role": "role_id",
+        "element": "element_id",
+        **{name: name for name in FLAG_FIELDS},
+    }
+
+
+class AccessCheckItemSerializer(serializers.Serializer):
+    element = serializers.CharField(max_length=50)
+    action = serializers.ChoiceField(choices=sorted(ACTION_FLAGS))
+    user_id = serializers.IntegerField(required=False)
+    token = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        if "user_id" in attrs and "token" in attrs:
+            raise serializers.ValidationError("Укажите либо user_id, либо token")
+        return attrs
+
+
+class AccessCheckSerializer(serializers.Serializer):
+    checks = AccessCheckItemSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class PolicyRoleSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=50)
+    description = serializers.CharField(allow_blank=True, default="")
+
+
+class PolicyElementSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=50)
+    name = serializers.CharField(max_length=100)
+
+
+class PolicyRuleSerializer(serializers.Serializer):
+    role = serializers.CharField(max_length=50)
+    element = serializers.CharField(max_length=50)
+
+    read_permission = serializers.BooleanField(default=False)
+    read_all_permission = serializers.BooleanField(default=False)
+    create_permission = serializers.BooleanField(default=False)
+    update_permission = serializers.BooleanField(default=False)
+    update_all_permission = serializers.BooleanField(default=False)
+    delete_permission = serializers.BooleanField(default=False)
+    delete_all_permission = serializers.BooleanField(default=False)
+
+
+class PolicyDocumentSerializer(serializers.Serializer):
+    """
+    Документ политики доступа для массового импорта:
+    {"roles": [...], "elements": [...], "rules": [{"role": "admin", "element": "orders", ...}]}
+    """
+    roles = PolicyRoleSerializer(many=True, required=False, default=list)
+    elements = PolicyElementSerializer(many=True, required=False, default=list)
+    rules = PolicyRuleSerializer(many=True, required=False, default=list)
+
+    def validate(self, attrs):
+        for field, key in (("roles", ("name",)), ("elements", ("code",)), ("rules", ("role", "element"))):
+            seen = set()
+            for item in attrs[field]:
+                value = tuple(item[k] for k in key)
+                if value in seen:
+                    raise serializers.ValidationError({field: f"Повторяется {'/'.join(value)}"})
+                seen.add(value)
+        return attrs
@@ -0,0 +1,22 @@
+# access_control/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .matrix import permission_matrix
+from .models import AccessRoleRule, BusinessElement, Role
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=BusinessElement)
+@receiver(post_delete, sender=BusinessElement)
+@receiver(post_save, sender=AccessRoleRule)
+@receiver(post_delete, sender=AccessRoleRule)
+def invalidate_permission_matrix(sender, **kwargs):
+    """
+    Сбрасываем матрицу сразу (этот процесс) и ещё раз после коммита:
+    другой воркер мог успеть пересобрать её по данным до коммита.
+    """
+    permission_matrix.invalidate()
+    transaction.on_commit(permission_matrix.invalidate)
@@ -1,5 +1,16 @@
 # access_control/tests.py
+import io
+import json
+import os
+import tempfile
+
+import jwt
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -10,6 +21,21 @@ from access_control.models import (
     Role,
     UserRole,
 )
+from access_control.matrix import VERSION_CACHE_KEY, permission_matrix
+from access_control.serializers import (
+    AccessRoleRuleSerializer,
+    AccessRoleRuleValuesSerializer,
+    BusinessElementSerializer,
+    BusinessElementValuesSerializer,
+    RoleSerializer,
+    RoleValuesSerializer,
+)
+from access_control.utils import get_rule_for
+from accounts.cache import token_cache
+from accounts.utils import create_jwt_for_user
+from em_auth import metrics
+from em_auth.microbench import run_serialization_benchmarks
+from mock_business.models import Order
 
 
 User = get_user_model()
@@ -72,6 +98,10 @@ class OrdersAccessTests(APITestCase):
             delete_all_permission=False,
         )
 
+        # Заказы разных владельцев
+        Order.objects.create(owner=self.admin, title="Заказ админа")
+        Order.objects.create(owner=self.user, title="Заказ пользователя")
+
         self.login_url = reverse("auth-login")
         self.orders_url = reverse("orders-list")
 
@@ -117,3 +147,421 @@ class OrdersAccessTests(APITestCase):
         self.assertIsInstance(response.data, list)
         self.assertGreaterEqual(len(response.data), 1)
 
+    def test_decisions_counted_by_element(self):
+        """
+        Решения AccessRequiredPermission попадают в метрику access_decisions.
+        """
+        before = metrics.access_decisions.collect()
+
+        for email, password in (("admin@example.com", "adminpass123"), ("user2@example.com", "userpass123")):
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.get_token(email, password)}")
+            self.client.get(self.orders_url)
+
+        after = metrics.access_decisions.collect()
+        for decision in ("allow", "deny"):
+            key = ("orders", decision)
+            self.assertEqual(after.get(key, 0) - before.get(key, 0), 1)
+
+    @override_settings(ACCESS_DEBUG_HEADER=True)
+    def test_rule_resolved_once_per_request(self):
+        """
+        AccessRequiredPermission и OrdersListView делят одно вычисленное правило.
+        """
+        token = self.get_token("admin@example.com", "adminpass123")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        response = self.client.get(self.orders_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            response["X-Access-Debug"].startswith("lookups=2, resolutions=1, db_queries="),
+            msg=response["X-Access-Debug"],
+        )
+
+
+    @override_settings(ACCESS_DEBUG_HEADER=True, JWT_EMBED_PERMISSIONS=True)
+    def test_decision_from_token_digest(self):
+        """
+        Пока версия политики не менялась, права берутся из claim "acl";
+        после изменения правила токен устаревает и решение идёт через матрицу.
+        """
+        token = self.get_token("admin@example.com", "adminpass123")
+        acl = jwt.decode(token, options={"verify_signature": False})["acl"]
+        self.assertEqual(acl["role"], "admin")
+        self.assertEqual(acl["perms"], {"orders": 0b11})
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(self.orders_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["X-Access-Debug"].endswith("from_token=1"))
+
+        AccessRoleRule.objects.filter(role=self.role_admin).get().delete()
+
+        response = self.client.get(self.orders_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(response["X-Access-Debug"].endswith("from_token=0"))
+
+
+class PermissionMatrixTests(APITestCase):
+    """
+    Проверяет скомпилированную матрицу прав:
+    - повторные проверки прав не ходят в БД;
+    - изменение правила сразу видно в проверках;
+    - смена версии в общем кэше (другой воркер) приводит к пересборке.
+    """
+
+    def setUp(self):
+        self.role = Role.objects.create(name="user")
+        self.user = User.objects.create_user(
+            email="matrix@example.com",
+            username="matrix",
+            password="matrixpass123",
+        )
+        UserRole.objects.create(user=self.user, role=self.role)
+        self.element = BusinessElement.objects.create(code="orders", name="Заказы")
+        self.rule = AccessRoleRule.objects.create(
+            role=self.role,
+            element=self.element,
+            read_permission=True,
+        )
+        self.user = User.objects.select_related("user_role").get(pk=self.user.pk)
+
+    def test_rule_flags_come_from_matrix(self):
+        get_rule_for(self.user, "orders")
+
+        with self.assertNumQueries(0):
+            rule = get_rule_for(self.user, "orders")
+            missing = get_rule_for(self.user, "unknown")
+
+        self.assertTrue(rule.read_permission)
+        self.assertFalse(rule.read_all_permission)
+        self.assertIsNone(missing)
+
+    def test_rule_change_rebuilds_matrix(self):
+        self.assertFalse(get_rule_for(self.user, "orders").read_all_permission)
+
+        self.rule.read_all_permission = True
+        self.rule.save()
+
+        self.assertTrue(get_rule_for(self.user, "orders").read_all_permission)
+
+    @override_settings(ACCESS_MATRIX_CHECK_INTERVAL=0)
+    def test_version_bump_from_other_worker(self):
+        get_rule_for(self.user, "orders")
+        builds = permission_matrix.builds
+
+        cache.incr(VERSION_CACHE_KEY)
+        get_rule_for(self.user, "orders")
+
+        self.assertEqual(permission_matrix.builds, builds + 1)
+
+    @override_settings(ACCESS_MATRIX_MAX_AGE=0)
+    def test_max_age_rebuilds_without_shared_version(self):
+        self.assertFalse(get_rule_for(self.user, "orders").read_all_permission)
+
+        # Как правка в другом воркере при кэше в памяти процесса: ни сигнала, ни новой версии
+        AccessRoleRule.objects.filter(pk=self.rule.pk).update(read_all_permission=True)
+
+        self.assertTrue(get_rule_for(self.user, "orders").read_all_permission)
+
+
+class AccessCheckTests(APITestCase):
+    """
+    Проверяет POST /api/access/check/:
+    - решения own/all для себя, по чужому токену и по user_id;
+    - число запросов к БД не растёт с числом проверок;
+    - проверка по user_id недоступна не-админу.
+    """
+
+    def setUp(self):
+        self.role_admin = Role.objects.create(name="admin")
+        self.role_user = Role.objects.create(name="user")
+        self.orders = BusinessElement.objects.create(code="orders", name="Заказы")
+        AccessRoleRule.objects.create(
+            role=self.role_admin,
+            element=self.orders,
+            read_permission=True,
+            read_all_permission=True,
+        )
+        AccessRoleRule.objects.create(
+            role=self.role_user,
+            element=self.orders,
+            read_permission=True,
+            update_permission=True,
+        )
+
+        self.admin = User.objects.create_user(email="checker@example.com", username="checker", password="x")
+        UserRole.objects.create(user=self.admin, role=self.role_admin)
+        self.users = []
+        for i in range(5):
+            user = User.objects.create_user(email=f"u{i}@example.com", username=f"u{i}", password="x")
+            UserRole.objects.create(user=user, role=self.role_user)
+            self.users.append(user)
+
+        self.url = reverse("access-check")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_for_user(self.admin)[0]}")
+
+    def test_decisions_for_self_token_and_user_id(self):
+        user_token, _ = create_jwt_for_user(self.users[0])
+        checks = [
+            {"element": "orders", "action": "read"},
+            {"element": "orders", "action": "update", "token": user_token},
+            {"element": "orders", "action": "read", "user_id": self.users[1].id},
+            {"element": "orders", "action": "delete", "token": "garbage"},
+        ]
+
+        response = self.client.post(self.url, {"checks": checks}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(
+            [(r["allowed"], r["own"], r["all"]) for r in results],
+            [(True, True, True), (True, True, False), (True, True, False), (False, False, False)],
+        )
+        self.assertEqual(results[1]["user_id"], self.users[0].id)
+        self.assertIn("error", results[3])
+
+    def test_query_count_does_not_grow_with_checks(self):
+        def run(users):
+            checks = []
+            for user in users:
+                checks.append({"element": "orders", "action": "read", "user_id": user.id})
+                checks.append({"element": "orders", "action": "read", "token": create_jwt_for_user(user)[0]})
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(self.url, {"checks": checks}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(ctx.captured_queries)
+
+        run(self.users[:1])  # прогрев матрицы и кэша токена вызывающего
+        self.assertEqual(run(self.users[1:2]), run(self.users[2:]))
+
+    def test_user_id_checks_require_admin(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_for_user(self.users[0])[0]}")
+        checks = [{"element": "orders", "action": "read", "user_id": self.users[1].id}]
+
+        response = self.client.post(self.url, {"checks": checks}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RuleListPaginationTests(APITestCase):
+    """
+    Проверяет keyset-пагинацию и потоковый режим /api/access/rules/.
+    """
+
+    def setUp(self):
+        role_admin = Role.objects.create(name="admin")
+        self.admin = User.objects.create_user(email="lister@example.com", username="lister", password="x")
+        UserRole.objects.create(user=self.admin, role=role_admin)
+        for i in range(5):
+            AccessRoleRule.objects.create(
+                role=role_admin,
+                element=BusinessElement.objects.create(code=f"el{i}", name=f"Элемент {i}"),
+                read_permission=bool(i % 2),
+            )
+        self.url = reverse("rules-list-create")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_for_user(self.admin)[0]}")
+
+    def test_cursor_pages_cover_all_rules(self):
+        ids = []
+        url = f"{self.url}?page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            ids.extend(rule["id"] for rule in response.data["results"])
+            url = response.data["next"]
+
+        self.assertEqual(ids, list(AccessRoleRule.objects.order_by("id").values_list("id", flat=True)))
+
+    def test_stream_matches_serializer_output(self):
+        response = self.client.get(f"{self.url}?stream=1")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b"".join(response.streaming_content))
+        expected = AccessRoleRuleSerializer(AccessRoleRule.objects.order_by("id"), many=True).data
+        self.assertEqual(streamed, [dict(rule) for rule in expected])
+
+    def test_page_matches_serializer_output(self):
+        response = self.client.get(f"{self.url}?page_size=1000")
+
+        expected = AccessRoleRuleSerializer(AccessRoleRule.objects.order_by("id"), many=True).data
+        self.assertEqual(json.loads(response.content)["results"], [dict(rule) for rule in expected])
+
+
+class LeanSerializationTests(APITestCase):
+    """
+    Проверяет ValuesSerializer-ы и FastJSONRenderer / FastJSONParser:
+    тот же вывод, что у ModelSerializer и JSONRenderer DRF.
+    """
+
+    def setUp(self):
+        role = Role.objects.create(name="manager", description="Менеджер «отдела»")
+        element = BusinessElement.objects.create(code="orders", name="Заказы")
+        AccessRoleRule.objects.create(role=role, element=element, read_permission=True, delete_all_permission=True)
+
+    def test_values_serializers_match_model_serializers(self):
+        for model, serializer, lean in (
+            (Role, RoleSerializer, RoleValuesSerializer),
+            (BusinessElement, BusinessElementSerializer, BusinessElementValuesSerializer),
+            (AccessRoleRule, AccessRoleRuleSerializer, AccessRoleRuleValuesSerializer),
+        ):
+            queryset = model.objects.order_by("id")
+            expected = [dict(item) for item in serializer(queryset, many=True).data]
+            self.assertEqual(lean.serialize(queryset), expected, msg=model.__name__)
+            self.assertEqual(lean.from_rows(lean.values(queryset)), expected, msg=model.__name__)
+
+    def test_renderer_matches_drf(self):
+        from decimal import Decimal
+        from uuid import UUID
+
+        from django.utils import timezone
+        from rest_framework.renderers import JSONRenderer
+
+        from em_auth.renderers import FastJSONRenderer
+
+        data = {
+            "text": "Привет",
+            "when": timezone.now(),
+            "price": Decimal("10.50"),
+            "jti": UUID(int=1),
+            1: [True, None, 1.5],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_parser_errors_are_400(self):
+        admin = User.objects.create_user(email="lean@example.com", username="lean", password="x")
+        UserRole.objects.create(user=admin, role=Role.objects.create(name="admin"))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_for_user(admin)[0]}")
+
+        response = self.client.post(reverse("roles-list-create"), data=b"{bad", content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(
+            reverse("roles-list-create"),
+            data=json.dumps({"name": "Новая"}, ensure_ascii=False).encode(),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["name"], "Новая")
+
+    def test_serialization_benchmark(self):
+        report = run_serialization_benchmarks(rules=300, rounds=2)
+
+        self.assertEqual(AccessRoleRule.objects.filter(role__name__startswith="bench-").count(), 300)
+        self.assertEqual(set(report["speedup"]), {"render", "parse"})
+        self.assertTrue(all(ratio > 0 for ratio in report["speedup"].values()))
+
+
+class PolicyImportTests(APITestCase):
+    """
+    Проверяет массовый импорт политики (API и команда import_policy).
+    """
+
+    document = {
+        "roles": [{"name": "admin"}, {"name": "manager", "description": "Менеджер"}],
+        "elements": [{"code": "orders", "name": "Заказы"}, {"code": "users", "name": "Пользователи"}],
+        "rules": [
+            {"role": "admin", "element": "orders", "read_permission": True, "read_all_permission": True},
+            {"role": "admin", "element": "users", "read_all_permission": True},
+            {"role": "manager", "element": "orders", "read_permission": True},
+        ],
+    }
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="importer@example.com", username="importer", password="x")
+        UserRole.objects.create(user=self.admin, role=Role.objects.create(name="admin"))
+        self.url = reverse("policy-import")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_for_user(self.admin)[0]}")
+
+    def test_import_reports_counts_and_is_idempotent(self):
+        response = self.client.post(self.url, self.document, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["roles"], {"created": 1, "updated": 0, "unchanged": 1})
+        self.assertEqual(response.data["rules"], {"created": 3, "updated": 0, "unchanged": 0})
+        self.assertEqual(AccessRoleRule.objects.count(), 3)
+
+        document = json.loads(json.dumps(self.document))
+        document["rules"][2]["update_permission"] = True
+        response = self.client.post(self.url, document, format="json")
+
+        self.assertEqual(response.data["rules"], {"created": 0, "updated": 1, "unchanged": 2})
+        # Матрица сброшена импортом и видит новый флаг
+        manager_id = Role.objects.get(name="manager").id
+        self.assertTrue(permission_matrix.get_rule(manager_id, "orders").update_permission)
+
+    def test_unknown_role_rolls_back(self):
+        document = {
+            "elements": [{"code": "reports", "name": "Отчёты"}],
+            "rules": [{"role": "ghost", "element": "reports", "read_permission": True}],
+        }
+
+        response = self.client.post(self.url, document, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(BusinessElement.objects.filter(code="reports").exists())
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            json.dump(self.document, f)
+        self.addCleanup(os.remove, f.name)
+        out = io.StringIO()
+
+        call_command("import_policy", f.name, stdout=out)
+
+        self.assertIn("rules: created=3 updated=0 unchanged=0", out.getvalue())
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Бюджеты SQL-запросов эндпоинтов access_control: кэш токенов пуст,
+    матрица прав уже собрана. Число запросов не должно расти с числом строк.
+    """
+
+    QUERY_BUDGETS = {
+        "roles-list-create": 2,  # AuthToken + страница ролей
+        "elements-list-create": 2,
+        "rules-list-create": 2,
+        "access-check": 3,  # AuthToken + токены из проверок + пользователи по user_id
+    }
+
+    def setUp(self):
+        role_admin = Role.objects.create(name="admin")
+        self.admin = User.objects.create_user(email="budget-admin@example.com", username="budget-admin", password="x")
+        UserRole.objects.create(user=self.admin, role=role_admin)
+        other = User.objects.create_user(email="budget-other@example.com", username="budget-other", password="x")
+        self.other_token = create_jwt_for_user(other)[0]
+        for i in range(20):
+            AccessRoleRule.objects.create(
+                role=Role.objects.create(name=f"budget-role-{i}"),
+                element=BusinessElement.objects.create(code=f"budget-el-{i}", name=f"Элемент {i}"),
+                read_permission=True,
+            )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_for_user(self.admin)[0]}")
+        permission_matrix.build()
+
+    def assertWithinBudget(self, name, request):
+        token_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg=name)
+        self.assertLessEqual(
+            len(queries),
+            self.QUERY_BUDGETS[name],
+            msg=f"{name}: " + "\n".join(q["sql"] for q in queries.captured_queries),
+        )
+
+    def test_list_endpoints(self):
+        for name in ("roles-list-create", "elements-list-create", "rules-list-create"):
+            self.assertWithinBudget(name, lambda: self.client.get(reverse(name)))
+
+    def test_access_check(self):
+        checks = [{"element": f"budget-el-{i}", "action": "read", "user_id": self.admin.pk} for i in range(10)]
+        checks += [{"element": "budget-el-0", "action": "read", "token": self.other_token}]
+        self.assertWithinBudget(
+            "access-check",
+            lambda: self.client.post(reverse("access-check"), {"checks": checks}, format="json"),
+        )
@@ -2,9 +2,11 @@
 from django.urls import path
 
 from .views import (
+    AccessCheckView,
     AccessRoleRuleDetailView,
     AccessRoleRuleListCreateView,
     BusinessElementListCreateView,
+    PolicyImportView,
     RoleListCreateView,
 )
 
@@ -21,4 +23,6 @@ urlpatterns = [
         AccessRoleRuleDetailView.as_view(),
         name="rules-detail",
     ),
+    path("policy/import/", PolicyImportView.as_view(), name="policy-import"),
+    path("check/", AccessCheckView.as_view(), name="access-check"),
 ]
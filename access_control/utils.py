@@ -1,31 +1,165 @@
 # access_control/utils.py
+from asgiref.sync import sync_to_async
 from django.core.exceptions import ObjectDoesNotExist
 
-from .models import AccessRoleRule, BusinessElement, UserRole
+from em_auth.metrics import rule_resolve_seconds
+
+from .matrix import CompiledRule, permission_matrix
+from .models import UserRole
+
+
+def get_role_id(user):
+    """
+    id роли пользователя или None.
+    JWTAuthentication подгружает user_role вместе с пользователем,
+    так что обычно запроса в БД здесь нет.
+    """
+    try:
+        return user.user_role.role_id
+    except ObjectDoesNotExist:
+        return None
 
 
 def get_rule_for(user, element_code: str):
     """
     Возвращает правило доступа для пользователя к бизнес-элементу.
     Если роли/элемента/правила нет — возвращает None.
+
+    Правило берётся из скомпилированной матрицы (см. matrix.py) —
+    это CompiledRule с теми же флагами *_permission, что у AccessRoleRule.
     """
     if not user or not user.is_authenticated:
         return None
 
-    # вытаскиваем роль пользователя
-    try:
-        user_role = user.user_role
-    except ObjectDoesNotExist:
-        return None
+    with rule_resolve_seconds.time():
+        role_id = get_role_id(user)
+        if role_id is None:
+            return None
 
-    # находим бизнес-элемент по коду
-    try:
-        element = BusinessElement.objects.get(code=element_code)
-    except BusinessElement.DoesNotExist:
-        return None
+        return permission_matrix.get_rule(role_id, element_code)
 
-    # ищем правило для пары (роль, элемент)
-    try:
-        return AccessRoleRule.objects.get(role=user_role.role, element=element)
-    except AccessRoleRule.DoesNotExist:
+
+def get_rule_from_token(request, element_code: str):
+    """
+    Решение по claim "acl" из токена (см. JWT_EMBED_PERMISSIONS), без матрицы и БД.
+
+    Возвращает (usable, rule): usable=False — дайджеста нет, версия политики
+    не совпала с текущей или роль пользователя с тех пор сменилась;
+    тогда правило вычисляется обычным путём.
+    """
+    user = request.user
+    if not user or not user.is_authenticated:
+        return False, None
+
+    claims = getattr(getattr(request, "_request", request), "jwt_claims", None)
+    acl = claims.get("acl") if claims else None
+    if not acl:
+        return False, None
+
+    snapshot = permission_matrix.get_fresh_snapshot()
+    if snapshot is None or acl.get("policy") != snapshot.policy_version:
+        return False, None
+
+    # user_role приходит из снимка аутентификации, так что сверка бесплатная
+    if type(user).user_role.is_cached(user) and get_role_id(user) != acl.get("role_id"):
+        return False, None
+
+    mask = acl.get("perms", {}).get(element_code)
+    if mask is None:
+        return True, None
+    return True, CompiledRule(acl["role_id"], element_code, mask)
+
+
+async def aget_rule_for(user, element_code: str):
+    """
+    Async-вариант get_rule_for для views под ASGI.
+    Матрица общая с sync-кодом; если её нужно пересобрать — через sync_to_async.
+    """
+    if not user or not user.is_authenticated:
         return None
+
+    with rule_resolve_seconds.time():
+        if type(user).user_role.is_cached(user):
+            role_id = get_role_id(user)
+        else:
+            role_id = await UserRole.objects.filter(user_id=user.pk).values_list(
+                "role_id", flat=True
+            ).afirst()
+        if role_id is None:
+            return None
+
+        if permission_matrix.get_fresh_snapshot() is None:
+            await sync_to_async(permission_matrix.build)()
+
+        return permission_matrix.get_rule(role_id, element_code)
+
+
+class RequestAccessCache:
+    """
+    Решения по правам в рамках одного запроса: element_code -> правило.
+    lookups — сколько раз спросили, resolutions — сколько раз реально вычислили,
+    from_token — сколько из них решено по claim "acl" без матрицы.
+    """
+
+    __slots__ = ("rules", "lookups", "resolutions", "from_token")
+
+    def __init__(self):
+        self.rules = {}
+        self.lookups = 0
+        self.resolutions = 0
+        self.from_token = 0
+
+
+def get_request_access_cache(request) -> RequestAccessCache:
+    # Храним на исходном HttpRequest: он общий для DRF Request, views и middleware
+    http_request = getattr(request, "_request", request)
+    access_cache = getattr(http_request, "_access_cache", None)
+    if access_cache is None:
+        access_cache = http_request._access_cache = RequestAccessCache()
+    return access_cache
+
+
+def get_request_rule(request, element_code: str):
+    """
+    get_rule_for(request.user, element_code), вычисленное один раз за запрос:
+    permission-классы и view получают одно и то же правило.
+    """
+    access_cache = get_request_access_cache(request)
+    access_cache.lookups += 1
+    if element_code not in access_cache.rules:
+        access_cache.resolutions += 1
+        usable, rule = get_rule_from_token(request, element_code)
+        if usable:
+            access_cache.from_token += 1
+        else:
+            rule = get_rule_for(request.user, element_code)
+        access_cache.rules[element_code] = rule
+    return access_cache.rules[element_code]
+
+
+async def aget_request_rule(request, element_code: str):
+    access_cache = get_request_access_cache(request)
+    access_cache.lookups += 1
+    if element_code not in access_cache.rules:
+        access_cache.resolutions += 1
+        usable, rule = get_rule_from_token(request, element_code)
+        if usable:
+            access_cache.from_token += 1
+        else:
+            rule = await aget_rule_for(request.user, element_code)
+        access_cache.rules[element_code] = rule
+    return access_cache.rules[element_code]
+
+
+async def aload_user_role(user):
+    """
+    Заранее подгружает user.user_role (вместе с ролью) через async ORM,
+    чтобы сериализаторы и проверки прав не делали синхронный запрос
+    внутри async-view. Если роли нет — кэширует её отсутствие.
+    """
+    user_role = await UserRole.objects.select_related("role").filter(user_id=user.pk).afirst()
+    if user_role is None:
+        type(user).user_role.related.set_cached_value(user, None)
+    else:
+        user.user_role = user_role
+    return user_role
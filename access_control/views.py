@@ -1,21 +1,32 @@
 # access_control/views.py
 from rest_framework import status
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from accounts.ratelimit import AccessCheckThrottle
+
+from .checks import resolve_checks
 from .models import AccessRoleRule, BusinessElement, Role
+from .pagination import KeysetListMixin
 from .permissions import IsAdminRolePermission
+from .policy import import_policy
 from .serializers import (
+    AccessCheckSerializer,
     AccessRoleRuleSerializer,
+    AccessRoleRuleValuesSerializer,
     BusinessElementSerializer,
+    BusinessElementValuesSerializer,
+    PolicyDocumentSerializer,
     RoleSerializer,
+    RoleValuesSerializer,
 )
 
 
-class RoleListCreateView(APIView):
+class RoleListCreateView(KeysetListMixin, APIView):
     """
-    GET /api/access/roles/   — список ролей
+    GET /api/access/roles/   — список ролей (?cursor=, ?page_size=, ?stream=1)
     POST /api/access/roles/  — создание роли
 
     Только для admin.
@@ -24,9 +35,7 @@ class RoleListCreateView(APIView):
     permission_classes = [IsAuthenticated, IsAdminRolePermission]
 
     def get(self, request):
-        roles = Role.objects.all().order_by("id")
-        serializer = RoleSerializer(roles, many=True)
-        return Response(serializer.data)
+        return self.list_response(request, Role.objects.all(), RoleValuesSerializer)
 
     def post(self, request):
         serializer = RoleSerializer(data=request.data)
@@ -35,9 +44,9 @@ class RoleListCreateView(APIView):
         return Response(RoleSerializer(role).data, status=status.HTTP_201_CREATED)
 
 
-class BusinessElementListCreateView(APIView):
+class BusinessElementListCreateView(KeysetListMixin, APIView):
     """
-    GET /api/access/elements/   — список бизнес-элементов
+    GET /api/access/elements/   — список бизнес-элементов (?cursor=, ?page_size=, ?stream=1)
     POST /api/access/elements/  — создание элемента
 
     Только для admin.
@@ -46,9 +55,7 @@ class BusinessElementListCreateView(APIView):
     permission_classes = [IsAuthenticated, IsAdminRolePermission]
 
     def get(self, request):
-        elements = BusinessElement.objects.all().order_by("id")
-        serializer = BusinessElementSerializer(elements, many=True)
-        return Response(serializer.data)
+        return self.list_response(request, BusinessElement.objects.all(), BusinessElementValuesSerializer)
 
     def post(self, request):
         serializer = BusinessElementSerializer(data=request.data)
@@ -60,9 +67,9 @@ class BusinessElementListCreateView(APIView):
         )
 
 
-class AccessRoleRuleListCreateView(APIView):
+class AccessRoleRuleListCreateView(KeysetListMixin, APIView):
     """
-    GET /api/access/rules/    — список правил доступа
+    GET /api/access/rules/    — список правил доступа (?cursor=, ?page_size=, ?stream=1)
     POST /api/access/rules/   — создание правила
 
     Только для admin.
@@ -71,9 +78,8 @@ class AccessRoleRuleListCreateView(APIView):
     permission_classes = [IsAuthenticated, IsAdminRolePermission]
 
     def get(self, request):
-        rules = AccessRoleRule.objects.select_related("role", "element").all()
-        serializer = AccessRoleRuleSerializer(rules, many=True)
-        return Response(serializer.data)
+        # Только id роли и элемента — JOIN не нужен
+        return self.list_response(request, AccessRoleRule.objects.all(), AccessRoleRuleValuesSerializer)
 
     def post(self, request):
         serializer = AccessRoleRuleSerializer(data=request.data)
@@ -114,3 +120,50 @@ class AccessRoleRuleDetailView(APIView):
         rule.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+
+class PolicyImportView(APIView):
+    """
+    POST /api/access/policy/import/   — массовый upsert ролей, элементов и правил
+
+    Весь документ — одна транзакция; в ответе счётчики created/updated/unchanged.
+    Только для admin.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminRolePermission]
+
+    def post(self, request):
+        serializer = PolicyDocumentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        counts = import_policy(serializer.validated_data)
+        return Response(counts, status=status.HTTP_200_OK)
+
+
+class AccessCheckView(APIView):
+    """
+    POST /api/access/check/   — пакетная проверка прав
+
+    Тело: {"checks": [{"element": "orders", "action": "read",
+                       "user_id": 5 | "token": "<jwt>"}, ...]}
+    Без user_id/token проверяется сам вызывающий. Ответ — вектор решений
+    с own (например, read_permission) и all (read_all_permission).
+
+    Чужие токены может проверить любой аутентифицированный клиент (токен сам
+    подтверждает личность), проверка по user_id — только для admin.
+
+    Вместо общего ведра на токен (TokenThrottle) — своё, с более высокой частотой
+    (AccessCheckThrottle): шлюз ходит сюда с одним сервисным токеном за всех клиентов.
+    """
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [AccessCheckThrottle]
+
+    def post(self, request):
+        serializer = AccessCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        checks = serializer.validated_data["checks"]
+
+        if any("user_id" in check for check in checks):
+            if not IsAdminRolePermission().has_permission(request, self):
+                raise PermissionDenied("Проверка по user_id доступна только admin")
+
+        return Response({"results": resolve_checks(request.user, checks)})
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .jobs import start_token_purge_job
+        from .keys import validate_signing_keys
+
+        validate_signing_keys()
+        start_token_purge_job()
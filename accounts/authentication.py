@@ -1,12 +1,19 @@
 # accounts/authentication.py
+import time
+from datetime import datetime, timezone as dt_timezone
+
 import jwt
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from em_auth.db_router import aget_with_primary_fallback, get_with_primary_fallback
+from em_auth.metrics import auth_failures, token_lookup_seconds
+
+from .cache import get_auth_version, token_cache, user_cache
 from .models import AuthToken
-from .utils import decode_jwt
+from .utils import decode_jwt, is_token_denylisted
 
 User = get_user_model()
 
@@ -15,51 +22,173 @@ class JWTAuthentication(BaseAuthentication):
     """
     Аутентификация по заголовку:
     Authorization: Bearer <token>
+
+    Поддерживаются два вида токенов:
+    - обычные — с записью AuthToken в БД (request.auth — AuthToken);
+    - stateless (claim "stateless") — без записи в БД, проверяются по iat
+      и эпохе отзыва пользователя (request.auth — payload токена).
+
+    authenticate — для DRF, aauthenticate — для async-views под ASGI
+    (тот же разбор токена и те же проверки, но запросы через async ORM).
     """
 
     keyword = "Bearer"
 
     def authenticate(self, request):
+        payload = self.get_payload(request)
+        if payload is None:
+            return None
+
+        started = time.perf_counter()
+        if payload.get("stateless"):
+            user = user_cache.get_user(payload["sub"])
+            source = "cache"
+            if user is None:
+                source = "db"
+                version = get_auth_version(payload["sub"])
+                try:
+                    user = get_with_primary_fallback(User.objects.select_related("user_role"), pk=payload["sub"])
+                except (User.DoesNotExist, ValueError):
+                    raise self.fail("not_found", "Пользователь не найден")
+                user_cache.put_user(user, version)
+            token_lookup_seconds.observe(time.perf_counter() - started, source)
+            return self.check_stateless(user, payload)
+
+        token_obj = token_cache.get_token(payload["jti"])
+        source = "cache"
+        if token_obj is None:
+            source = "db"
+            version = get_auth_version(payload["sub"])
+            try:
+                # Токен мог быть выдан только что и ещё не дойти до реплики
+                token_obj = get_with_primary_fallback(
+                    AuthToken.objects.select_related("user__user_role"), jti=payload["jti"]
+                )
+            except AuthToken.DoesNotExist:
+                raise self.fail("not_found", "Токен не найден или отозван")
+            token_cache.put_token(token_obj, version)
+        token_lookup_seconds.observe(time.perf_counter() - started, source)
+
+        return self.check_token(token_obj)
+
+    async def aauthenticate(self, request):
+        payload = self.get_payload(request)
+        if payload is None:
+            return None
+
+        started = time.perf_counter()
+        if payload.get("stateless"):
+            user = user_cache.get_user(payload["sub"])
+            source = "cache"
+            if user is None:
+                source = "db"
+                version = get_auth_version(payload["sub"])
+                try:
+                    user = await aget_with_primary_fallback(User.objects.select_related("user_role"), pk=payload["sub"])
+                except (User.DoesNotExist, ValueError):
+                    raise self.fail("not_found", "Пользователь не найден")
+                user_cache.put_user(user, version)
+            token_lookup_seconds.observe(time.perf_counter() - started, source)
+            return self.check_stateless(user, payload)
+
+        token_obj = token_cache.get_token(payload["jti"])
+        source = "cache"
+        if token_obj is None:
+            source = "db"
+            version = get_auth_version(payload["sub"])
+            try:
+                token_obj = await aget_with_primary_fallback(
+                    AuthToken.objects.select_related("user__user_role"), jti=payload["jti"]
+                )
+            except AuthToken.DoesNotExist:
+                raise self.fail("not_found", "Токен не найден или отозван")
+            token_cache.put_token(token_obj, version)
+        token_lookup_seconds.observe(time.perf_counter() - started, source)
+
+        return self.check_token(token_obj)
+
+    def get_payload(self, request):
+        """
+        Разбирает заголовок Authorization и декодирует JWT.
+        None — заголовка нет (пусть DRF попробует другие схемы или вернёт 401).
+        """
         auth_header = request.META.get("HTTP_AUTHORIZATION", "")
 
         if not auth_header:
-            # Нет заголовка — пусть DRF попробует другие схемы (или вернёт 401)
             return None
 
         parts = auth_header.split()
 
         if len(parts) != 2 or parts[0] != self.keyword:
-            raise AuthenticationFailed("Неверный формат заголовка Authorization")
+            raise self.fail("malformed", "Неверный формат заголовка Authorization")
+
+        payload = self.decode_token(parts[1])
 
-        raw_token = parts[1]
+        # Claims (в том числе дайджест прав "acl") нужны проверкам доступа дальше по запросу
+        getattr(request, "_request", request).jwt_claims = payload
+        return payload
 
+    def decode_token(self, raw_token):
+        """
+        Проверяет подпись и срок токена и обязательные claims.
+        Используется и для заголовка, и для пакетной проверки токенов.
+        """
         try:
             payload = decode_jwt(raw_token)
         except jwt.ExpiredSignatureError:
-            raise AuthenticationFailed("Срок действия токена истёк")
+            raise self.fail("expired", "Срок действия токена истёк")
         except jwt.InvalidTokenError:
-            raise AuthenticationFailed("Невалидный токен")
+            raise self.fail("invalid", "Невалидный токен")
 
         user_id = payload.get("sub")
         jti = payload.get("jti")
 
         if not user_id or not jti:
-            raise AuthenticationFailed("Некорректный payload токена")
+            raise self.fail("invalid", "Некорректный payload токена")
 
-        try:
-            token_obj = AuthToken.objects.select_related("user").get(jti=jti)
-        except AuthToken.DoesNotExist:
-            raise AuthenticationFailed("Токен не найден или отозван")
+        if payload.get("stateless") and payload.get("iat") is None:
+            raise self.fail("invalid", "Некорректный payload токена")
+
+        return payload
+
+    def fail(self, reason, message):
+        """
+        AuthenticationFailed с кодом причины (expired, revoked, invalid, ...);
+        заодно учитывает отказ в метрике auth_failures.
+        """
+        auth_failures.inc(reason)
+        return AuthenticationFailed(message, code=reason)
 
+    def check_token(self, token_obj):
         if token_obj.is_revoked:
-            raise AuthenticationFailed("Токен отозван")
+            raise self.fail("revoked", "Токен отозван")
 
         if token_obj.is_expired:
-            raise AuthenticationFailed("Срок действия токена истёк")
+            raise self.fail("expired", "Срок действия токена истёк")
 
         user = token_obj.user
 
         if not user.is_active:
-            raise AuthenticationFailed("Пользователь деактивирован")
+            raise self.fail("deactivated", "Пользователь деактивирован")
+
+        if user.token_issued_before_epoch(token_obj.created_at):
+            raise self.fail("revoked", "Токен отозван")
 
         return user, token_obj
+
+    def check_stateless(self, user, payload):
+        """
+        Stateless-токен: строки AuthToken нет, срок жизни уже проверил decode_jwt.
+        Отзыв — по эпохе пользователя (logout-all, деактивация) или по денилисту jti (logout).
+        """
+        if not user.is_active:
+            raise self.fail("deactivated", "Пользователь деактивирован")
+
+        issued_at = datetime.fromtimestamp(payload["iat"], tz=dt_timezone.utc)
+        if user.token_issued_before_epoch(issued_at):
+            raise self.fail("revoked", "Токен отозван")
+
+        if is_token_denylisted(payload["jti"]):
+            raise self.fail("revoked", "Токен отозван")
+
+        return user, payload
@@ -0,0 +1,272 @@
+# accounts/cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import AuthToken
+
+
+class TTLCache:
+    """
+    Потокобезопасный LRU-кэш в памяти процесса:
+    - не больше max_size записей (самые старые по использованию вытесняются);
+    - у каждой записи свой срок жизни (не больше ttl секунд).
+
+    В каждом воркере (gunicorn/uvicorn) — свой экземпляр, поэтому TTL
+    ограничивает время, в течение которого другой воркер может видеть
+    устаревшие данные.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (deadline по time.monotonic(), value)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            deadline, value = item
+            if deadline <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        if not self.enabled:
+            return
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        deadline = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (deadline, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """
+        Удаляет все записи, для значения которых predicate(value) истинно.
+        Полный проход по кэшу — годится для редких операций (деактивация, правка в админке).
+        """
+        with self._lock:
+            stale = [key for key, (_, value) in self._data.items() if predicate(value)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+AUTH_VERSION_KEY = "accounts:auth_version:{}"
+
+
+def get_auth_version(user_id) -> int:
+    """
+    Общий для воркеров счётчик версии данных аутентификации пользователя
+    (токены, is_active, эпоха отзыва, роль) в кэше Django.
+    """
+    return cache.get(AUTH_VERSION_KEY.format(user_id), 0)
+
+
+def bump_auth_version(user_id):
+    """
+    Увеличивает счётчик: снимки пользователя и его токенов в кэшах всех
+    воркеров перестают приниматься со следующего запроса. Без срока жизни —
+    иначе счётчик мог бы начаться заново и совпасть со старым снимком.
+    """
+    key = AUTH_VERSION_KEY.format(user_id)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Ключ успели вытеснить между add и incr
+        cache.set(key, 1, timeout=None)
+
+
+class AuthTokenCache(TTLCache):
+    """
+    Кэш снимков (AuthToken, User) по jti для JWTAuthentication.
+
+    Храним не сами объекты моделей, а значения их полей: на каждое попадание
+    собираются свежие экземпляры, поэтому изменения request.user в одном
+    запросе не утекают в другие.
+
+    Снимок принимается, только пока не изменилась версия пользователя
+    (get_auth_version): так logout, отзыв и деактивация в другом воркере
+    видны сразу, если CACHES["default"] общий для воркеров.
+    """
+
+    def get_token(self, jti):
+        snapshot = self.get(str(jti))
+        if snapshot is None:
+            return None
+
+        user_id, db, token_values, user_snapshot, version = snapshot
+        if version != get_auth_version(user_id):
+            self.delete(str(jti))
+            return None
+        token_obj = AuthToken.from_db(db, None, token_values)
+        token_obj.user = _restore_user(db, user_snapshot)
+        return token_obj
+
+    def put_token(self, token_obj, version=None):
+        """
+        version — get_auth_version, прочитанная до загрузки токена из БД:
+        изменение, случившееся во время загрузки, сделает снимок устаревшим.
+        """
+        if version is None:
+            version = get_auth_version(token_obj.user_id)
+        # Запись не должна пережить сам токен
+        ttl = (token_obj.expires_at - timezone.now()).total_seconds()
+        snapshot = (
+            token_obj.user_id,
+            token_obj._state.db,
+            _field_values(token_obj),
+            _snapshot_user(token_obj.user),
+            version,
+        )
+        self.set(str(token_obj.jti), snapshot, ttl=ttl)
+
+    def invalidate(self, jti):
+        self.delete(str(jti))
+
+    def invalidate_user(self, user_id):
+        return self.delete_where(lambda snapshot: snapshot[0] == user_id)
+
+
+class UserCache(TTLCache):
+    """
+    Кэш снимков User по id для stateless-токенов:
+    по нему проверяются is_active и эпоха отзыва tokens_valid_after.
+    Версия пользователя сверяется так же, как в AuthTokenCache.
+    """
+
+    def get_user(self, user_id):
+        snapshot = self.get(str(user_id))
+        if snapshot is None:
+            return None
+
+        db, user_snapshot, version = snapshot
+        if version != get_auth_version(user_id):
+            self.delete(str(user_id))
+            return None
+        return _restore_user(db, user_snapshot)
+
+    def put_user(self, user, version=None):
+        if version is None:
+            version = get_auth_version(user.pk)
+        self.set(str(user.pk), (user._state.db, _snapshot_user(user), version))
+
+    def invalidate_user(self, user_id):
+        self.delete(str(user_id))
+
+
+class MeResponseCache(TTLCache):
+    """
+    Готовый JSON ответа GET /api/auth/me/ по id пользователя вместе с сильным ETag.
+    Повторный опрос /me не трогает ни ORM, ни сериализатор; сбрасывается
+    сигналами при изменении пользователя, его роли или самой роли (см. signals.py).
+    """
+
+    def get_response(self, user_id):
+        return self.get(str(user_id))
+
+    def put_response(self, user_id, body: bytes) -> tuple:
+        entry = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+        self.set(str(user_id), entry)
+        return entry
+
+    def invalidate_user(self, user_id):
+        self.delete(str(user_id))
+
+
+def _field_values(instance) -> tuple:
+    return tuple(getattr(instance, f.attname) for f in instance._meta.concrete_fields)
+
+
+_NOT_LOADED = object()
+
+
+def _snapshot_user(user) -> tuple:
+    """
+    Поля пользователя и, если она уже загружена, его связь с ролью (user_role):
+    с ней проверка прав обходится без запроса в БД.
+    """
+    descriptor = type(user).user_role
+    if not descriptor.is_cached(user):
+        user_role = _NOT_LOADED
+    else:
+        cached = descriptor.related.get_cached_value(user)
+        user_role = None if cached is None else _field_values(cached)
+    return _field_values(user), user_role
+
+
+def _restore_user(db, user_snapshot):
+    user_values, user_role_values = user_snapshot
+    User = get_user_model()
+    user = User.from_db(db, None, user_values)
+
+    if user_role_values is None:
+        User.user_role.related.set_cached_value(user, None)
+    elif user_role_values is not _NOT_LOADED:
+        user_role_model = User.user_role.related.related_model
+        user.user_role = user_role_model.from_db(db, None, user_role_values)
+    return user
+
+
+token_cache = AuthTokenCache(
+    max_size=getattr(settings, "AUTH_TOKEN_CACHE_MAX_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 30),
+)
+
+user_cache = UserCache(
+    max_size=getattr(settings, "AUTH_TOKEN_CACHE_MAX_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 30),
+)
+
+me_cache = MeResponseCache(
+    max_size=getattr(settings, "ME_RESPONSE_CACHE_MAX_SIZE", 10000),
+    ttl=getattr(settings, "ME_RESPONSE_CACHE_TTL", 30),
+)
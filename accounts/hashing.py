@@ -0,0 +1,210 @@
+# accounts/hashing.py
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from em_auth.metrics import password_hashing_in_flight, password_hashing_rejected, password_hashing_seconds
+
+
+class HashingPoolSaturated(APIException):
+    """
+    Очередь на хэширование паролей заполнена — 503 с заголовком Retry-After
+    (DRF выставляет его сам по атрибуту wait).
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Сервер перегружен, повторите попытку позже"
+    default_code = "hashing_pool_saturated"
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+def _init_worker():
+    # Для процессов, запущенных через spawn: хэшерам нужны настройки Django
+    import django
+    django.setup()
+
+
+def _timed_call(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHashingPool:
+    """
+    Пул для PBKDF2 (проверка и создание хэшей паролей), чтобы всплеск логинов
+    не занимал потоки, обслуживающие дешёвые запросы (/me, /orders).
+
+    - executor: "thread" (hashlib.pbkdf2_hmac отпускает GIL), "process"
+      или "inline" (без пула, как раньше);
+    - одновременно в работе и в очереди не больше workers + max_queue задач,
+      сверх этого — HashingPoolSaturated (503 + Retry-After).
+    """
+
+    def __init__(self, executor="thread", workers=4, max_queue=32, retry_after=1):
+        self.executor_kind = executor
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._hash_time_total = 0.0
+        self._hash_time_max = 0.0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            executor=getattr(settings, "PASSWORD_HASHING_EXECUTOR", "thread"),
+            workers=getattr(settings, "PASSWORD_HASHING_WORKERS", 4),
+            max_queue=getattr(settings, "PASSWORD_HASHING_MAX_QUEUE", 32),
+            retry_after=getattr(settings, "PASSWORD_HASHING_RETRY_AFTER", 1),
+        )
+
+    def check_password(self, user, raw_password) -> bool:
+        """
+        Аналог user.check_password: при устаревшем хэшере пароль перехэшируется
+        (тоже в пуле) и сохраняется.
+        """
+        is_correct, must_update = self.run(verify_password, raw_password, user.password)
+        if is_correct and must_update:
+            user.password = self.make_password(raw_password)
+            user.save(update_fields=["password"])
+        return is_correct
+
+    def make_password(self, raw_password) -> str:
+        return self.run(make_password, raw_password)
+
+    def make_passwords(self, raw_passwords, wait=False) -> list:
+        """
+        Хэши для пачки паролей (массовое создание пользователей) в том же пуле
+        и с тем же лимитом мест, что и у логинов. Одновременно в работе не больше
+        workers задач пачки — остальные места очереди остаются обычным запросам.
+
+        wait=False: если пул уже заполнен — HashingPoolSaturated (503), как у run();
+        wait=True: ждать свободного места (импорт уже идёт, бросать его на середине нельзя).
+        """
+        if self.executor_kind == "inline":
+            return [self.make_password(raw_password) for raw_password in raw_passwords]
+
+        window = threading.BoundedSemaphore(self.workers)
+
+        def release(_future):
+            with self._stats_lock:
+                self._in_flight -= 1
+            self._slots.release()
+            window.release()
+
+        futures = []
+        for raw_password in raw_passwords:
+            window.acquire()
+            if not self._slots.acquire(blocking=wait or bool(futures)):
+                window.release()
+                with self._stats_lock:
+                    self._rejected += 1
+                password_hashing_rejected.inc()
+                raise HashingPoolSaturated(wait=self.retry_after)
+
+            with self._stats_lock:
+                self._in_flight += 1
+            future = self._get_executor().submit(_timed_call, make_password, raw_password)
+            future.add_done_callback(release)
+            futures.append(future)
+
+        hashes = []
+        for future in futures:
+            result, elapsed = future.result()
+            self._record(make_password, elapsed)
+            hashes.append(result)
+        return hashes
+
+    def run(self, func, *args):
+        if self.executor_kind == "inline":
+            result, elapsed = _timed_call(func, *args)
+            self._record(func, elapsed)
+            return result
+
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            password_hashing_rejected.inc()
+            raise HashingPoolSaturated(wait=self.retry_after)
+
+        with self._stats_lock:
+            self._in_flight += 1
+        try:
+            result, elapsed = self._get_executor().submit(_timed_call, func, *args).result()
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+        self._record(func, elapsed)
+        return result
+
+    def shutdown(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.executor_kind == "process":
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            initializer=_init_worker,
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix="password-hashing",
+                        )
+        return self._executor
+
+    def _record(self, func, elapsed):
+        password_hashing_seconds.observe(elapsed, "verify" if func is verify_password else "hash")
+        with self._stats_lock:
+            self._completed += 1
+            self._hash_time_total += elapsed
+            self._hash_time_max = max(self._hash_time_max, elapsed)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "executor": self.executor_kind,
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.workers),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "hash_time_total": self._hash_time_total,
+                "hash_time_max": self._hash_time_max,
+            }
+
+
+hashing_pool = PasswordHashingPool.from_settings()
+
+
+def _pool_gauge():
+    stats = hashing_pool.stats()
+    return {
+        ("running",): stats["in_flight"] - stats["queue_depth"],
+        ("queued",): stats["queue_depth"],
+    }
+
+
+password_hashing_in_flight.set_function(_pool_gauge)
@@ -0,0 +1,57 @@
+# accounts/jobs.py
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .utils import purge_auth_tokens
+
+logger = logging.getLogger(__name__)
+
+_purge_thread = None
+_purge_lock = threading.Lock()
+
+
+def _purge_loop(interval, stop_event):
+    while not stop_event.wait(interval):
+        try:
+            report = purge_auth_tokens(
+                batch_size=getattr(settings, "AUTH_TOKEN_PURGE_BATCH_SIZE", 1000),
+            )
+            logger.info(
+                "AuthToken purge: deleted=%s batches=%s rows_per_second=%.0f",
+                report["deleted"],
+                report["batches"],
+                report["rows_per_second"],
+            )
+        except Exception:
+            logger.exception("AuthToken purge failed")
+        finally:
+            close_old_connections()
+
+
+def start_token_purge_job():
+    """
+    Фоновая очистка AuthToken в этом процессе раз в AUTH_TOKEN_PURGE_INTERVAL секунд.
+    Для простых развёртываний; при нескольких воркерах лучше запускать
+    команду purge_auth_tokens по расписанию (cron / systemd timer).
+    """
+    global _purge_thread
+
+    interval = getattr(settings, "AUTH_TOKEN_PURGE_INTERVAL", None)
+    if not interval:
+        return None
+
+    with _purge_lock:
+        if _purge_thread is None:
+            stop_event = threading.Event()
+            _purge_thread = threading.Thread(
+                target=_purge_loop,
+                args=(interval, stop_event),
+                name="auth-token-purge",
+                daemon=True,
+            )
+            _purge_thread.stop_event = stop_event
+            _purge_thread.start()
+    return _purge_thread
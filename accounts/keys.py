@@ -0,0 +1,136 @@
+# accounts/keys.py
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+import jwt
+from jwt.algorithms import get_default_algorithms
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """
+    Разобранный ключ подписи JWT.
+    private_key есть только у ключей, которыми можно подписывать;
+    ключи «только для проверки» остаются в JWKS на время ротации.
+    """
+    kid: str
+    algorithm: str
+    public_key: object
+    private_key: object = None
+
+
+def _parse_key(config: dict) -> SigningKey:
+    algorithm = config.get("algorithm", "RS256")
+    algo = get_default_algorithms()[algorithm]
+
+    private_key = None
+    if config.get("private_key"):
+        private_key = algo.prepare_key(config["private_key"])
+
+    if config.get("public_key"):
+        public_key = algo.prepare_key(config["public_key"])
+    elif private_key is not None:
+        public_key = private_key.public_key()
+    else:
+        raise ValueError(f"JWT key {config.get('kid')!r}: нужен public_key или private_key")
+
+    return SigningKey(
+        kid=config["kid"],
+        algorithm=algorithm,
+        public_key=public_key,
+        private_key=private_key,
+    )
+
+
+def load_key_file(path) -> list:
+    """
+    Ключи из JSON-файла (JWT_SIGNING_KEYS_FILE): список в формате JWT_SIGNING_KEYS.
+    Вместо PEM в private_key / public_key можно указать путь в private_key_file /
+    public_key_file (относительный — от каталога JSON-файла).
+    """
+    path = Path(path)
+    configs = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(configs, list):
+        raise ValueError("ожидается JSON-список ключей")
+    for config in configs:
+        for field in ("private_key", "public_key"):
+            key_path = config.pop(f"{field}_file", None)
+            if key_path:
+                config[field] = (path.parent / key_path).read_text(encoding="utf-8")
+    return configs
+
+
+@lru_cache(maxsize=None)
+def get_signing_keys() -> dict:
+    """
+    Все ключи из JWT_SIGNING_KEYS и JWT_SIGNING_KEYS_FILE, разобранные один раз: kid -> SigningKey.
+    Ошибка в конфигурации — ImproperlyConfigured.
+    """
+    configs = list(getattr(settings, "JWT_SIGNING_KEYS", []))
+    path = getattr(settings, "JWT_SIGNING_KEYS_FILE", None)
+    try:
+        if path:
+            configs.extend(load_key_file(path))
+        keys = {}
+        for config in configs:
+            key = _parse_key(config)
+            keys[key.kid] = key
+    except (OSError, KeyError, ValueError, TypeError, jwt.InvalidKeyError) as exc:
+        raise ImproperlyConfigured(f"Ключи подписи JWT: {exc!r}") from exc
+    return keys
+
+
+def get_active_key():
+    """
+    Ключ, которым подписываются новые токены (JWT_ACTIVE_KID).
+    None — асимметричная подпись не настроена, используется JWT_SECRET_KEY.
+    """
+    kid = getattr(settings, "JWT_ACTIVE_KID", None)
+    if not kid:
+        return None
+    key = get_signing_keys().get(kid)
+    if key is None:
+        raise ImproperlyConfigured(f"JWT_ACTIVE_KID={kid!r}: ключа с таким kid нет")
+    if key.private_key is None:
+        raise ImproperlyConfigured(f"JWT_ACTIVE_KID={kid!r}: у ключа нет private_key, им нельзя подписывать")
+    return key
+
+
+def validate_signing_keys():
+    """
+    Проверка при старте (AccountsConfig.ready): ошибка в ключах или JWT_ACTIVE_KID
+    останавливает процесс, а не превращает каждый логин в 500.
+    """
+    get_active_key()
+    get_signing_keys()
+
+
+def get_verification_key(kid: str):
+    return get_signing_keys().get(kid)
+
+
+@lru_cache(maxsize=None)
+def get_jwks() -> dict:
+    """
+    Публичные ключи в формате JWK Set для /api/auth/jwks/.
+    """
+    algorithms = get_default_algorithms()
+    jwks = []
+    for key in get_signing_keys().values():
+        jwk = algorithms[key.algorithm].to_jwk(key.public_key, as_dict=True)
+        jwk.update({"kid": key.kid, "alg": key.algorithm, "use": "sig"})
+        jwks.append(jwk)
+    return {"keys": jwks}
+
+
+@receiver(setting_changed)
+def reset_keys_cache(setting, **kwargs):
+    if setting in ("JWT_SIGNING_KEYS", "JWT_SIGNING_KEYS_FILE", "JWT_ACTIVE_KID"):
+        get_signing_keys.cache_clear()
+        get_jwks.cache_clear()
@@ -0,0 +1,62 @@
+# accounts/management/commands/benchmark_core.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from em_auth.loadtest import temporary_database
+from em_auth.microbench import run_core_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Микро-бенчмарки функций горячего пути (create_jwt_for_user, decode_jwt, "
+        "JWTAuthentication.authenticate, get_rule_for, has_permission, UserSerializer) "
+        "на временной БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=20)
+        parser.add_argument("-k", dest="only", action="append", help="Только бенчмарки с этой подстрокой в имени")
+        parser.add_argument("--output", help="Сохранить результаты в JSON-файл")
+        parser.add_argument("--compare", help="JSON прошлого прогона: сравнить mean")
+        parser.add_argument(
+            "--fail-on-regression",
+            type=float,
+            default=None,
+            metavar="RATIO",
+            help="Код выхода 1, если mean хуже базового больше чем на RATIO (например 0.2)",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"], encoding="utf-8") as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Не удалось прочитать результаты для сравнения: {exc}")
+
+        with temporary_database():
+            results = run_core_benchmarks(rounds=options["rounds"], only=options["only"])
+
+        regressions = []
+        for name, r in results.items():
+            line = (
+                f"{name:<40} min={r['min_us']:.1f}us mean={r['mean_us']:.1f}us "
+                f"median={r['median_us']:.1f}us stddev={r['stddev_us']:.1f}us ops={r['ops']:.0f}"
+            )
+            before = (baseline or {}).get(name)
+            if before:
+                change = (r["mean_us"] - before["mean_us"]) / before["mean_us"]
+                line += f" ({change:+.0%} vs base)"
+                limit = options["fail_on_regression"]
+                if limit is not None and change > limit:
+                    regressions.append(name)
+            self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+
+        if regressions:
+            raise CommandError(f"Регрессии: {', '.join(regressions)}")
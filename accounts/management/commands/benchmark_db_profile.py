@@ -0,0 +1,55 @@
+# accounts/management/commands/benchmark_db_profile.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from em_auth.db_profiles import database_profile
+from em_auth.loadtest import run_loadtest
+
+PROFILES = ("dev", "production")
+
+
+class Command(BaseCommand):
+    help = (
+        "Конкурентные register/login/me/orders/logout на профилях БД dev и production "
+        "(постоянные соединения, WAL, busy_timeout, BEGIN IMMEDIATE): пропускная способность, "
+        "p95 и ошибки по шагам. На временной SQLite-БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--output", help="Сохранить оба отчёта в JSON-файл")
+
+    def handle(self, *args, **options):
+        if connections["default"].vendor != "sqlite":
+            raise CommandError("Сравнение профилей доступно только для SQLite")
+
+        reports = {}
+        for profile in PROFILES:
+            with database_profile(profile):
+                reports[profile] = run_loadtest(
+                    server=options["server"],
+                    concurrency=options["concurrency"],
+                    iterations=options["iterations"],
+                    fast_hasher=True,
+                )
+
+        before, after = (reports[profile] for profile in PROFILES)
+        self.stdout.write(f"{'step':<10}{'dev rps':>10}{'prod rps':>10}{'dev p95':>10}{'prod p95':>10}{'dev err':>9}{'prod err':>9}")
+        for step, now in after["endpoints"].items():
+            was = before["endpoints"][step]
+            self.stdout.write(
+                f"{step:<10}{was['throughput_rps']:>10.1f}{now['throughput_rps']:>10.1f}"
+                f"{was['p95_ms']:>9.1f}ms{now['p95_ms']:>8.1f}ms{was['errors']:>9}{now['errors']:>9}"
+            )
+        self.stdout.write(
+            f"total rps: dev={before['throughput_rps']:.1f} production={after['throughput_rps']:.1f} "
+            f"(x{after['throughput_rps'] / before['throughput_rps']:.2f})"
+        )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(reports, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,37 @@
+# accounts/management/commands/benchmark_serialization.py
+import json
+
+from django.core.management.base import BaseCommand
+
+from em_auth.loadtest import temporary_database
+from em_auth.microbench import run_serialization_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнение сериализации списка правил (GET /api/access/rules/): ModelSerializer + "
+        "JSONRenderer DRF против ValuesSerializer + FastJSONRenderer, а также парсеров JSON. "
+        "На временной БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rules", type=int, default=10_000)
+        parser.add_argument("--rounds", type=int, default=10)
+        parser.add_argument("--output", help="Сохранить результаты в JSON-файл")
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            report = run_serialization_benchmarks(rules=options["rules"], rounds=options["rounds"])
+
+        self.stdout.write(f"rules={report['rules']}")
+        for name, r in report["results"].items():
+            self.stdout.write(
+                f"{name:<45} min={r['min_us'] / 1000:.2f}ms mean={r['mean_us'] / 1000:.2f}ms "
+                f"stddev={r['stddev_us'] / 1000:.2f}ms"
+            )
+        for what, ratio in report["speedup"].items():
+            self.stdout.write(f"speedup {what}: x{ratio:.1f}")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
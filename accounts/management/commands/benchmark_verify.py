@@ -0,0 +1,64 @@
+# accounts/management/commands/benchmark_verify.py
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from accounts.cache import token_cache, user_cache
+from accounts.utils import create_jwt_for_user
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает задержку /api/auth/verify/ и /api/auth/me/ на одном токене "
+        "(in-process, через тестовый клиент; данные откатываются после замера)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--warmup", type=int, default=50)
+
+    def handle(self, *args, **options):
+        # Все запросы идут с одним токеном — ограничение частоты отключено, как в loadtest
+        with transaction.atomic(), override_settings(RATE_LIMITS={}):
+            user = User.objects.create_user(
+                email="benchmark-verify@example.com",
+                username="benchmark-verify@example.com",
+                password=None,
+            )
+            raw_token, _ = create_jwt_for_user(user)
+            client = Client(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {raw_token}")
+
+            for name, expected_status in (("auth-verify", 204), ("auth-me", 200)):
+                url = reverse(name)
+                for _ in range(options["warmup"]):
+                    client.get(url)
+
+                timings = []
+                for _ in range(options["requests"]):
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    timings.append(time.perf_counter() - started)
+                    if response.status_code != expected_status:
+                        raise CommandError(f"{url}: ответ {response.status_code}, ожидался {expected_status}")
+
+                timings.sort()
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                self.stdout.write(
+                    f"{url}: requests={len(timings)} "
+                    f"mean_ms={statistics.fmean(timings) * 1000:.3f} "
+                    f"p50_ms={statistics.median(timings) * 1000:.3f} "
+                    f"p95_ms={p95 * 1000:.3f} "
+                    f"rps={len(timings) / sum(timings):.0f}"
+                )
+
+            transaction.set_rollback(True)
+
+        token_cache.invalidate_user(user.pk)
+        user_cache.invalidate_user(user.pk)
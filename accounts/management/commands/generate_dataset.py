@@ -0,0 +1,47 @@
+# accounts/management/commands/generate_dataset.py
+from django.core.management.base import BaseCommand, CommandError
+
+from em_auth.dataset import dataset_volumes, generate_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует синтетические данные для нагрузочных тестов: роли, элементы, "
+        "матрицу правил, пользователей, AuthToken и заказы (bulk insert, один хэш пароля на всех)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="1.0 — 10 тыс. пользователей; 100 — миллион",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="synthetic", help="Префикс email, имён ролей и кодов элементов")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--password", default="password123", help="Пароль всех сгенерированных пользователей")
+
+    def handle(self, *args, **options):
+        volumes = dataset_volumes(options["scale"])
+        self.stdout.write(
+            f"users={volumes['users']} roles={volumes['roles']} elements={volumes['elements']} seed={options['seed']}"
+        )
+
+        try:
+            report = generate_dataset(
+                scale=options["scale"],
+                seed=options["seed"],
+                prefix=options["prefix"],
+                batch_size=options["batch_size"],
+                password=options["password"],
+                log=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for table, stats in report["tables"].items():
+            self.stdout.write(f"{table}: rows={stats['rows']} rows_per_second={stats['rows_per_second']:.0f}")
+        self.stdout.write(
+            f"rows={report['rows']} seconds={report['seconds']:.2f} rows_per_second={report['rows_per_second']:.0f}"
+        )
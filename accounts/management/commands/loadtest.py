@@ -0,0 +1,67 @@
+# accounts/management/commands/loadtest.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from em_auth.loadtest import compare_reports, format_report, run_loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон register -> login -> me -> orders -> logout "
+        "в процессе, через WSGI- или ASGI-приложение em_auth. "
+        "По умолчанию — на временной чистой БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--iterations", type=int, default=10, help="Сценариев на виртуального пользователя")
+        parser.add_argument(
+            "--fast-hasher",
+            action="store_true",
+            help="MD5 вместо PBKDF2: мерить всё, кроме стоимости хэширования паролей",
+        )
+        parser.add_argument(
+            "--use-current-db",
+            action="store_true",
+            help="Писать в текущую БД, а не во временную (правила доступа не создаются)",
+        )
+        parser.add_argument("--output", help="Сохранить отчёт в JSON-файл")
+        parser.add_argument("--compare", help="JSON-отчёт прошлого прогона для сравнения")
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Код выхода 1, если p95 или rps хуже базового больше чем на 10%%",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"], encoding="utf-8") as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Не удалось прочитать отчёт для сравнения: {exc}")
+
+        report = run_loadtest(
+            server=options["server"],
+            concurrency=options["concurrency"],
+            iterations=options["iterations"],
+            fast_hasher=options["fast_hasher"],
+            use_current_db=options["use_current_db"],
+        )
+
+        for line in format_report(report):
+            self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+        if baseline is not None:
+            lines, regressions = compare_reports(report, baseline)
+            for line in lines:
+                self.stdout.write(line)
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"Регрессий: {regressions}")
@@ -0,0 +1,68 @@
+# accounts/management/commands/provision_users.py
+import json
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.hashing import PasswordHashingPool
+from accounts.provisioning import UserProvisioner, iter_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Массово создаёт пользователей из CSV (email,password,first_name,...) или JSONL. "
+        "Пароли хэшируются параллельно, строки с ошибками не прерывают загрузку."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к CSV/JSONL-файлу или '-' для stdin")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            default=None,
+            help="По умолчанию — по расширению файла",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "USER_PROVISIONING_BATCH_SIZE", 1000),
+        )
+        parser.add_argument("--workers", type=int, default=None, help="По умолчанию — число CPU")
+        parser.add_argument("--executor", choices=["process", "thread"], default="process")
+        parser.add_argument("--role", default="user", help="Роль для новых пользователей")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"]
+        if fmt is None:
+            if path == "-":
+                raise CommandError("Для stdin укажите --format")
+            fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+
+        # Отдельный пул на все ядра: команда запускается вне воркеров, обслуживающих логины
+        pool = PasswordHashingPool(
+            executor=options["executor"],
+            workers=options["workers"] or os.cpu_count() or 1,
+            max_queue=0,
+        )
+        provisioner = UserProvisioner(batch_size=options["batch_size"], pool=pool, role_name=options["role"])
+
+        try:
+            if path == "-":
+                report = provisioner.run(iter_records(sys.stdin, fmt))
+            else:
+                with open(path, encoding="utf-8", newline="") as f:
+                    report = provisioner.run(iter_records(f, fmt))
+        except OSError as exc:
+            raise CommandError(f"Не удалось прочитать файл: {exc}")
+        finally:
+            pool.shutdown()
+
+        for error in report["errors"]:
+            self.stderr.write(json.dumps(error, ensure_ascii=False))
+        self.stdout.write(
+            f"created={report['created']} failed={report['failed']} "
+            f"seconds={report['seconds']:.2f} rows_per_second={report['rows_per_second']:.0f}"
+        )
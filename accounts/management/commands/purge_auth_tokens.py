@@ -0,0 +1,29 @@
+# accounts/management/commands/purge_auth_tokens.py
+from django.core.management.base import BaseCommand
+
+from accounts.utils import purge_auth_tokens
+
+
+class Command(BaseCommand):
+    help = "Удаляет просроченные и отозванные AuthToken пачками, без долгих блокировок."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--max-batches", type=int, default=None)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Пауза между пачками, секунды",
+        )
+
+    def handle(self, *args, **options):
+        report = purge_auth_tokens(
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+            pause=options["pause"],
+        )
+        self.stdout.write(
+            f"deleted={report['deleted']} batches={report['batches']} "
+            f"seconds={report['seconds']:.2f} rows_per_second={report['rows_per_second']:.0f}"
+        )
@@ -0,0 +1,43 @@
+# accounts/management/commands/startup_report.py
+import json
+
+from django.core.management.base import BaseCommand
+
+from em_auth.startup import PROBE_PATH, run_startup_report
+
+ROWS = (
+    ("process_ms", "старт процесса до первого ответа, мс", "{:.0f}"),
+    ("setup_ms", "импорт настроек и django.setup(), мс", "{:.0f}"),
+    ("first_request_ms", "первый запрос (URLconf, views), мс", "{:.0f}"),
+    ("modules", "модулей в sys.modules", "{}"),
+    ("installed_apps", "INSTALLED_APPS", "{}"),
+    ("request_us", f"запрос {PROBE_PATH}, мкс", "{:.0f}"),
+    ("middleware_us", "из них middleware, мкс", "{:.0f}"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Холодный старт и стоимость middleware на запрос: полный профиль (em_auth.settings) "
+        "против API-профиля (em_auth.settings_api). Каждый профиль — в отдельных процессах."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Запусков процесса на профиль (берётся лучший)")
+        parser.add_argument("--rounds", type=int, default=20)
+        parser.add_argument("--output", help="Сохранить отчёт в JSON-файл")
+
+    def handle(self, *args, **options):
+        report = run_startup_report(runs=options["runs"], rounds=options["rounds"])
+        full, api = report["full"], report["api"]
+
+        self.stdout.write(f"{'':<42}{'full':>10}{'api':>10}{'разница':>10}")
+        for key, title, fmt in ROWS:
+            change = f"{(api[key] - full[key]) / full[key]:+.0%}" if full[key] else ""
+            self.stdout.write(f"{title:<42}{fmt.format(full[key]):>10}{fmt.format(api[key]):>10}{change:>10}")
+        self.stdout.write("middleware full: " + ", ".join(name.rsplit(".", 1)[-1] for name in full["middleware"]))
+        self.stdout.write("middleware api:  " + ", ".join(name.rsplit(".", 1)[-1] for name in api["middleware"]))
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
@@ -15,6 +15,12 @@ class User(AbstractUser):
     """
     middle_name = models.CharField("Отчество", max_length=150, blank=True)
     email = models.EmailField("Email", unique=True)
+    # Все токены, выпущенные раньше этого момента, считаются отозванными
+    tokens_valid_after = models.DateTimeField(
+        "Токены действительны после",
+        null=True,
+        blank=True,
+    )
 
     # username оставляем, но логинимся по email
     USERNAME_FIELD = "email"
@@ -24,6 +30,12 @@ class User(AbstractUser):
         fio = " ".join(filter(None, [self.last_name, self.first_name, self.middle_name]))
         return fio or self.email
 
+    def token_issued_before_epoch(self, issued_at) -> bool:
+        """
+        True, если токен выпущен до последнего «выхода со всех устройств».
+        """
+        return bool(self.tokens_valid_after and issued_at < self.tokens_valid_after)
+
 
 class AuthToken(models.Model):
     """
@@ -43,6 +55,12 @@ class AuthToken(models.Model):
     class Meta:
         verbose_name = "JWT токен"
         verbose_name_plural = "JWT токены"
+        indexes = [
+            # Очистка просроченных токенов
+            models.Index(fields=["expires_at"], name="authtoken_expires_at_idx"),
+            # Отзыв всех активных токенов пользователя
+            models.Index(fields=["user", "is_revoked"], name="authtoken_user_revoked_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} | {self.jti} | revoked={self.is_revoked}"
@@ -0,0 +1,210 @@
+# accounts/provisioning.py
+import csv
+import json
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from access_control.models import Role, UserRole
+
+from .hashing import hashing_pool
+
+User = get_user_model()
+
+USER_FIELDS = ("first_name", "last_name", "middle_name")
+MIN_PASSWORD_LENGTH = 8  # как в RegisterSerializer
+MAX_REPORTED_ERRORS = 1000
+
+
+def iter_records(stream, fmt: str):
+    """
+    Построчно читает пользователей из CSV (с заголовком) или JSONL.
+    Отдаёт (номер строки, dict или текст ошибки разбора).
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_no, f"Некорректный JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, "Ожидается JSON-объект"
+            continue
+        yield line_no, record
+
+
+def _check_user_fields(record):
+    """
+    Текст ошибки для полей ФИО (не строка или длиннее поля модели) или None.
+    """
+    for field in USER_FIELDS:
+        value = record.get(field) or ""
+        if not isinstance(value, str):
+            return f"Поле {field} должно быть строкой"
+        if len(value) > User._meta.get_field(field).max_length:
+            return f"Поле {field} длиннее {User._meta.get_field(field).max_length} символов"
+    return None
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class UserProvisioner:
+    """
+    Массовое создание пользователей с ролью по умолчанию.
+
+    - пароли хэшируются в PasswordHashingPool (по умолчанию — общий hashing_pool,
+      с его ограничением очереди и 503 при перегрузке в начале загрузки);
+    - User и UserRole вставляются bulk_create пачками по batch_size;
+    - роль по умолчанию находится/создаётся один раз;
+    - ошибочные строки (нет email, короткий пароль, поля не строками, дубликат) попадают
+      в отчёт и не прерывают загрузку.
+    """
+
+    def __init__(self, batch_size=1000, pool=None, role_name="user"):
+        self.batch_size = batch_size
+        self.pool = pool or hashing_pool
+        self.role_name = role_name
+
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self._seen_emails = set()
+        self._hashing_started = False
+
+    def run(self, records) -> dict:
+        started = time.perf_counter()
+        role, _ = Role.objects.get_or_create(
+            name=self.role_name,
+            defaults={"description": "Обычный пользователь"},
+        )
+
+        for batch in _batches(records, self.batch_size):
+            self._process_batch(batch, role)
+
+        seconds = time.perf_counter() - started
+        return {
+            "created": self.created,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "seconds": seconds,
+            "rows_per_second": (self.created + self.failed) / seconds if seconds else 0.0,
+        }
+
+    def _error(self, line_no, email, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "email": email, "error": message})
+
+    def _process_batch(self, batch, role):
+        valid = []
+        for line_no, record in batch:
+            if isinstance(record, str):
+                self._error(line_no, None, record)
+                continue
+
+            email = record.get("email") or ""
+            password = record.get("password") or ""
+            if not isinstance(email, str):
+                self._error(line_no, None, "Некорректный email")
+                continue
+            # Как при регистрации: email хранится как введён, сравнивается без учёта регистра
+            email = email.strip()
+            try:
+                validate_email(email)
+            except ValidationError:
+                self._error(line_no, email or None, "Некорректный email")
+                continue
+            if not isinstance(password, str):
+                self._error(line_no, email, "Пароль должен быть строкой")
+                continue
+            field_error = _check_user_fields(record)
+            if field_error:
+                self._error(line_no, email, field_error)
+                continue
+            if len(password) < MIN_PASSWORD_LENGTH:
+                self._error(line_no, email, f"Пароль короче {MIN_PASSWORD_LENGTH} символов")
+                continue
+            if email.lower() in self._seen_emails:
+                self._error(line_no, email, "Email повторяется в файле")
+                continue
+
+            self._seen_emails.add(email.lower())
+            valid.append((line_no, email, password, record))
+
+        if not valid:
+            return
+
+        emails = [email.lower() for _, email, _, _ in valid]
+        taken = set()
+        for email, username in User.objects.annotate(
+            email_lower=Lower("email"), username_lower=Lower("username"),
+        ).filter(
+            Q(email_lower__in=emails) | Q(username_lower__in=emails)
+        ).values_list("email", "username"):
+            taken.update((email.lower(), username.lower()))
+
+        fresh = []
+        for item in valid:
+            if item[1].lower() in taken:
+                self._error(item[0], item[1], "Пользователь с таким email уже существует")
+            else:
+                fresh.append(item)
+
+        if not fresh:
+            return
+
+        # Первую пачку при перегрузке пула отклоняем (503), дальше — ждём места
+        hashes = self.pool.make_passwords([password for _, _, password, _ in fresh], wait=self._hashing_started)
+        self._hashing_started = True
+
+        users = [
+            User(
+                email=email,
+                username=email,
+                password=password_hash,
+                **{field: (record.get(field) or "") for field in USER_FIELDS},
+            )
+            for (_, email, _, record), password_hash in zip(fresh, hashes)
+        ]
+
+        try:
+            with transaction.atomic():
+                self._insert(users, role)
+            self.created += len(users)
+        except IntegrityError:
+            # Кто-то успел создать такого же пользователя параллельно — пачку по одному
+            for (line_no, email, _, _), user in zip(fresh, users):
+                try:
+                    with transaction.atomic():
+                        self._insert([user], role)
+                    self.created += 1
+                except IntegrityError:
+                    self._error(line_no, email, "Пользователь с таким email уже существует")
+
+    def _insert(self, users, role):
+        User.objects.bulk_create(users)
+        if any(user.pk is None for user in users):
+            # БД не вернула id из INSERT — дочитываем одним запросом
+            ids = dict(User.objects.filter(email__in=[u.email for u in users]).values_list("email", "id"))
+            for user in users:
+                user.pk = ids[user.email]
+        UserRole.objects.bulk_create([UserRole(user_id=user.pk, role=role) for user in users])
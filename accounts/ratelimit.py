@@ -0,0 +1,230 @@
+# accounts/ratelimit.py
+import heapq
+import math
+import threading
+import time
+from collections.abc import Mapping
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from em_auth.metrics import rate_limited
+
+from .models import AuthToken
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """
+    "10/min" -> (10, 6.0): ёмкость ведра и интервал пополнения одного токена в секундах.
+    Формат как у DRF: период по первой букве (s, m, h, d). None — без ограничения.
+    """
+    if not rate:
+        return None
+    count, period = rate.split("/")
+    capacity = int(count)
+    return capacity, PERIODS[period[0]] / capacity
+
+
+class LocalBucketStore:
+    """
+    Token bucket в памяти процесса в форме GCRA: на ключ хранится одно число —
+    момент (time.monotonic), когда ведро снова станет полным за вычетом уже
+    выданных токенов ("theoretical arrival time"). Пустое по смыслу ведро
+    не хранится вовсе.
+
+    Быстрый путь без блокировок: одно чтение и одна запись в dict (атомарны под GIL).
+    Два потока на одном ключе могут одновременно пройти по одному токену —
+    ведро ограничивает скорость с точностью до числа потоков, этого достаточно.
+    Блокировка берётся только на очистку, когда ключей больше max_keys: сначала
+    удаляются полные вёдра, затем, если нужно, те, что наполнятся раньше всех,
+    пока не останется 90% от max_keys. Опустошённые вёдра при этом сохраняются —
+    поток запросов с новыми ключами не сбрасывает уже исчерпанные лимиты.
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._tat = {}
+        self._sweep_lock = threading.Lock()
+
+    def consume(self, key, capacity, interval, now=None) -> float:
+        """
+        Забирает токен. 0.0 — можно; иначе — через сколько секунд появится токен.
+        """
+        now = time.monotonic() if now is None else now
+        tat = max(self._tat.get(key, now), now)
+        new_tat = tat + interval
+        wait = new_tat - capacity * interval - now
+        if wait > 0:
+            return wait
+
+        self._tat[key] = new_tat
+        if len(self._tat) > self.max_keys:
+            self._sweep(now)
+        return 0.0
+
+    def _sweep(self, now):
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            # Полные вёдра (tat в прошлом) хранить не нужно
+            alive = {key: tat for key, tat in list(self._tat.items()) if tat > now}
+            keep = int(self.max_keys * 0.9)
+            if len(alive) > keep:
+                alive = dict(heapq.nlargest(keep, alive.items(), key=itemgetter(1)))
+            self._tat = alive
+        finally:
+            self._sweep_lock.release()
+
+    def clear(self):
+        self._tat = {}
+
+    def __len__(self):
+        return len(self._tat)
+
+
+class SharedBucketStore:
+    """
+    Ведро, общее для всех воркеров, в Django-кэше (RATE_LIMIT_CACHE, например Redis).
+
+    Сначала проверяется локальное ведро: если в этом процессе токенов нет,
+    в кэш не ходим. Общее состояние читается и пишется без блокировок (get + set),
+    так что при гонке воркеров лимит соблюдается приблизительно.
+    """
+
+    prefix = "ratelimit:"
+
+    def __init__(self, local, cache):
+        self.local = local
+        self.cache = cache
+
+    def consume(self, key, capacity, interval, now=None) -> float:
+        wait = self.local.consume(key, capacity, interval)
+        if wait:
+            return wait
+
+        # Между процессами сравнимы только «настенные» часы
+        now = time.time() if now is None else now
+        cache_key = self.prefix + key
+        tat = max(self.cache.get(cache_key, now), now)
+        new_tat = tat + interval
+        wait = new_tat - capacity * interval - now
+        if wait > 0:
+            return wait
+        self.cache.set(cache_key, new_tat, timeout=math.ceil(new_tat - now) + 1)
+        return 0.0
+
+
+local_bucket_store = LocalBucketStore(max_keys=getattr(settings, "RATE_LIMIT_MAX_KEYS", 100_000))
+
+
+def get_bucket_store():
+    if getattr(settings, "RATE_LIMIT_BACKEND", "local") == "cache":
+        return SharedBucketStore(local_bucket_store, caches[getattr(settings, "RATE_LIMIT_CACHE", "default")])
+    return local_bucket_store
+
+
+def consume(scope, key) -> float:
+    """
+    Токен из ведра scope (RATE_LIMITS[scope]) для key.
+    0.0 — запрос разрешён (или лимита нет), иначе — секунды до следующей попытки.
+    """
+    rate = parse_rate(getattr(settings, "RATE_LIMITS", {}).get(scope))
+    if rate is None or key is None:
+        return 0.0
+
+    wait = get_bucket_store().consume(f"{scope}:{key}", *rate)
+    if wait:
+        rate_limited.inc(scope)
+    return wait
+
+
+def token_key(auth):
+    """
+    Ключ ведра для токена: jti AuthToken или stateless-токена (payload).
+    """
+    if isinstance(auth, AuthToken):
+        return str(auth.jti)
+    if isinstance(auth, dict):
+        return auth.get("jti")
+    return None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF-throttle поверх consume(): при пустом ведре DRF отвечает 429
+    с Retry-After (по wait()), до вызова обработчика view.
+    """
+
+    scope = None
+
+    def get_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        # DRF проверяет все throttle даже после отказа: отклонённый запрос
+        # не должен тратить токены и заводить ключи в остальных вёдрах
+        if getattr(request, "_rate_limited", False):
+            self._wait = 0.0
+            return True
+        self._wait = consume(self.scope, self.get_key(request, view))
+        if self._wait:
+            request._rate_limited = True
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    """
+    Ведро на адрес клиента: REMOTE_ADDR или, за NUM_PROXIES доверенными прокси,
+    адрес из X-Forwarded-For, который записал ближайший из них (get_ident DRF).
+    """
+
+    scope = "login_ip"
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class LoginEmailThrottle(TokenBucketThrottle):
+    """
+    Ведро на email из тела запроса: перебор паролей к одному аккаунту
+    с разных адресов упирается в него.
+    """
+
+    scope = "login_email"
+
+    def get_key(self, request, view):
+        # Тело — не объект (например, JSON-массив): ведра нет, 400 вернёт сериализатор
+        if not isinstance(request.data, Mapping):
+            return None
+        email = request.data.get("email")
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return email.strip().lower()
+
+
+class TokenThrottle(TokenBucketThrottle):
+    """
+    Ведро на токен доступа для аутентифицированных запросов (DEFAULT_THROTTLE_CLASSES).
+    """
+
+    scope = "token"
+
+    def get_key(self, request, view):
+        return token_key(request.auth)
+
+
+class AccessCheckThrottle(TokenThrottle):
+    """
+    Отдельное ведро на токен для POST /api/access/check/ с более высокой
+    частотой (RATE_LIMITS["access_check"]): шлюз ходит туда с одним сервисным
+    токеном за всех своих клиентов.
+    """
+
+    scope = "access_check"
@@ -2,7 +2,11 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from access_control.matrix import permission_matrix
 from access_control.models import Role, UserRole
+from access_control.utils import get_role_id
+
+from .hashing import hashing_pool
 
 User = get_user_model()
 
@@ -38,7 +42,8 @@ class RegisterSerializer(serializers.ModelSerializer):
             validated_data.setdefault("username", email)
 
         user = User(**validated_data)
-        user.set_password(password)
+        # PBKDF2 — в пуле хэширования, а не в потоке запроса
+        user.password = hashing_pool.make_password(password)
         user.save()
 
         # Роль по умолчанию — "user"
@@ -59,10 +64,14 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ("id", "email", "first_name", "last_name", "middle_name", "role")
 
     def get_role(self, obj):
-        user_role = getattr(obj, "user_role", None)
-        if user_role and user_role.role:
+        role_id = get_role_id(obj)
+        if role_id is None:
+            return None
+        user_role = obj.user_role
+        if type(user_role).role.is_cached(user_role):
             return user_role.role.name
-        return None
+        # Роль не подгружена — имя из матрицы прав, без запроса за Role
+        return permission_matrix.get_role_name(role_id)
 
 
 class LoginSerializer(serializers.Serializer):
@@ -81,7 +90,7 @@ class LoginSerializer(serializers.Serializer):
         if not user.is_active:
             raise serializers.ValidationError("Пользователь деактивирован")
 
-        if not user.check_password(password):
+        if not hashing_pool.check_password(user, password):
             raise serializers.ValidationError("Неверный email или пароль")
 
         attrs["user"] = user
@@ -0,0 +1,54 @@
+# accounts/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from access_control.models import Role, UserRole
+
+from .cache import bump_auth_version, me_cache, token_cache, user_cache
+from .models import AuthToken
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """
+    Любое изменение пользователя (PATCH /me, деактивация, правка в админке)
+    сбрасывает закэшированные снимки всех его токенов и эпоху отзыва.
+    """
+    bump_auth_version(instance.pk)
+    token_cache.invalidate_user(instance.pk)
+    user_cache.invalidate_user(instance.pk)
+    me_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=AuthToken)
+@receiver(post_delete, sender=AuthToken)
+def invalidate_token(sender, instance, **kwargs):
+    # Новый токен при логине в других воркерах ещё не закэширован — версию не трогаем
+    if not kwargs.get("created"):
+        bump_auth_version(instance.user_id)
+    token_cache.invalidate(instance.jti)
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_user_role(sender, instance, **kwargs):
+    """
+    Роль пользователя хранится в снимках вместе с ним — при смене роли их сбрасываем.
+    """
+    bump_auth_version(instance.user_id)
+    token_cache.invalidate_user(instance.user_id)
+    user_cache.invalidate_user(instance.user_id)
+    me_cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_me_responses(sender, **kwargs):
+    """
+    Имя роли входит в закэшированные ответы /me; роли меняются редко — сбрасываем всё.
+    """
+    me_cache.clear()
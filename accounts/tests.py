@@ -1,9 +1,53 @@
 # accounts/tests.py
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+import jwt
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models.signals import post_save
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+try:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+except ImportError:  # cryptography не установлен — асимметричные тесты пропускаются
+    rsa = None
+
+from accounts.cache import bump_auth_version, me_cache, token_cache, user_cache
+from access_control.checks import resolve_checks
+from access_control.matrix import permission_matrix
+from access_control.models import AccessRoleRule, Role, UserRole
+from accounts.hashing import PasswordHashingPool
+from accounts.keys import validate_signing_keys
+from accounts.models import AuthToken
+from accounts.ratelimit import LocalBucketStore, SharedBucketStore, local_bucket_store, parse_rate
+from accounts.utils import create_jwt_for_user, purge_auth_tokens
+from accounts.views import AsyncMeView
+from em_auth import metrics
+from em_auth.dataset import generate_dataset
+from em_auth.db_profiles import postgres_database, sqlite_database
+from em_auth.db_router import is_pinned, primary_pinning_scope, replica_health
+from em_auth.loadtest import run_loadtest, seed_access_rules
+from em_auth.microbench import core_benchmarks, run_core_benchmarks
+from em_auth.startup import measure_profile
+from mock_business.models import Order
 
 User = get_user_model()
 
@@ -57,3 +101,1261 @@ class AuthFlowTests(APITestCase):
         self.assertEqual(response.data["first_name"], register_data["first_name"])
         self.assertEqual(response.data["last_name"], register_data["last_name"])
 
+
+class AuthTokenCacheTests(APITestCase):
+    """
+    Проверяет кэш снимков AuthToken в JWTAuthentication:
+    - повторный запрос с тем же токеном не ходит в БД за AuthToken;
+    - logout и деактивация сразу сбрасывают запись в кэше;
+    - отзыв в другом воркере виден по общей версии пользователя.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(
+            email="cache@example.com",
+            username="cache",
+            password="cachepass123",
+        )
+        response = self.client.post(
+            reverse("auth-login"),
+            {"email": "cache@example.com", "password": "cachepass123"},
+            format="json",
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.me_url = reverse("auth-me")
+
+    def test_second_request_hits_cache(self):
+        self.client.get(self.me_url)
+
+        # user_role (здесь — её отсутствие) лежит в снимке вместе с пользователем
+        with self.assertNumQueries(0):
+            response = self.client.get(self.me_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache.stats()["hits"], 1)
+        self.assertEqual(token_cache.stats()["misses"], 1)
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.get(self.me_url)
+
+        response = self.client.post(reverse("auth-logout"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.me_url)
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_revoke_in_other_worker_invalidates_cached_token(self):
+        self.assertEqual(self.client.get(self.me_url).status_code, status.HTTP_200_OK)
+
+        # Другой воркер: запись в БД без сигналов в этом процессе, только общая версия
+        AuthToken.objects.filter(user=self.user).update(is_revoked=True)
+        bump_auth_version(self.user.pk)
+
+        response = self.client.get(self.me_url)
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_deactivation_invalidates_cached_token(self):
+        self.client.get(self.me_url)
+
+        response = self.client.delete(self.me_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.me_url)
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+
+class VerifyViewTests(TestCase):
+    """
+    Проверяет /api/auth/verify/ для auth_request шлюза:
+    204 с X-User-Id / X-User-Role или 401 без тела.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="gw@example.com", username="gw", password="x")
+        UserRole.objects.create(user=self.user, role=Role.objects.create(name="manager"))
+        self.url = reverse("auth-verify")
+        self.token, _ = create_jwt_for_user(self.user)
+
+    def test_valid_token(self):
+        response = self.client.get(self.url, headers={"Authorization": f"Bearer {self.token}"})
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response["X-User-Id"], str(self.user.pk))
+        self.assertEqual(response["X-User-Role"], "manager")
+
+    def test_warm_verify_without_queries(self):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        self.client.get(self.url, headers=headers)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, headers=headers)
+        self.assertEqual(response.status_code, 204)
+
+    def test_missing_invalid_and_revoked(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+        response = self.client.get(self.url, headers={"Authorization": "Bearer garbage"})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.content, b"")
+
+        AuthToken.objects.filter(user=self.user).update(is_revoked=True)
+        token_cache.invalidate_user(self.user.pk)
+        response = self.client.get(self.url, headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, 401)
+
+
+class StatelessTokenTests(APITestCase):
+    """
+    Проверяет stateless-режим (JWT_STATELESS=True):
+    - логин не создаёт записей AuthToken;
+    - logout отзывает только текущий stateless-токен (денилист jti);
+    - logout-all отзывает и stateless-токены, и токены из БД, выпущенные раньше.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(
+            email="stateless@example.com",
+            username="stateless",
+            password="statelesspass123",
+        )
+        self.me_url = reverse("auth-me")
+
+    def login(self) -> str:
+        self.client.credentials()
+        response = self.client.post(
+            reverse("auth-login"),
+            {"email": "stateless@example.com", "password": "statelesspass123"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["access"]
+
+    def get_me(self, token: str):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return self.client.get(self.me_url)
+
+    @override_settings(JWT_STATELESS=True)
+    def test_login_does_not_create_token_rows(self):
+        token = self.login()
+
+        self.assertFalse(AuthToken.objects.filter(user=self.user).exists())
+        self.assertEqual(self.get_me(token).status_code, status.HTTP_200_OK)
+
+    @override_settings(JWT_STATELESS=True)
+    def test_logout_revokes_only_current_token(self):
+        token, other = self.login(), self.login()
+
+        response = self.client.post(reverse("auth-logout"), headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertIn(self.get_me(token).status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.assertEqual(self.get_me(other).status_code, status.HTTP_200_OK)
+
+    def test_logout_all_revokes_both_kinds_of_tokens(self):
+        db_token = self.login()
+        with override_settings(JWT_STATELESS=True):
+            stateless_token = self.login()
+
+            self.assertEqual(self.get_me(db_token).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.get_me(stateless_token).status_code, status.HTTP_200_OK)
+
+            response = self.client.post(reverse("auth-logout-all"))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            self.assertNotEqual(self.get_me(db_token).status_code, status.HTTP_200_OK)
+            self.assertNotEqual(self.get_me(stateless_token).status_code, status.HTTP_200_OK)
+
+            # Новый логин после отзыва снова работает
+            self.assertEqual(self.get_me(self.login()).status_code, status.HTTP_200_OK)
+
+
+def _generate_key_configs():
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ed_key = ed25519.Ed25519PrivateKey.generate()
+    pem = dict(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    return [
+        {"kid": "rsa-1", "algorithm": "RS256", "private_key": rsa_key.private_bytes(**pem)},
+        {"kid": "ed-1", "algorithm": "EdDSA", "private_key": ed_key.private_bytes(**pem)},
+    ]
+
+
+@skipUnless(rsa, "для асимметричной подписи нужен пакет cryptography")
+class AsymmetricSigningTests(APITestCase):
+    """
+    Проверяет подпись RS256/EdDSA с kid, ротацию ключей и /api/auth/jwks/.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key_configs = _generate_key_configs()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="keys@example.com",
+            username="keys",
+            password="keyspass123",
+        )
+
+    def login(self) -> str:
+        self.client.credentials()
+        response = self.client.post(
+            reverse("auth-login"),
+            {"email": "keys@example.com", "password": "keyspass123"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["access"]
+
+    def get_me(self, token: str):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return self.client.get(reverse("auth-me"))
+
+    def test_rotation_keeps_old_tokens_valid(self):
+        with self.settings(JWT_SIGNING_KEYS=self.key_configs, JWT_ACTIVE_KID="rsa-1"):
+            rsa_token = self.login()
+        with self.settings(JWT_SIGNING_KEYS=self.key_configs, JWT_ACTIVE_KID="ed-1"):
+            ed_token = self.login()
+
+            self.assertEqual(jwt.get_unverified_header(rsa_token)["kid"], "rsa-1")
+            self.assertEqual(jwt.get_unverified_header(ed_token)["alg"], "EdDSA")
+            self.assertEqual(self.get_me(rsa_token).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.get_me(ed_token).status_code, status.HTTP_200_OK)
+
+        # Ключ убрали из конфигурации — его токены больше не принимаются
+        with self.settings(JWT_SIGNING_KEYS=self.key_configs[1:], JWT_ACTIVE_KID="ed-1"):
+            self.assertNotEqual(self.get_me(rsa_token).status_code, status.HTTP_200_OK)
+
+    def test_jwks_verifies_token_locally(self):
+        with self.settings(JWT_SIGNING_KEYS=self.key_configs, JWT_ACTIVE_KID="rsa-1"):
+            token = self.login()
+            self.client.credentials()
+            response = self.client.get(reverse("auth-jwks"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("max-age", response["Cache-Control"])
+        self.assertEqual([k["kid"] for k in response.data["keys"]], ["rsa-1", "ed-1"])
+
+        jwk = jwt.PyJWK(response.data["keys"][0])
+        payload = jwt.decode(token, jwk.key, algorithms=["RS256"])
+        self.assertEqual(payload["sub"], str(self.user.id))
+
+    def test_keys_from_file(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        with open(os.path.join(tmp_dir, "rsa.pem"), "wb") as f:
+            f.write(self.key_configs[0]["private_key"])
+        path = os.path.join(tmp_dir, "keys.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"kid": "file-1", "algorithm": "RS256", "private_key_file": "rsa.pem"}], f)
+
+        with self.settings(JWT_SIGNING_KEYS_FILE=path, JWT_ACTIVE_KID="file-1"):
+            validate_signing_keys()
+            token = self.login()
+            self.assertEqual(self.get_me(token).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(jwt.get_unverified_header(token)["kid"], "file-1")
+
+    def test_invalid_active_kid_is_rejected_at_startup(self):
+        private_key = serialization.load_pem_private_key(self.key_configs[0]["private_key"], password=None)
+        verify_only = {
+            "kid": "old",
+            "algorithm": "RS256",
+            "public_key": private_key.public_key().public_bytes(
+                serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+            ),
+        }
+
+        for keys, kid in (([], "missing"), ([verify_only], "old")):
+            with self.settings(JWT_SIGNING_KEYS=keys, JWT_ACTIVE_KID=kid):
+                with self.assertRaises(ImproperlyConfigured):
+                    validate_signing_keys()
+
+
+class AsyncMeViewTests(TestCase):
+    """
+    Проверяет async-версию /api/auth/me/ (API_ASYNC_VIEWS=True).
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="async@example.com",
+            username="async",
+            password="asyncpass123",
+            first_name="Async",
+        )
+        UserRole.objects.create(
+            user=self.user,
+            role=Role.objects.create(name="user"),
+        )
+        token, _ = create_jwt_for_user(self.user)
+        self.auth = {"headers": {"Authorization": f"Bearer {token}"}}
+        self.factory = AsyncRequestFactory()
+        self.view = AsyncMeView.as_view()
+
+    async def test_get_returns_user_with_role(self):
+        response = await self.view(self.factory.get("/api/auth/me/", **self.auth))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)
+        self.assertEqual(data["email"], "async@example.com")
+        self.assertEqual(data["role"], "user")
+
+    async def test_patch_updates_user(self):
+        request = self.factory.patch(
+            "/api/auth/me/",
+            data={"first_name": "Обновлён"},
+            content_type="application/json",
+            **self.auth,
+        )
+        response = await self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertEqual(user.first_name, "Обновлён")
+
+    async def test_requires_token(self):
+        response = await self.view(self.factory.get("/api/auth/me/"))
+
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.assertIn("detail", json.loads(response.content))
+
+
+class MeResponseCacheTests(APITestCase):
+    """
+    Проверяет кэш готовых ответов /api/auth/me/:
+    - повторный GET с If-None-Match даёт 304 без SQL и без сериализатора;
+    - PATCH, смена роли и переименование роли дают новый ETag;
+    - после деактивации /me недоступен.
+    """
+
+    def setUp(self):
+        me_cache.clear()
+        self.user = User.objects.create_user(email="etag@example.com", username="etag", password="etagpass123")
+        self.role = Role.objects.create(name="user")
+        UserRole.objects.create(user=self.user, role=self.role)
+        token, _ = create_jwt_for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.url = reverse("auth-me")
+
+    def get_me(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(self.url, headers=headers)
+
+    def test_not_modified_without_orm_and_serializer(self):
+        first = self.get_me()
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(first.content)["role"], "user")
+        etag = first["ETag"]
+        self.assertTrue(etag.startswith('"'))
+
+        with mock.patch("accounts.views.UserSerializer") as serializer, \
+                CaptureQueriesContext(connection) as queries:
+            second = self.get_me(etag)
+            weak = self.get_me(f"W/{etag}")
+            plain = self.get_me()
+
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second.content, b"")
+        self.assertEqual(second["ETag"], etag)
+        self.assertEqual(weak.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(plain.content, first.content)
+        self.assertEqual(len(queries), 0)
+        serializer.assert_not_called()
+
+    def test_invalidated_by_patch(self):
+        etag = self.get_me()["ETag"]
+        self.client.patch(self.url, {"first_name": "Новое"}, format="json")
+
+        response = self.get_me(etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(json.loads(response.content)["first_name"], "Новое")
+
+    def test_invalidated_by_role_changes(self):
+        etag = self.get_me()["ETag"]
+        user_role = UserRole.objects.get(user=self.user)
+        user_role.role = Role.objects.create(name="manager")
+        user_role.save()
+
+        response = self.get_me(etag)
+        self.assertEqual(json.loads(response.content)["role"], "manager")
+
+        role = Role.objects.get(name="manager")
+        role.name = "lead"
+        role.save()
+        self.assertEqual(json.loads(self.get_me(response["ETag"]).content)["role"], "lead")
+
+    def test_deactivation(self):
+        self.get_me()
+        self.client.delete(self.url)
+
+        self.assertIsNone(me_cache.get_response(self.user.pk))
+        self.assertIn(self.get_me().status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+
+class PasswordHashingPoolTests(APITestCase):
+    """
+    Проверяет пул хэширования паролей:
+    - логин и регистрация работают через пул;
+    - при заполненной очереди логин получает 503 с Retry-After;
+    - пачки паролей импорта хэшируются в том же пуле и тоже получают 503;
+    - занятость пула и отказы видны в /metrics.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="pool@example.com",
+            username="pool",
+            password="poolpass123",
+        )
+        self.login_data = {"email": "pool@example.com", "password": "poolpass123"}
+
+    def test_login_verifies_password_in_pool(self):
+        pool = PasswordHashingPool(workers=1, max_queue=0)
+
+        with mock.patch("accounts.serializers.hashing_pool", pool):
+            response = self.client.post(reverse("auth-login"), self.login_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(pool.stats()["completed"], 1)
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])
+    def test_saturated_pool_returns_503(self):
+        pool = PasswordHashingPool(workers=1, max_queue=0, retry_after=3)
+        started, release = threading.Event(), threading.Event()
+
+        def busy():
+            started.set()
+            release.wait(5)
+
+        rejected = metrics.password_hashing_rejected.collect().get((), 0)
+        worker = threading.Thread(target=pool.run, args=(busy,))
+        worker.start()
+        started.wait(5)
+        try:
+            with mock.patch("accounts.serializers.hashing_pool", pool), mock.patch("accounts.hashing.hashing_pool", pool):
+                response = self.client.post(reverse("auth-login"), self.login_data, format="json")
+                body = self.client.get(reverse("metrics")).content.decode()
+        finally:
+            release.set()
+            worker.join()
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "3")
+        self.assertEqual(pool.stats()["rejected"], 1)
+        self.assertIn('auth_password_hashing_in_flight{state="running"} 1', body)
+        self.assertIn('auth_password_hashing_in_flight{state="queued"} 0', body)
+        self.assertEqual(metrics.password_hashing_rejected.collect().get((), 0), rejected + 1)
+
+    def test_make_passwords_in_pool(self):
+        pool = PasswordHashingPool(workers=2, max_queue=1)
+        self.addCleanup(pool.shutdown)
+
+        hashes = pool.make_passwords([f"password{i}" for i in range(5)])
+
+        self.assertTrue(check_password("password3", hashes[3]))
+        self.assertEqual(pool.stats()["completed"], 5)
+        self.assertEqual(pool.stats()["in_flight"], 0)
+
+    def test_import_into_saturated_pool_returns_503(self):
+        pool = PasswordHashingPool(workers=1, max_queue=0, retry_after=2)
+        self.addCleanup(pool.shutdown)
+        started, release = threading.Event(), threading.Event()
+        worker = threading.Thread(target=pool.run, args=(lambda: (started.set(), release.wait(5)),))
+        worker.start()
+        started.wait(5)
+
+        admin = User.objects.create_user(email="pool-admin@example.com", username="pool-admin", password="x")
+        UserRole.objects.create(user=admin, role=Role.objects.create(name="admin"))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_for_user(admin)[0]}")
+        upload = {"file": io.BytesIO(b"email,password\nnew@example.com,password123\n"), "format": "csv"}
+        try:
+            with mock.patch("accounts.provisioning.hashing_pool", pool):
+                response = self.client.post(reverse("auth-users-import"), upload, format="multipart")
+        finally:
+            release.set()
+            worker.join()
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "2")
+        self.assertFalse(User.objects.filter(email="new@example.com").exists())
+
+
+class RateLimitTests(APITestCase):
+    """
+    Проверяет ограничение частоты (token bucket):
+    - логин сверх ведра на IP или на email получает 429 с Retry-After без хэширования пароля;
+    - запросы с токеном сверх его ведра получают 429 (DRF и async-views);
+    - пополнение ведра со временем, очистка ключей и общее ведро в кэше.
+    """
+
+    def setUp(self):
+        local_bucket_store.clear()
+        self.addCleanup(local_bucket_store.clear)
+        self.user = User.objects.create_user(
+            email="limit@example.com",
+            username="limit",
+            password="limitpass123",
+        )
+        self.login_data = {"email": "limit@example.com", "password": "wrong"}
+
+    def rejected(self, scope):
+        return metrics.rate_limited.collect().get((scope,), 0)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("10/min"), (10, 6.0))
+        self.assertEqual(parse_rate("2/s"), (2, 0.5))
+        self.assertIsNone(parse_rate(None))
+
+    @override_settings(RATE_LIMITS={"login_ip": "2/min", "login_email": "100/min"})
+    def test_login_ip_bucket_rejects_before_hashing(self):
+        for _ in range(2):
+            response = self.client.post(reverse("auth-login"), self.login_data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        rejected = self.rejected("login_ip")
+
+        with mock.patch("accounts.serializers.hashing_pool") as pool:
+            response = self.client.post(reverse("auth-login"), self.login_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Ведро 2/min: токен пополняется за 30 с, часть их ушла на хэширование
+        self.assertTrue(0 < int(response["Retry-After"]) <= 30)
+        pool.run.assert_not_called()
+        self.assertEqual(self.rejected("login_ip"), rejected + 1)
+
+    @override_settings(RATE_LIMITS={"login_ip": "2/min", "login_email": "100/min"})
+    def test_spoofed_forwarded_for_does_not_bypass_ip_bucket(self):
+        codes = [
+            self.client.post(
+                reverse("auth-login"), self.login_data, format="json", HTTP_X_FORWARDED_FOR=f"203.0.113.{i}"
+            ).status_code
+            for i in range(4)
+        ]
+
+        self.assertEqual(codes.count(status.HTTP_429_TOO_MANY_REQUESTS), 2)
+
+    @override_settings(RATE_LIMITS={"login_ip": "100/min", "login_email": "2/min"})
+    def test_login_email_bucket_spans_addresses(self):
+        for i in range(2):
+            response = self.client.post(
+                reverse("auth-login"), self.login_data, format="json", REMOTE_ADDR=f"10.0.0.{i}"
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Тот же email в другом регистре и с нового адреса — то же ведро
+        response = self.client.post(
+            reverse("auth-login"),
+            {"email": "LIMIT@example.com", "password": "limitpass123"},
+            format="json",
+            REMOTE_ADDR="10.0.0.9",
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        other = self.client.post(
+            reverse("auth-login"), {"email": "other@example.com", "password": "x"}, format="json", REMOTE_ADDR="10.0.0.9"
+        )
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_with_non_object_body_is_rejected(self):
+        for body in ([1, 2], "limit@example.com", 1):
+            response = self.client.post(reverse("auth-login"), body, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RATE_LIMITS={"token": "2/min"})
+    def test_token_bucket(self):
+        token, _ = create_jwt_for_user(self.user)
+        other_token, _ = create_jwt_for_user(self.user)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse("auth-me"), headers=headers).status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse("auth-me"), headers=headers)
+        other = self.client.get(reverse("auth-me"), headers={"Authorization": f"Bearer {other_token}"})
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+
+    @override_settings(RATE_LIMITS={"token": "1/min", "access_check": "3/min"})
+    def test_access_check_has_own_bucket(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_for_user(self.user)[0]}")
+        body = {"checks": [{"element": "orders", "action": "read"}]}
+
+        codes = [self.client.post(reverse("access-check"), body, format="json").status_code for _ in range(4)]
+
+        self.assertEqual(codes, [status.HTTP_200_OK] * 3 + [status.HTTP_429_TOO_MANY_REQUESTS])
+        # Ведро token не тронуто
+        self.assertEqual(self.client.get(reverse("auth-me")).status_code, status.HTTP_200_OK)
+
+    @override_settings(RATE_LIMITS={"token": "1/min"})
+    async def test_async_view_token_bucket(self):
+        token, _ = await sync_to_async(create_jwt_for_user)(self.user)
+        factory, view = AsyncRequestFactory(), AsyncMeView.as_view()
+        headers = {"Authorization": f"Bearer {token}"}
+
+        first = await view(factory.get("/api/auth/me/", headers=headers))
+        second = await view(factory.get("/api/auth/me/", headers=headers))
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(0 < int(second["Retry-After"]) <= 60)
+
+    def test_bucket_refills(self):
+        store = LocalBucketStore()
+
+        self.assertEqual(store.consume("k", 2, 1.0, now=100.0), 0.0)
+        self.assertEqual(store.consume("k", 2, 1.0, now=100.0), 0.0)
+        self.assertEqual(store.consume("k", 2, 1.0, now=100.0), 1.0)
+        self.assertAlmostEqual(store.consume("k", 2, 1.0, now=100.5), 0.5)
+        # Через секунду — ровно один токен
+        self.assertEqual(store.consume("k", 2, 1.0, now=101.0), 0.0)
+        self.assertEqual(store.consume("k", 2, 1.0, now=101.0), 1.0)
+
+    def test_sweep_drops_full_buckets(self):
+        store = LocalBucketStore(max_keys=2)
+        store.consume("a", 5, 1.0, now=0.0)
+        store.consume("b", 5, 1.0, now=0.0)
+        store.consume("c", 5, 10.0, now=5.0)
+
+        # Вёдра a и b к моменту 5.0 снова полные и не хранятся
+        self.assertEqual(len(store), 1)
+
+    def test_key_flood_keeps_exhausted_buckets(self):
+        store = LocalBucketStore(max_keys=10)
+        # Исчерпанное ведро жертвы: 2 токена, пополнение раз в 30 с
+        store.consume("victim", 2, 30.0, now=0.0)
+        store.consume("victim", 2, 30.0, now=0.0)
+
+        for i in range(50):
+            store.consume(f"flood-{i}", 2, 1.0, now=0.0)
+
+        self.assertLessEqual(len(store), 10)
+        self.assertEqual(store.consume("victim", 2, 30.0, now=0.0), 30.0)
+
+    @override_settings(RATE_LIMITS={"login_ip": "1/min", "login_email": "100/min"})
+    def test_rejected_login_skips_email_bucket(self):
+        self.client.post(reverse("auth-login"), self.login_data, format="json")
+        for i in range(3):
+            response = self.client.post(
+                reverse("auth-login"), {"email": f"spray{i}@example.com", "password": "x"}, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.assertFalse([key for key in local_bucket_store._tat if key.startswith("login_email:spray")])
+
+    def test_shared_bucket_across_processes(self):
+        cache = LocMemCache("ratelimit-tests", {})
+        self.addCleanup(cache.clear)
+        # Два «воркера» со своими локальными вёдрами и общим кэшем
+        first = SharedBucketStore(LocalBucketStore(), cache)
+        second = SharedBucketStore(LocalBucketStore(), cache)
+
+        self.assertEqual(first.consume("k", 2, 30.0, now=1000.0), 0.0)
+        self.assertEqual(second.consume("k", 2, 30.0, now=1000.0), 0.0)
+        self.assertEqual(first.consume("k", 2, 30.0, now=1000.0), 30.0)
+
+
+class PurgeAuthTokensTests(TestCase):
+    """
+    Проверяет пакетную очистку AuthToken: удаляются просроченные и отозванные,
+    активные остаются.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(email="purge@example.com", username="purge", password="x")
+        now = timezone.now()
+        past, future = now - timedelta(hours=1), now + timedelta(hours=1)
+        AuthToken.objects.bulk_create(
+            [AuthToken(user=user, expires_at=past) for _ in range(5)]
+            + [AuthToken(user=user, expires_at=future, is_revoked=True) for _ in range(3)]
+            + [AuthToken(user=user, expires_at=future) for _ in range(2)]
+        )
+
+    def test_purge_in_batches(self):
+        report = purge_auth_tokens(batch_size=3)
+
+        self.assertEqual(report["deleted"], 8)
+        self.assertEqual(report["batches"], 3)
+        self.assertEqual(AuthToken.objects.count(), 2)
+        self.assertFalse(AuthToken.objects.filter(is_revoked=True).exists())
+
+    def test_max_batches_limits_work(self):
+        report = purge_auth_tokens(batch_size=3, max_batches=1)
+
+        self.assertEqual(report["deleted"], 3)
+        self.assertEqual(AuthToken.objects.count(), 7)
+
+    def test_management_command_reports_rate(self):
+        out = io.StringIO()
+
+        call_command("purge_auth_tokens", "--batch-size=4", stdout=out)
+
+        self.assertIn("deleted=8 batches=2", out.getvalue())
+        self.assertIn("rows_per_second=", out.getvalue())
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ProvisionUsersTests(APITestCase):
+    """
+    Проверяет массовое создание пользователей: пачки, роль по умолчанию,
+    ошибки по строкам без прерывания загрузки.
+    """
+
+    CSV = (
+        "email,password,first_name\n"
+        "a@example.com,password123,Анна\n"
+        "b@example.com,short,Борис\n"
+        "not-an-email,password123,\n"
+        "taken@example.com,password123,\n"
+        "a@example.com,password123,Дубль\n"
+        "c@example.com,password123,Вера\n"
+    )
+
+    def setUp(self):
+        User.objects.create_user(email="taken@example.com", username="taken@example.com", password="x")
+
+    def test_command_creates_users_and_reports_errors(self):
+        path = self.tmp_file("users.csv", self.CSV)
+        out, err = io.StringIO(), io.StringIO()
+
+        call_command("provision_users", path, "--batch-size=2", "--executor=thread", stdout=out, stderr=err)
+
+        self.assertIn("created=2 failed=4", out.getvalue())
+        self.assertEqual(len(err.getvalue().splitlines()), 4)
+
+        anna = User.objects.get(email="a@example.com")
+        self.assertEqual(anna.first_name, "Анна")
+        self.assertTrue(anna.check_password("password123"))
+        self.assertEqual(
+            set(UserRole.objects.filter(user__email__in=["a@example.com", "c@example.com"])
+                .values_list("role__name", flat=True)),
+            {"user"},
+        )
+
+    def test_jsonl_with_process_pool(self):
+        path = self.tmp_file(
+            "users.jsonl",
+            '{"email": "p1@example.com", "password": "password123"}\n'
+            "{broken\n"
+            '{"email": "p2@example.com", "password": "password123"}\n',
+        )
+        out = io.StringIO()
+
+        call_command("provision_users", path, "--workers=2", stdout=out, stderr=io.StringIO())
+
+        self.assertIn("created=2 failed=1", out.getvalue())
+        self.assertTrue(User.objects.get(email="p2@example.com").check_password("password123"))
+
+    def test_jsonl_rows_with_wrong_types(self):
+        path = self.tmp_file(
+            "users.jsonl",
+            '{"email": 5, "password": "password123"}\n'
+            '{"email": "t1@example.com", "password": 12345678}\n'
+            '{"email": "t2@example.com", "password": "password123", "first_name": ["x"]}\n'
+            '{"email": "t3@example.com", "password": "password123", "first_name": "Тест"}\n',
+        )
+        out, err = io.StringIO(), io.StringIO()
+
+        call_command("provision_users", path, "--executor=thread", stdout=out, stderr=err)
+
+        self.assertIn("created=1 failed=3", out.getvalue())
+        self.assertEqual(User.objects.get(email="t3@example.com").first_name, "Тест")
+        self.assertFalse(User.objects.filter(email__in=["t1@example.com", "t2@example.com"]).exists())
+
+    def test_email_case_matches_login_and_existing_users(self):
+        path = self.tmp_file(
+            "users.csv",
+            "email,password\n"
+            "Mixed.Case@Example.com,password123\n"
+            "TAKEN@example.com,password123\n"
+            "mixed.case@example.com,password123\n",
+        )
+        out = io.StringIO()
+
+        call_command("provision_users", path, "--executor=thread", stdout=out, stderr=io.StringIO())
+
+        self.assertIn("created=1 failed=2", out.getvalue())
+        response = self.client.post(
+            reverse("auth-login"), {"email": "Mixed.Case@Example.com", "password": "password123"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_api_import_admin_only(self):
+        user = User.objects.create_user(email="plain@example.com", username="plain", password="x")
+        admin = User.objects.create_user(email="root@example.com", username="root", password="x")
+        UserRole.objects.create(user=admin, role=Role.objects.create(name="admin"))
+        url = reverse("auth-users-import")
+
+        def upload():
+            return {"file": io.BytesIO(self.CSV.encode("utf-8")), "format": "csv"}
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_for_user(user)[0]}")
+        self.assertEqual(self.client.post(url, upload(), format="multipart").status_code, 403)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_for_user(admin)[0]}")
+        response = self.client.post(url, upload(), format="multipart")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([e["line"] for e in response.data["errors"]], [3, 4, 5, 6])
+
+    def tmp_file(self, name, content):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+
+@override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])
+class MetricsTests(APITestCase):
+    """
+    Проверяет метрики: шардированные по потокам счётчики, причины отказов
+    аутентификации и текстовый вывод /metrics.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="metrics@example.com", username="metrics", password="x")
+
+    def test_counter_sums_thread_shards(self):
+        counter = metrics.Counter("test_events", "Тестовый счётчик", labelnames=("kind",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc("a")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc("b")
+
+        self.assertEqual(counter.collect(), {("a",): 4000, ("b",): 1})
+        # Шарды завершившихся потоков свёрнуты в общий итог
+        self.assertEqual(len(counter._shards), 1)
+
+    def test_histogram_buckets(self):
+        histogram = metrics.Histogram("test_seconds", "Тест", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        lines = histogram.expose()
+
+        self.assertIn('test_seconds_bucket{le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{le="1.0"} 3', lines)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn("test_seconds_count 4", lines)
+
+    def test_auth_failures_by_reason(self):
+        before = metrics.auth_failures.collect()
+        token, token_obj = create_jwt_for_user(self.user)
+        token_obj.is_revoked = True
+        token_obj.save()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.client.get(reverse("auth-me"))
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer garbage")
+        self.client.get(reverse("auth-me"))
+
+        after = metrics.auth_failures.collect()
+        self.assertEqual(after.get(("revoked",), 0) - before.get(("revoked",), 0), 1)
+        self.assertEqual(after.get(("invalid",), 0) - before.get(("invalid",), 0), 1)
+
+    def test_metrics_endpoint(self):
+        token, _ = create_jwt_for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.client.get(reverse("auth-me"))
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn("# TYPE auth_jwt_decode_seconds histogram", body)
+        self.assertIn("# TYPE auth_failures_total counter", body)
+        self.assertNotIn("# TYPE auth_failures counter", body)
+        self.assertIn('auth_token_lookup_seconds_count{source="db"}', body)
+        self.assertIn('http_view_latency_seconds_count{view="auth-me",method="GET"}', body)
+
+    def test_unknown_methods_share_one_series(self):
+        self.client.generic("BREW", reverse("auth-me"))
+        self.client.generic("PROPFIND", reverse("auth-me"))
+
+        series = [labels for labels in metrics.view_latency_seconds.collect() if labels[0] == "auth-me"]
+        self.assertIn(("auth-me", "other"), series)
+        self.assertFalse({"BREW", "PROPFIND"} & {method for _, method in series})
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_metrics_endpoint_disabled(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN=None)
+    def test_metrics_closed_without_access_settings(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"], METRICS_TOKEN="scrape-secret")
+    def test_metrics_access_by_token_or_ip(self):
+        url = reverse("metrics")
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer scrape-secret").status_code, 200)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR="10.0.0.5").status_code, 200)
+
+
+@override_settings(ALLOWED_HOSTS=["localhost"])
+class LoadTestHarnessTests(TransactionTestCase):
+    """
+    Проверяет нагрузочный прогон (em_auth/loadtest.py) на маленьком объёме:
+    все шаги сценария отвечают ожидаемыми кодами, отчёт пишется в JSON
+    и сравнивается с прошлым.
+    """
+
+    def setUp(self):
+        seed_access_rules()
+
+    def test_wsgi_and_asgi_flows(self):
+        for server in ("wsgi", "asgi"):
+            with self.subTest(server=server):
+                report = run_loadtest(
+                    server=server, concurrency=1, iterations=2, fast_hasher=True, use_current_db=True
+                )
+
+                self.assertEqual(report["total_requests"], 10)
+                for step, summary in report["endpoints"].items():
+                    self.assertEqual(summary["errors"], 0, msg=step)
+                    self.assertGreater(summary["queries_per_request"], 0, msg=step)
+                    self.assertLessEqual(summary["p50_ms"], summary["p99_ms"])
+
+    def test_command_saves_and_compares(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "baseline.json")
+        args = ["--concurrency=1", "--iterations=1", "--fast-hasher", "--use-current-db"]
+
+        call_command("loadtest", *args, f"--output={path}", stdout=io.StringIO())
+        out = io.StringIO()
+        call_command("loadtest", *args, f"--compare={path}", stdout=out)
+
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["meta"]["server"], "wsgi")
+        self.assertIn("me: p95", out.getvalue())
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Бюджеты SQL-запросов эндпоинтов accounts. Условия — самые дорогие из
+    обычных: кэш токенов пуст, матрица прав уже собрана. N+1 (например,
+    UserSerializer.get_role, дочитывающий user_role.role) выводит за бюджет.
+    """
+
+    QUERY_BUDGETS = {
+        "auth-login": 2,  # пользователь + INSERT AuthToken
+        "auth-me": 1,  # AuthToken вместе с user и user_role
+        "auth-verify": 1,
+        "auth-logout": 2,  # AuthToken + UPDATE is_revoked
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="budget@example.com", username="budget", password="budgetpass123")
+        UserRole.objects.create(user=self.user, role=Role.objects.create(name="user"))
+        self.token, _ = create_jwt_for_user(self.user)
+        permission_matrix.build()
+
+    def assertWithinBudget(self, name, request):
+        token_cache.clear()
+        user_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        self.assertLess(response.status_code, 300, msg=name)
+        self.assertLessEqual(
+            len(queries),
+            self.QUERY_BUDGETS[name],
+            msg=f"{name}: " + "\n".join(q["sql"] for q in queries.captured_queries),
+        )
+
+    def test_login(self):
+        self.assertWithinBudget("auth-login", lambda: self.client.post(
+            reverse("auth-login"), {"email": "budget@example.com", "password": "budgetpass123"}, format="json"
+        ))
+
+    def test_authenticated_endpoints(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.assertWithinBudget("auth-me", lambda: self.client.get(reverse("auth-me")))
+        self.assertWithinBudget("auth-verify", lambda: self.client.get(reverse("auth-verify")))
+        self.assertWithinBudget("auth-logout", lambda: self.client.post(reverse("auth-logout")))
+
+
+def add_sqlite_database(alias, name):
+    """
+    Регистрирует ещё одну SQLite-БД на время теста (копия настроек default с другим файлом).
+    """
+    connections.settings[alias] = {**connections.settings["default"], "NAME": name}
+
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+@override_settings(DATABASE_READ_REPLICA="test_replica")
+class ReadReplicaRouterTests(TransactionTestCase):
+    """
+    Проверяет ReadReplicaRouter на двух SQLite-БД: default и replica (отдельный файл,
+    в который не реплицируется ничего — так видно, откуда читали):
+    - чтения токенов/ролей идут в реплику, остальное — в основную БД;
+    - после записи чтения до конца запроса идут в основную БД;
+    - токен, которого ещё нет в реплике, находится в основной;
+    - недоступная реплика — чтения из основной БД.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Тестовый раннер знает только алиасы из settings, поэтому реплику
+        # регистрируем здесь и только потом разрешаем классу к ней обращаться
+        cls.tmp_dir = tempfile.mkdtemp(prefix="replica-")
+        add_sqlite_database("test_replica", os.path.join(cls.tmp_dir, "replica.sqlite3"))
+        cls.databases = {"default", "test_replica"}
+        super().setUpClass()
+        call_command("migrate", database="test_replica", verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        remove_database("test_replica")
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def setUp(self):
+        replica_health.reset()
+        token_cache.clear()
+        user_cache.clear()
+        me_cache.clear()
+        with primary_pinning_scope():
+            self.user = User.objects.create_user(email="replica@example.com", username="replica", password="replica123")
+            self.role = Role.objects.create(name="user")
+            self.user_role = UserRole.objects.create(user=self.user, role=self.role)
+            self.token, self.token_obj = create_jwt_for_user(self.user)
+
+    def copy_to_replica(self):
+        for obj in (User.objects.using("default").get(pk=self.user.pk), self.role, self.user_role, self.token_obj):
+            type(obj).objects.using("test_replica").bulk_create([obj])
+
+    def test_reads_go_to_replica_until_write(self):
+        Role.objects.using("test_replica").create(name="only-in-replica")
+
+        with primary_pinning_scope():
+            self.assertTrue(Role.objects.filter(name="only-in-replica").exists())
+            self.assertEqual(Order.objects.db, "default")
+            Role.objects.create(name="write")
+            self.assertTrue(is_pinned())
+            self.assertFalse(Role.objects.filter(name="only-in-replica").exists())
+
+        with primary_pinning_scope(), transaction.atomic():
+            self.assertEqual(Role.objects.db, "default")
+
+    def test_logout_pins_rest_of_request(self):
+        self.copy_to_replica()
+        reads_after_write = []
+
+        def on_save(sender, instance, **kwargs):
+            reads_after_write.append(AuthToken.objects.db)
+
+        post_save.connect(on_save, sender=AuthToken)
+        try:
+            with primary_pinning_scope(), CaptureQueriesContext(connections["test_replica"]) as replica_queries:
+                response = self.client.post(reverse("auth-logout"), headers={"Authorization": f"Bearer {self.token}"})
+                self.assertFalse(is_pinned())
+        finally:
+            post_save.disconnect(on_save, sender=AuthToken)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreaterEqual(len(replica_queries), 1)  # токен прочитан из реплики
+        self.assertEqual(reads_after_write, ["default"])
+        self.assertTrue(AuthToken.objects.using("default").get(pk=self.token_obj.pk).is_revoked)
+
+    def test_token_missing_in_replica_is_found_on_primary(self):
+        with primary_pinning_scope():
+            response = self.client.get(reverse("auth-me"), headers={"Authorization": f"Bearer {self.token}"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], "replica@example.com")
+
+    def test_access_check_finds_token_and_user_missing_in_replica(self):
+        checks = [
+            {"element": "orders", "action": "read", "token": self.token},
+            {"element": "orders", "action": "read", "user_id": self.user.pk},
+        ]
+
+        with primary_pinning_scope():
+            results = resolve_checks(self.user, checks)
+
+        self.assertEqual([result["user_id"] for result in results], [self.user.pk, self.user.pk])
+        self.assertEqual([result.get("error") for result in results], [None, None])
+
+    def test_failover_when_replica_unavailable(self):
+        add_sqlite_database("broken", os.path.join(self.tmp_dir, "missing", "db.sqlite3"))
+        before = metrics.db_replica_failovers.collect().get((), 0)
+        try:
+            with override_settings(DATABASE_READ_REPLICA="broken"), primary_pinning_scope(), \
+                    mock.patch.object(type(self), "databases", {"default", "test_replica", "broken"}):
+                self.assertEqual(Role.objects.db, "default")
+                self.assertEqual(Role.objects.db, "default")
+                self.assertEqual(Role.objects.get(name="user").pk, self.role.pk)
+        finally:
+            remove_database("broken")
+
+        # Вторая попытка — уже без подключения: реплика помечена недоступной
+        self.assertEqual(metrics.db_replica_failovers.collect().get((), 0), before + 1)
+
+
+class DatabaseProfileTests(TestCase):
+    """
+    Проверяет профили БД: dev — настройки Django по умолчанию, production —
+    постоянные соединения, WAL-прагмы при подключении и пул для PostgreSQL.
+    """
+
+    def test_sqlite_production_pragmas_applied_on_connect(self):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+
+        tmp_dir = tempfile.mkdtemp(prefix="profile-")
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        config = sqlite_database(os.path.join(tmp_dir, "db.sqlite3"), "production")
+        self.assertEqual(config["CONN_MAX_AGE"], 600)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+
+        wrapper = DatabaseWrapper({**connections.settings["default"], **config}, alias="profile")
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "synchronous", "busy_timeout")
+            }
+        self.assertEqual(pragmas, {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000})
+
+    def test_dev_profile_is_django_default(self):
+        self.assertEqual(
+            sqlite_database("db.sqlite3"),
+            {"ENGINE": "django.db.backends.sqlite3", "NAME": "db.sqlite3"},
+        )
+
+    def test_postgres_production_uses_pool(self):
+        env = {"POSTGRES_DB": "auth", "POSTGRES_POOL_MAX": "20"}
+        pooled = postgres_database("production", env=env)
+        self.assertEqual(pooled["OPTIONS"]["pool"]["max_size"], 20)
+        self.assertNotIn("CONN_MAX_AGE", pooled)
+
+        persistent = postgres_database("production", env={**env, "POSTGRES_POOL": "0"})
+        self.assertNotIn("OPTIONS", persistent)
+        self.assertTrue(persistent["CONN_HEALTH_CHECKS"])
+
+
+class ApiProfileTests(APITestCase):
+    """
+    Проверяет API-профиль (em_auth.settings_api): без админки, сессий и сообщений,
+    а сценарий регистрация -> логин -> /me работает с его middleware и URLconf.
+    """
+
+    def test_profile_drops_session_machinery(self):
+        from em_auth import settings_api
+
+        for app in ("django.contrib.admin", "django.contrib.sessions", "django.contrib.messages"):
+            self.assertNotIn(app, settings_api.INSTALLED_APPS)
+        self.assertNotIn("django.contrib.sessions.middleware.SessionMiddleware", settings_api.MIDDLEWARE)
+        self.assertIn("accounts", settings_api.INSTALLED_APPS)
+
+    def test_api_flow_with_profile_middleware(self):
+        from em_auth import settings_api
+
+        with override_settings(ROOT_URLCONF=settings_api.ROOT_URLCONF, MIDDLEWARE=settings_api.MIDDLEWARE):
+            self.client.post(reverse("auth-register"), {
+                "email": "lean@example.com", "password": "leanpass123", "password2": "leanpass123",
+            }, format="json")
+            token = self.client.post(
+                reverse("auth-login"), {"email": "lean@example.com", "password": "leanpass123"}, format="json"
+            ).data["access"]
+            response = self.client.get(reverse("auth-me"), headers={"Authorization": f"Bearer {token}"})
+            admin_response = self.client.get("/admin/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], "lean@example.com")
+        self.assertEqual(admin_response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_startup_probe(self):
+        report = measure_profile("api", runs=1, rounds=2)
+
+        self.assertEqual(report["status"], status.HTTP_200_OK)
+        self.assertGreater(report["process_ms"], report["setup_ms"])
+        self.assertNotIn("django.contrib.sessions.middleware.SessionMiddleware", report["middleware"])
+
+
+class CoreBenchmarkTests(TestCase):
+    """
+    Микро-бенчмарки горячего пути (em_auth/microbench.py) запускаются
+    и дают осмысленные цифры.
+    """
+
+    def test_run_core_benchmarks(self):
+        results = run_core_benchmarks(rounds=2)
+
+        self.assertIn("JWTAuthentication.authenticate", results)
+        self.assertIn("UserSerializer.data", results)
+        for name, result in results.items():
+            self.assertGreater(result["ops"], 0, msg=name)
+            self.assertLessEqual(result["min_us"], result["mean_us"], msg=name)
+
+    def test_authenticate_with_warm_cache_makes_no_queries(self):
+        benchmarks = core_benchmarks()
+
+        with self.assertNumQueries(0):
+            benchmarks["JWTAuthentication.authenticate"]()
+            benchmarks["get_rule_for"]()
+            benchmarks["UserSerializer.data"]()
+
+
+class GenerateDatasetTests(TestCase):
+    """
+    Проверяет генератор синтетических данных: объёмы по scale,
+    воспроизводимость по seed и отказ при повторном префиксе.
+    """
+
+    def snapshot(self, prefix):
+        return (
+            list(User.objects.filter(email__startswith=prefix).order_by("id").values_list("first_name", "last_name")),
+            list(AccessRoleRule.objects.filter(role__name__startswith=prefix).order_by("id").values_list(
+                "role__name", "element__code", "read_permission", "delete_all_permission",
+            )),
+            list(AuthToken.objects.filter(user__email__startswith=prefix).order_by("id").values_list("expires_at", "is_revoked")),
+        )
+
+    def test_generate_and_reproduce(self):
+        out = io.StringIO()
+        call_command("generate_dataset", "--scale=0.01", "--seed=7", "--prefix=a", "--batch-size=30", stdout=out)
+        generate_dataset(scale=0.01, seed=7, prefix="b", batch_size=1000)
+
+        self.assertEqual(User.objects.filter(email__startswith="a-").count(), 100)
+        self.assertEqual(Role.objects.filter(name__startswith="a-").count(), 5)
+        self.assertEqual(UserRole.objects.filter(user__email__startswith="a-").count(), 100)
+        self.assertTrue(User.objects.get(email="a-0@example.com").check_password("password123"))
+        self.assertIn("rows_per_second=", out.getvalue())
+
+        # Тот же seed — те же данные, независимо от размера пачки
+        a, b = self.snapshot("a-"), self.snapshot("b-")
+        self.assertEqual(a[0], b[0])
+        self.assertEqual([row[2:] for row in a[1]], [row[2:] for row in b[1]])
+        self.assertEqual([row[1] for row in a[2]], [row[1] for row in b[2]])
+
+    def test_prefix_must_be_new(self):
+        generate_dataset(scale=0.001, prefix="dup")
+        with self.assertRaises(CommandError):
+            call_command("generate_dataset", "--scale=0.001", "--prefix=dup", stdout=io.StringIO())
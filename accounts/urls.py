@@ -1,11 +1,31 @@
 # accounts/urls.py
+from django.conf import settings
 from django.urls import path
 
-from .views import LoginView, LogoutView, MeView, RegisterView
+from .views import (
+    AsyncMeView,
+    JWKSView,
+    LoginView,
+    LogoutAllView,
+    LogoutView,
+    MeView,
+    RegisterView,
+    UserImportView,
+    VerifyView,
+)
+
+if getattr(settings, "API_ASYNC_VIEWS", False):
+    me_view = AsyncMeView.as_view()
+else:
+    me_view = MeView.as_view()
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="auth-register"),
     path("login/", LoginView.as_view(), name="auth-login"),
     path("logout/", LogoutView.as_view(), name="auth-logout"),
-    path("me/", MeView.as_view(), name="auth-me"),
+    path("logout-all/", LogoutAllView.as_view(), name="auth-logout-all"),
+    path("me/", me_view, name="auth-me"),
+    path("verify/", VerifyView.as_view(), name="auth-verify"),
+    path("jwks/", JWKSView.as_view(), name="auth-jwks"),
+    path("users/import/", UserImportView.as_view(), name="auth-users-import"),
 ]
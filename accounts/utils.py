@@ -1,35 +1,76 @@
 # accounts/utils.py
+import time
 from datetime import timedelta
 from django.urls import path
 import jwt
 from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, router, transaction
+from django.db.models import Q
 from django.utils import timezone
+
+from access_control.matrix import permission_matrix
+from access_control.utils import get_role_id
+from em_auth.metrics import jwt_decode_seconds
+
+from .keys import get_active_key, get_verification_key
 from .models import AuthToken
 
 
+def is_stateless_mode() -> bool:
+    return getattr(settings, "JWT_STATELESS", False)
+
+
 def create_jwt_for_user(user):
     """
     Создаёт запись AuthToken в БД и генерирует JWT.
+
+    В stateless-режиме (JWT_STATELESS = True) запись в БД не создаётся:
+    возвращается несохранённый AuthToken, а валидность токена проверяется
+    по iat и эпохе отзыва пользователя (User.tokens_valid_after).
     """
     lifetime = getattr(settings, "JWT_ACCESS_TOKEN_LIFETIME", timedelta(hours=1))
-    expires_at = timezone.now() + lifetime
+    issued_at = timezone.now()
+    expires_at = issued_at + lifetime
 
-    token_obj = AuthToken.objects.create(
-        user=user,
-        expires_at=expires_at,
-    )
+    if is_stateless_mode():
+        token_obj = AuthToken(user=user, created_at=issued_at, expires_at=expires_at)
+    else:
+        token_obj = AuthToken.objects.create(
+            user=user,
+            expires_at=expires_at,
+        )
 
     payload = {
         "sub": str(user.id),
         "jti": str(token_obj.jti),
+        # float, а не datetime: PyJWT округлил бы до секунд,
+        # и токен, выданный в ту же секунду после отзыва, считался бы отозванным
+        "iat": issued_at.timestamp(),
         "exp": expires_at,  # PyJWT умеет работать с datetime
     }
+    if is_stateless_mode():
+        payload["stateless"] = True
 
-    encoded = jwt.encode(
-        payload,
-        settings.JWT_SECRET_KEY,
-        algorithm=settings.JWT_ALGORITHM,
-    )
+    if getattr(settings, "JWT_EMBED_PERMISSIONS", False):
+        role_id = get_role_id(user)
+        if role_id is not None:
+            payload["acl"] = permission_matrix.get_claim(role_id)
+
+    signing_key = get_active_key()
+    if signing_key is not None:
+        encoded = jwt.encode(
+            payload,
+            signing_key.private_key,
+            algorithm=signing_key.algorithm,
+            headers={"kid": signing_key.kid},
+        )
+    else:
+        encoded = jwt.encode(
+            payload,
+            settings.JWT_SECRET_KEY,
+            algorithm=settings.JWT_ALGORITHM,
+        )
 
     # В PyJWT 2.x возвращает str, в 1.x — bytes. Приведём к str на всякий случай.
     if isinstance(encoded, bytes):
@@ -38,14 +79,113 @@ def create_jwt_for_user(user):
     return encoded, token_obj
 
 
+def revoke_all_tokens(user, extra_update_fields=()):
+    """
+    «Выход со всех устройств»: сдвигает эпоху отзыва пользователя.
+    Все токены, выпущенные раньше, перестают приниматься — и stateless,
+    и хранящиеся в БД.
+
+    В обычном режиме дополнительно помечаем строки AuthToken отозванными,
+    чтобы is_revoked в БД оставался правдой; в stateless-режиме этот UPDATE не нужен.
+    """
+    user.tokens_valid_after = timezone.now()
+    user.save(update_fields=["tokens_valid_after", *extra_update_fields])
+
+    if not is_stateless_mode():
+        AuthToken.objects.filter(user=user, is_revoked=False).update(is_revoked=True)
+
+
+DENYLIST_KEY_PREFIX = "jwt:denylist:"
+
+
+def get_denylist_cache():
+    return caches[getattr(settings, "JWT_DENYLIST_CACHE", "default")]
+
+
+def revoke_stateless_token(payload):
+    """
+    Выход с одного устройства для stateless-токена: jti попадает в денилист
+    (JWT_DENYLIST_CACHE) до истечения срока токена, остальные сессии не затрагиваются.
+    """
+    timeout = int(payload["exp"] - time.time()) + 1
+    if timeout > 0:
+        get_denylist_cache().set(DENYLIST_KEY_PREFIX + str(payload["jti"]), True, timeout=timeout)
+
+
+def is_token_denylisted(jti) -> bool:
+    return get_denylist_cache().get(DENYLIST_KEY_PREFIX + str(jti), False)
+
+
 def decode_jwt(token: str) -> dict:
     """
     Декодирует JWT и возвращает payload.
     Исключения (ExpiredSignatureError, InvalidTokenError) пусть ловит аутентификатор.
+
+    Токен с заголовком kid проверяется публичным ключом из JWT_SIGNING_KEYS,
+    токен без kid — по-старому, через JWT_SECRET_KEY.
+    """
+    with jwt_decode_seconds.time():
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is not None:
+            key = get_verification_key(kid)
+            if key is None:
+                raise jwt.InvalidTokenError(f"Неизвестный kid: {kid}")
+            return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
+        return jwt.decode(
+            token,
+            settings.JWT_SECRET_KEY,
+            algorithms=[settings.JWT_ALGORITHM],
+        )
+
+
+def purge_auth_tokens(batch_size=1000, max_batches=None, pause=0.0):
     """
-    return jwt.decode(
-        token,
-        settings.JWT_SECRET_KEY,
-        algorithms=[settings.JWT_ALGORITHM],
-    )
+    Удаляет просроченные и отозванные AuthToken пачками по batch_size строк.
 
+    Каждая пачка — отдельная короткая транзакция: берём следующие id
+    по первичному ключу (WHERE id > последний ORDER BY id LIMIT n) и удаляем
+    их одним DELETE ... WHERE id IN (...). Блокировки держатся недолго,
+    а между пачками можно сделать паузу (pause, секунды).
+
+    Сигналы post_delete намеренно не отправляются: закэшированные снимки
+    таких токенов и так не пройдут проверку (отозван / истёк).
+
+    Возвращает {"deleted", "batches", "seconds", "rows_per_second"}.
+    """
+    db = router.db_for_write(AuthToken)
+    connection = connections[db]
+    table = connection.ops.quote_name(AuthToken._meta.db_table)
+    pk_column = connection.ops.quote_name(AuthToken._meta.pk.column)
+
+    started = time.perf_counter()
+    deleted = 0
+    batches = 0
+    last_id = 0
+
+    while max_batches is None or batches < max_batches:
+        stale = AuthToken.objects.using(db).filter(
+            Q(expires_at__lte=timezone.now()) | Q(is_revoked=True),
+            id__gt=last_id,
+        )
+        ids = list(stale.order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            break
+
+        placeholders = ", ".join(["%s"] * len(ids))
+        with transaction.atomic(using=db), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE {pk_column} IN ({placeholders})", ids)
+            deleted += cursor.rowcount
+
+        batches += 1
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+
+    seconds = time.perf_counter() - started
+    return {
+        "deleted": deleted,
+        "batches": batches,
+        "seconds": seconds,
+        "rows_per_second": deleted / seconds if seconds else 0.0,
+    }
@@ -1,17 +1,41 @@
 # accounts/views.py
+import io
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.functional import cached_property
+from django.utils.http import parse_etags
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from access_control.matrix import permission_matrix
+from access_control.permissions import IsAdminRolePermission
+from access_control.utils import aload_user_role, get_role_id
+from em_auth.renderers import FastJSONRenderer
+
+from .authentication import JWTAuthentication
+from .cache import me_cache
+from .keys import get_jwks
 from .models import AuthToken
+from .ratelimit import LoginEmailThrottle, LoginIPThrottle, consume, token_key
 from .serializers import (
     LoginSerializer,
     RegisterSerializer,
     UpdateUserSerializer,
     UserSerializer,
 )
-from .utils import create_jwt_for_user
+from .utils import create_jwt_for_user, revoke_all_tokens, revoke_stateless_token
 
 
 class RegisterView(APIView):
@@ -34,9 +58,13 @@ class LoginView(APIView):
     """
     POST /api/auth/login/
     Логин по email + пароль. Возвращает access-токен.
+
+    Вёдра на IP и на email проверяются до LoginSerializer: при пустом
+    ведре — 429 + Retry-After без хэширования пароля.
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
 
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -60,6 +88,9 @@ class LogoutView(APIView):
     """
     POST /api/auth/logout/
     Отзывает текущий токен.
+
+    Stateless-токен (записи в БД нет) попадает в денилист по jti до истечения
+    срока; другие сессии пользователя продолжают работать.
     """
 
     permission_classes = [IsAuthenticated]
@@ -69,12 +100,75 @@ class LogoutView(APIView):
         if isinstance(token_obj, AuthToken):
             token_obj.is_revoked = True
             token_obj.save(update_fields=["is_revoked"])
+        else:
+            revoke_stateless_token(token_obj)
         return Response({"detail": "Вы вышли из системы"}, status=status.HTTP_200_OK)
 
 
+class LogoutAllView(APIView):
+    """
+    POST /api/auth/logout-all/
+    Отзывает все токены пользователя (выход со всех устройств).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke_all_tokens(request.user)
+        return Response(
+            {"detail": "Вы вышли со всех устройств"},
+            status=status.HTTP_200_OK,
+        )
+
+
+class PreRenderedJSONResponse(HttpResponse):
+    """
+    Ответ с уже готовым JSON. .data, как у DRF Response, разбирает тело
+    лениво — для тестов и middleware, которые к нему обращаются.
+    """
+
+    def __init__(self, content=b"", **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content, **kwargs)
+
+    @cached_property
+    def data(self):
+        return json.loads(self.content) if self.content else None
+
+
+def render_me(user) -> tuple:
+    """
+    (ETag, JSON) ответа /api/auth/me/ из me_cache; при промахе — через
+    UserSerializer, и результат кладётся в кэш.
+    """
+    entry = me_cache.get_response(user.pk)
+    if entry is None:
+        body = FastJSONRenderer().render(UserSerializer(user).data)
+        entry = me_cache.put_response(user.pk, body)
+    return entry
+
+
+def me_response(request, entry) -> PreRenderedJSONResponse:
+    """
+    200 с готовым JSON или 304, если If-None-Match совпал с ETag.
+    Ответ приватный и всегда перепроверяется клиентом.
+    """
+    etag, body = entry
+    # If-None-Match сравнивается слабо (RFC 9110): W/"x" совпадает с "x"
+    client_etags = {tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))}
+    if etag in client_etags or "*" in client_etags:
+        response = PreRenderedJSONResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = PreRenderedJSONResponse(body)
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ["Authorization"])
+    return response
+
+
 class MeView(APIView):
     """
-    GET /api/auth/me/      — получить свои данные
+    GET /api/auth/me/      — получить свои данные (ETag, 304 по If-None-Match)
     PATCH /api/auth/me/    — обновить свои данные
     DELETE /api/auth/me/   — мягкое удаление (is_active=False)
     """
@@ -82,8 +176,7 @@ class MeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        serializer = UserSerializer(request.user)
-        return Response(serializer.data)
+        return me_response(request, render_me(request.user))
 
     def patch(self, request):
         serializer = UpdateUserSerializer(
@@ -98,13 +191,214 @@ class MeView(APIView):
     def delete(self, request):
         user = request.user
         user.is_active = False
-        user.save(update_fields=["is_active"])
 
-        # Отзываем все активные токены
-        AuthToken.objects.filter(user=user, is_revoked=False).update(is_revoked=True)
+        # Отзываем все активные токены (сдвигом эпохи, тем же save)
+        revoke_all_tokens(user, extra_update_fields=["is_active"])
 
         return Response(
             {"detail": "Пользователь деактивирован"},
             status=status.HTTP_200_OK,
         )
 
+
+class JWKSView(APIView):
+    """
+    GET /api/auth/jwks/
+    Публичные ключи подписи (JWK Set) — другие сервисы проверяют токены
+    локально, без запроса к этому приложению. Ответ можно кэшировать.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        response = Response(get_jwks())
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=getattr(settings, "JWT_JWKS_MAX_AGE", 300),
+        )
+        return response
+
+
+class UserImportView(APIView):
+    """
+    POST /api/auth/users/import/   (multipart: file, format=csv|jsonl)
+    Массовое создание пользователей с ролью user.
+
+    Файл читается построчно, пароли хэшируются в пуле, пользователи
+    вставляются пачками. В ответе — счётчики, скорость и ошибки по строкам.
+    Только для admin.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminRolePermission]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "Файл не передан"})
+
+        fmt = request.data.get("format")
+        if fmt is None:
+            fmt = "csv" if upload.name.lower().endswith(".csv") else "jsonl"
+        if fmt not in ("csv", "jsonl"):
+            raise ValidationError({"format": "Ожидается csv или jsonl"})
+
+        # Импорт здесь: модуль нужен только этому редкому admin-эндпоинту
+        from .provisioning import UserProvisioner, iter_records
+
+        # Пароли — в общем hashing_pool: при перегрузке 503, как у логина
+        provisioner = UserProvisioner(batch_size=getattr(settings, "USER_PROVISIONING_BATCH_SIZE", 1000))
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        try:
+            report = provisioner.run(iter_records(stream, fmt))
+        except UnicodeDecodeError:
+            raise ValidationError({"file": "Файл должен быть в UTF-8"})
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class VerifyView(View):
+    """
+    GET /api/auth/verify/
+    Проверка токена для auth_request nginx (и других шлюзов), в обход DRF:
+    204 + X-User-Id / X-User-Role, если токен валиден, иначе 401 без тела.
+
+    Токен проверяется тем же JWTAuthentication, что и в API (подпись, срок,
+    отзыв, деактивация пользователя). Имя роли — из матрицы прав, так что
+    при тёплых кэшах запросов в БД нет.
+
+    Ведро на токен здесь не проверяется: auth_request понимает только
+    2xx / 401 / 403, частоту на шлюзе ограничивает nginx (limit_req).
+    """
+
+    http_method_names = ["get", "head"]
+    authenticator_class = JWTAuthentication
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def get(self, request):
+        authenticator = self.authenticator_class()
+        try:
+            result = authenticator.authenticate(request)
+        except AuthenticationFailed:
+            result = None
+
+        if result is None:
+            response = HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+            response["WWW-Authenticate"] = authenticator.keyword
+            return response
+
+        user = result[0]
+        role = permission_matrix.get_role_name(get_role_id(user))
+
+        response = HttpResponse(status=status.HTTP_204_NO_CONTENT)
+        response["X-User-Id"] = str(user.pk)
+        if role is not None:
+            response["X-User-Role"] = role
+        return response
+
+
+class AsyncJWTView(View):
+    """
+    Базовый async-view для ASGI (API_ASYNC_VIEWS = True).
+
+    Аутентифицирует через JWTAuthentication.aauthenticate и отвечает
+    в том же формате, что и DRF-views: JSON, ошибки — {"detail": ...}.
+    Ведро на токен (RATE_LIMITS["token"]) — как TokenThrottle у DRF-views.
+    Обработчики методов в наследниках должны быть async.
+    """
+
+    authenticator_class = JWTAuthentication
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Как и у APIView: аутентификация только по заголовку, CSRF не нужен
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        authenticator = self.authenticator_class()
+        try:
+            result = await authenticator.aauthenticate(request)
+        except AuthenticationFailed as exc:
+            return self.auth_error(request, authenticator, exc.detail)
+
+        if result is None:
+            return self.auth_error(request, authenticator, NotAuthenticated.default_detail)
+
+        request.user, request.auth = result
+        wait = consume("token", token_key(request.auth))
+        if wait:
+            return self.throttled(wait)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def throttled(self, wait):
+        response = self.json_response(
+            {"detail": f"Request was throttled. Expected available in {math.ceil(wait)} seconds."},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+        response["Retry-After"] = str(math.ceil(wait))
+        return response
+
+    def auth_error(self, request, authenticator, detail):
+        # Как в DRF: 401 только если схема умеет отдавать WWW-Authenticate
+        header = authenticator.authenticate_header(request)
+        response = self.json_response(
+            {"detail": detail},
+            status=status.HTTP_401_UNAUTHORIZED if header else status.HTTP_403_FORBIDDEN,
+        )
+        if header:
+            response["WWW-Authenticate"] = header
+        return response
+
+    def json_response(self, data, status=status.HTTP_200_OK):
+        return JsonResponse(
+            data,
+            status=status,
+            safe=False,
+            encoder=DjangoJSONEncoder,
+            json_dumps_params={"ensure_ascii": False},
+        )
+
+
+class AsyncMeView(AsyncJWTView):
+    """
+    Async-версия MeView (GET / PATCH / DELETE /api/auth/me/).
+    """
+
+    async def get(self, request):
+        entry = me_cache.get_response(request.user.pk)
+        if entry is None:
+            await aload_user_role(request.user)
+            entry = render_me(request.user)
+        return me_response(request, entry)
+
+    async def patch(self, request):
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return self.json_response(
+                {"detail": "Некорректный JSON"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        user = request.user
+        serializer = UpdateUserSerializer(user, data=data, partial=True)
+        if not serializer.is_valid():
+            return self.json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        for field, value in serializer.validated_data.items():
+            setattr(user, field, value)
+        await user.asave(update_fields=list(serializer.validated_data) or None)
+
+        await aload_user_role(user)
+        return self.json_response(UserSerializer(user).data)
+
+    async def delete(self, request):
+        user = request.user
+        user.is_active = False
+        await sync_to_async(revoke_all_tokens)(user, extra_update_fields=["is_active"])
+
+        return self.json_response({"detail": "Пользователь деактивирован"})
@@ -0,0 +1,12 @@
+"""
+ASGI-приложение для API-подов: профиль em_auth.settings_api
+(без админки, сессий и сообщений).
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'em_auth.settings_api')
+
+application = get_asgi_application()
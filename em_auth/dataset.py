@@ -0,0 +1,177 @@
+# em_auth/dataset.py
+import math
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from access_control.matrix import FLAG_FIELDS, permission_matrix
+from access_control.models import AccessRoleRule, BusinessElement, Role, UserRole
+from accounts.models import AuthToken
+from mock_business.models import Order
+
+# Объёмы при scale=1. Пользователи, токены и заказы растут линейно,
+# роли и элементы — как sqrt(scale), чтобы матрица правил оставалась реалистичной
+# (scale=100: 1 млн пользователей, ~2.5 млн токенов, 500 ролей x 1000 элементов).
+BASE_USERS = 10_000
+BASE_ROLES = 50
+BASE_ELEMENTS = 100
+MAX_TOKENS_PER_USER = 5
+MAX_ORDERS_PER_USER = 6
+RULE_DENSITY = 0.5  # доля пар роль x элемент, для которых есть правило
+
+FIRST_NAMES = ("Иван", "Анна", "Пётр", "Мария", "Сергей", "Ольга", "Дмитрий", "Елена", "Алексей", "Наталья")
+LAST_NAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов")
+ORDER_WORDS = ("Поставка", "Ремонт", "Доставка", "Монтаж", "Консультация", "Аренда", "Подписка")
+
+
+def dataset_volumes(scale: float) -> dict:
+    root = math.sqrt(scale)
+    return {
+        "users": max(1, round(BASE_USERS * scale)),
+        "roles": max(1, round(BASE_ROLES * root)),
+        "elements": max(1, round(BASE_ELEMENTS * root)),
+    }
+
+
+class _Progress:
+    def __init__(self):
+        self.tables = {}
+
+    def add(self, table, rows, seconds):
+        stats = self.tables.setdefault(table, {"rows": 0, "seconds": 0.0})
+        stats["rows"] += rows
+        stats["seconds"] += seconds
+
+    def report(self, seconds) -> dict:
+        for stats in self.tables.values():
+            stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+        total = sum(stats["rows"] for stats in self.tables.values())
+        return {
+            "tables": self.tables,
+            "rows": total,
+            "seconds": seconds,
+            "rows_per_second": total / seconds if seconds else 0.0,
+        }
+
+
+def _timed_bulk_create(progress, model, objs, batch_size):
+    started = time.perf_counter()
+    created = model.objects.bulk_create(objs, batch_size=batch_size)
+    progress.add(model._meta.db_table, len(objs), time.perf_counter() - started)
+    return created
+
+
+def generate_dataset(scale=1.0, seed=0, prefix="synthetic", batch_size=5000, password="password123", log=None):
+    """
+    Заполняет БД синтетическими данными для нагрузочных тестов:
+    роли, бизнес-элементы, плотная матрица правил, пользователи с ролями,
+    AuthToken (активные, просроченные, отозванные) и заказы.
+
+    Одинаковые seed и scale дают одинаковые данные. Все строки вставляются
+    bulk_create пачками по batch_size; пароль хэшируется один раз
+    (детерминированная соль) и общий для всех пользователей.
+    Имена ролей/кодов/email начинаются с prefix — так данные легко отличить
+    и удалить.
+
+    Возвращает отчёт: строки и скорость по таблицам.
+    """
+    User = get_user_model()
+    rng = random.Random(seed)
+    volumes = dataset_volumes(scale)
+    progress = _Progress()
+    started = time.perf_counter()
+    now = timezone.now()
+
+    if Role.objects.filter(name__startswith=f"{prefix}-").exists():
+        raise ValueError(f"Данные с префиксом {prefix!r} уже есть в БД")
+
+    def say(message):
+        if log is not None:
+            log(message)
+
+    password_hash = make_password(password, salt=f"{prefix}{seed}".replace("-", ""))
+
+    with transaction.atomic():
+        roles = _timed_bulk_create(progress, Role, [
+            Role(name=f"{prefix}-role-{i}", description="Синтетическая роль")
+            for i in range(volumes["roles"])
+        ], batch_size)
+        elements = _timed_bulk_create(progress, BusinessElement, [
+            BusinessElement(code=f"{prefix}-el-{i}", name=f"Элемент {i}")
+            for i in range(volumes["elements"])
+        ], batch_size)
+        if any(obj.pk is None for obj in roles + elements):
+            roles = list(Role.objects.filter(name__startswith=f"{prefix}-role-").order_by("id"))
+            elements = list(BusinessElement.objects.filter(code__startswith=f"{prefix}-el-").order_by("id"))
+
+        rules = []
+        for role in roles:
+            for element in elements:
+                if rng.random() < RULE_DENSITY:
+                    flags = {name: rng.random() < 0.5 for name in FLAG_FIELDS}
+                    rules.append(AccessRoleRule(role=role, element=element, **flags))
+            if len(rules) >= batch_size:
+                _timed_bulk_create(progress, AccessRoleRule, rules, batch_size)
+                rules = []
+        _timed_bulk_create(progress, AccessRoleRule, rules, batch_size)
+    say(f"roles={len(roles)} elements={len(elements)} rules={progress.tables['access_control_accessrolerule']['rows']}")
+
+    for batch_start in range(0, volumes["users"], batch_size):
+        batch_end = min(batch_start + batch_size, volumes["users"])
+        # У каждого пользователя свой генератор: данные не зависят от batch_size
+        user_rngs = [random.Random(f"{seed}:{i}") for i in range(batch_start, batch_end)]
+        with transaction.atomic():
+            users = _timed_bulk_create(progress, User, [
+                User(
+                    email=f"{prefix}-{i}@example.com",
+                    username=f"{prefix}-{i}@example.com",
+                    password=password_hash,
+                    first_name=user_rng.choice(FIRST_NAMES),
+                    last_name=user_rng.choice(LAST_NAMES),
+                )
+                for i, user_rng in zip(range(batch_start, batch_end), user_rngs)
+            ], batch_size)
+            if any(user.pk is None for user in users):
+                ids = dict(User.objects.filter(
+                    email__in=[user.email for user in users]
+                ).values_list("email", "id"))
+                for user in users:
+                    user.pk = ids[user.email]
+
+            user_roles, tokens, orders = [], [], []
+            for user, user_rng in zip(users, user_rngs):
+                user_roles.append(UserRole(user_id=user.pk, role=user_rng.choice(roles)))
+                for _ in range(user_rng.randint(0, MAX_TOKENS_PER_USER)):
+                    state = user_rng.random()
+                    if state < 0.6:
+                        expires_at = now + timedelta(minutes=user_rng.randint(1, 60))
+                    else:
+                        expires_at = now - timedelta(minutes=user_rng.randint(1, 60 * 24 * 30))
+                    tokens.append(AuthToken(
+                        user_id=user.pk,
+                        # jti уникален глобально: зависит и от seed, и от префикса
+                        jti=uuid.uuid5(uuid.NAMESPACE_URL, f"{prefix}:{user_rng.getrandbits(64)}"),
+                        expires_at=expires_at,
+                        is_revoked=0.6 <= state < 0.75,
+                    ))
+                for _ in range(user_rng.randint(0, MAX_ORDERS_PER_USER)):
+                    orders.append(Order(
+                        owner_id=user.pk,
+                        title=f"{user_rng.choice(ORDER_WORDS)} №{user_rng.randint(1, 999_999)}",
+                    ))
+
+            _timed_bulk_create(progress, UserRole, user_roles, batch_size)
+            _timed_bulk_create(progress, AuthToken, tokens, batch_size)
+            _timed_bulk_create(progress, Order, orders, batch_size)
+        say(f"users {batch_end}/{volumes['users']}")
+
+    # bulk_create не отправляет post_save — матрицу сбрасываем сами, один раз
+    permission_matrix.invalidate()
+
+    return progress.report(time.perf_counter() - started)
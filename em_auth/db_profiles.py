@@ -0,0 +1,100 @@
+# em_auth/db_profiles.py
+import os
+from contextlib import contextmanager
+
+# PRAGMA при каждом подключении к SQLite (OPTIONS["init_command"]):
+# - WAL: чтения не ждут запись, запись не ждёт чтения;
+# - synchronous=NORMAL: в WAL fsync только на checkpoint — коммит дешевле, целостность сохраняется;
+# - busy_timeout: ждать блокировку записи, а не падать сразу с "database is locked".
+SQLITE_PRODUCTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Сколько секунд держать соединение открытым между запросами
+PRODUCTION_CONN_MAX_AGE = 600
+
+
+def sqlite_database(name, profile="dev") -> dict:
+    """
+    Настройки SQLite для DATABASES.
+
+    dev — как у Django по умолчанию: соединение на запрос, журнал DELETE.
+    production — постоянные соединения с проверкой перед запросом, WAL-прагмы
+    при подключении и BEGIN IMMEDIATE: транзакция сразу берёт блокировку записи
+    и ждёт её по busy_timeout, вместо ошибки при попытке повысить блокировку
+    посреди транзакции.
+    """
+    config = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": name,
+    }
+    if profile == "production":
+        config.update({
+            "CONN_MAX_AGE": PRODUCTION_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "init_command": "; ".join(SQLITE_PRODUCTION_PRAGMAS),
+                "transaction_mode": "IMMEDIATE",
+            },
+        })
+    return config
+
+
+def postgres_database(profile="dev", env=os.environ) -> dict:
+    """
+    Настройки PostgreSQL из переменных POSTGRES_DB / _USER / _PASSWORD / _HOST / _PORT.
+
+    production — пул соединений psycopg 3 (POSTGRES_POOL_MIN / POSTGRES_POOL_MAX);
+    с пулом Django не разрешает CONN_MAX_AGE, поэтому при POSTGRES_POOL=0 вместо него —
+    постоянные соединения с проверкой (например, за PgBouncer).
+    """
+    config = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env.get("POSTGRES_DB", "em_auth"),
+        "USER": env.get("POSTGRES_USER", "postgres"),
+        "PASSWORD": env.get("POSTGRES_PASSWORD", ""),
+        "HOST": env.get("POSTGRES_HOST", "localhost"),
+        "PORT": env.get("POSTGRES_PORT", "5432"),
+    }
+    if profile != "production":
+        return config
+
+    if env.get("POSTGRES_POOL", "1") == "1":
+        config["OPTIONS"] = {
+            "pool": {
+                "min_size": int(env.get("POSTGRES_POOL_MIN", 2)),
+                "max_size": int(env.get("POSTGRES_POOL_MAX", 10)),
+                "timeout": 10,
+            },
+        }
+    else:
+        config.update({"CONN_MAX_AGE": PRODUCTION_CONN_MAX_AGE, "CONN_HEALTH_CHECKS": True})
+    return config
+
+
+@contextmanager
+def database_profile(profile):
+    """
+    Временно переключает default-соединение на профиль SQLite (dev / production) —
+    для сравнения профилей в одном процессе (benchmark_db_profile).
+    Соединения закрываются, чтобы новые открылись уже с нужными настройками.
+    """
+    from django.db import connections
+
+    settings_dict = connections["default"].settings_dict
+    profile_config = sqlite_database(settings_dict["NAME"], profile)
+    saved = {key: settings_dict[key] for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")}
+
+    connections.close_all()
+    settings_dict.update({
+        "CONN_MAX_AGE": profile_config.get("CONN_MAX_AGE", 0),
+        "CONN_HEALTH_CHECKS": profile_config.get("CONN_HEALTH_CHECKS", False),
+        "OPTIONS": profile_config.get("OPTIONS", {}),
+    })
+    try:
+        yield
+    finally:
+        connections.close_all()
+        settings_dict.update(saved)
@@ -0,0 +1,196 @@
+# em_auth/db_router.py
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .metrics import db_replica_failovers
+
+# True — до конца запроса все чтения идут в основную БД (была запись)
+_pinned = ContextVar("db_pinned_to_primary", default=False)
+
+
+def get_replica_alias():
+    """
+    Алиас реплики из DATABASE_READ_REPLICA или None, если реплика не настроена.
+    """
+    alias = getattr(settings, "DATABASE_READ_REPLICA", None)
+    if alias and alias != DEFAULT_DB_ALIAS and alias in connections.settings:
+        return alias
+    return None
+
+
+def pin_to_primary():
+    _pinned.set(True)
+
+
+def is_pinned() -> bool:
+    return _pinned.get()
+
+
+@contextmanager
+def primary_pinning_scope():
+    """
+    Область «одного запроса»: закрепление за основной БД не переживает её.
+    """
+    token = _pinned.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class ReplicaHealth:
+    """
+    Доступна ли реплика. Соединения в Django свои у каждого потока,
+    поэтому и состояние — на поток:
+    - соединение проверяется не чаще раза в DATABASE_REPLICA_CHECK_INTERVAL секунд;
+    - после ошибки реплика считается недоступной DATABASE_REPLICA_RETRY_AFTER секунд,
+      все чтения в это время идут в основную БД.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def is_available(self, alias) -> bool:
+        now = time.monotonic()
+        state = self._local
+        if now < getattr(state, "down_until", 0.0):
+            return False
+        if now - getattr(state, "checked_at", float("-inf")) < getattr(settings, "DATABASE_REPLICA_CHECK_INTERVAL", 5.0):
+            return True
+
+        connection = connections[alias]
+        try:
+            if connection.connection is None:
+                connection.ensure_connection()
+            elif not connection.is_usable():
+                connection.close()
+                connection.ensure_connection()
+        except DatabaseError:
+            connection.close()
+            self.mark_unavailable()
+            return False
+
+        state.checked_at = now
+        return True
+
+    def mark_unavailable(self):
+        db_replica_failovers.inc()
+        self._local.down_until = time.monotonic() + getattr(settings, "DATABASE_REPLICA_RETRY_AFTER", 30.0)
+        self._local.checked_at = float("-inf")
+
+    def reset(self):
+        self._local = threading.local()
+
+
+replica_health = ReplicaHealth()
+
+
+class ReadReplicaRouter:
+    """
+    Чтения моделей из DATABASE_REPLICA_APPS (токены, пользователи, роли и правила) —
+    в реплику DATABASE_READ_REPLICA, всё остальное — в основную БД.
+
+    В основную БД читаем также:
+    - до конца запроса после любой записи (read-your-writes, см. ReplicaPinningMiddleware);
+    - внутри transaction.atomic на основной БД;
+    - пока реплика недоступна (ReplicaHealth).
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = get_replica_alias()
+        if (
+            alias is None
+            or _pinned.get()
+            or model._meta.app_label not in getattr(settings, "DATABASE_REPLICA_APPS", ())
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or not replica_health.is_available(alias)
+        ):
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной БД: объекты из них можно связывать
+        aliases = {DEFAULT_DB_ALIAS, get_replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+def get_with_primary_fallback(queryset, **lookup):
+    """
+    queryset.get(**lookup); если в реплике записи ещё нет (отставание
+    репликации, например токен выдан только что) — повторяет в основной БД.
+    """
+    try:
+        return queryset.get(**lookup)
+    except queryset.model.DoesNotExist:
+        if queryset.db == DEFAULT_DB_ALIAS:
+            raise
+    return queryset.using(DEFAULT_DB_ALIAS).get(**lookup)
+
+
+async def aget_with_primary_fallback(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        if queryset.db == DEFAULT_DB_ALIAS:
+            raise
+    return await queryset.using(DEFAULT_DB_ALIAS).aget(**lookup)
+
+
+def filter_with_primary_fallback(queryset, field, keys):
+    """
+    Объекты queryset с field из keys. Если чтение шло в реплику и части
+    объектов в ней ещё нет, недостающие дочитываются из основной БД
+    (как get_with_primary_fallback для одного объекта).
+    """
+    objs = list(queryset.filter(**{f"{field}__in": list(keys)}))
+    if queryset.db == DEFAULT_DB_ALIAS:
+        return objs
+    found = {str(getattr(obj, field)) for obj in objs}
+    missing = [key for key in keys if str(key) not in found]
+    if missing:
+        objs.extend(queryset.using(DEFAULT_DB_ALIAS).filter(**{f"{field}__in": missing}))
+    return objs
+
+
+class ReplicaPinningMiddleware:
+    """
+    Ограничивает закрепление за основной БД одним запросом: запись
+    (LogoutView.post, логин, правка правил) переводит на основную БД
+    все дальнейшие чтения этого запроса, но не следующих.
+
+    Без настроенной реплики не подключается (MiddlewareNotUsed).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if get_replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with primary_pinning_scope():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with primary_pinning_scope():
+            return await self.get_response(request)
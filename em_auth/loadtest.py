@@ -0,0 +1,392 @@
+# em_auth/loadtest.py
+import asyncio
+import contextvars
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from wsgiref.util import setup_testing_defaults
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import reverse
+
+# Сценарий одного виртуального пользователя и ожидаемые коды ответов
+FLOW = ("register", "login", "me", "orders", "logout")
+EXPECTED_STATUS = {"register": 201, "login": 200, "me": 200, "orders": 200, "logout": 200}
+PASSWORD = "loadtest-password"
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# Счётчик SQL-запросов текущего запроса. contextvar, а не threading.local:
+# под ASGI ORM работает в потоках sync_to_async, куда asgiref копирует контекст
+_current_queries = contextvars.ContextVar("loadtest_queries", default=None)
+
+
+def _count_queries(execute, sql, params, many, context):
+    counter = _current_queries.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _install_query_counter(sender=None, connection=None, **kwargs):
+    if _count_queries not in connection.execute_wrappers:
+        # В начало списка: execute_wrapper() других middleware снимает последний элемент
+        connection.execute_wrappers.insert(0, _count_queries)
+
+
+@contextmanager
+def counting_queries():
+    """
+    Ставит _count_queries на все соединения, в том числе созданные потом
+    в рабочих потоках.
+    """
+    connection_created.connect(_install_query_counter)
+    for connection in connections.all(initialized_only=True):
+        _install_query_counter(connection=connection)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(_install_query_counter)
+        for connection in connections.all(initialized_only=True):
+            if _count_queries in connection.execute_wrappers:
+                connection.execute_wrappers.remove(_count_queries)
+
+
+@contextmanager
+def temporary_database():
+    """
+    Чистая БД на время прогона (как у тестов Django); для SQLite — файл во
+    временном каталоге, а не память: рабочие потоки должны видеть одну БД.
+    """
+    connection = connections["default"]
+    old_name = connection.settings_dict["NAME"]
+    tmp_dir = None
+    if connection.vendor == "sqlite":
+        tmp_dir = tempfile.mkdtemp(prefix="loadtest-")
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(tmp_dir, "db.sqlite3")
+
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def seed_access_rules():
+    """
+    Роль user с правом читать свои заказы — чтобы шаг orders отвечал 200, а не 403.
+    """
+    from access_control.models import AccessRoleRule, BusinessElement, Role
+
+    role, _ = Role.objects.get_or_create(name="user", defaults={"description": "Обычный пользователь"})
+    element, _ = BusinessElement.objects.get_or_create(code="orders", defaults={"name": "Заказы"})
+    AccessRoleRule.objects.update_or_create(role=role, element=element, defaults={"read_permission": True})
+
+
+def percentile(values, p):
+    """
+    Перцентиль по методу ближайшего ранга; values уже отсортированы.
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.timings = []
+        self.queries = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, queries, ok):
+        with self._lock:
+            self.timings.append(elapsed)
+            self.queries.append(queries)
+            if not ok:
+                self.errors += 1
+
+    def summary(self, wall_seconds) -> dict:
+        timings = sorted(self.timings)
+        return {
+            "requests": len(timings),
+            "errors": self.errors,
+            "throughput_rps": len(timings) / wall_seconds if wall_seconds else 0.0,
+            "mean_ms": statistics.fmean(timings) * 1000 if timings else 0.0,
+            "p50_ms": percentile(timings, 50) * 1000,
+            "p95_ms": percentile(timings, 95) * 1000,
+            "p99_ms": percentile(timings, 99) * 1000,
+            "queries_per_request": statistics.fmean(self.queries) if self.queries else 0.0,
+        }
+
+
+def _request_parts(method, path, body, token):
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    headers = [(b"host", b"localhost"), (b"content-length", str(len(payload)).encode())]
+    if body is not None:
+        headers.append((b"content-type", b"application/json"))
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode("ascii")))
+    return method, path, payload, headers
+
+
+class WSGIClient:
+    """
+    Вызывает WSGI-приложение напрямую, без сети и без django.test.Client.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def request(self, method, path, body=None, token=None):
+        method, path, payload, headers = _request_parts(method, path, body, token)
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "SERVER_NAME": "localhost",
+            "wsgi.input": io.BytesIO(payload),
+        }
+        for name, value in headers:
+            key = name.decode().upper().replace("-", "_")
+            if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = f"HTTP_{key}"
+            environ[key] = value.decode()
+        setup_testing_defaults(environ)
+
+        status = []
+        result = self.application(environ, lambda s, h, exc_info=None: status.append(s))
+        try:
+            content = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return int(status[0].split()[0]), content
+
+
+class ASGIClient:
+    """
+    Вызывает ASGI-приложение напрямую: один HTTP-запрос — один scope.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def request(self, method, path, body=None, token=None):
+        method, path, payload, headers = _request_parts(method, path, body, token)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "headers": headers,
+            "client": ("127.0.0.1", 0),
+            "server": ("localhost", 80),
+        }
+        request_sent = False
+        response_done = asyncio.Event()
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        status = []
+        chunks = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body"):
+                    response_done.set()
+
+        await self.application(scope, receive, send)
+        return status[0], b"".join(chunks)
+
+
+def _steps(worker, iteration, tag):
+    """
+    (шаг, метод, путь, тело) сценария; логин подставляет токен в следующие шаги.
+    """
+    email = f"load-{tag}-{worker}-{iteration}@example.com"
+    return [
+        ("register", "POST", reverse("auth-register"),
+         {"email": email, "password": PASSWORD, "password2": PASSWORD}),
+        ("login", "POST", reverse("auth-login"), {"email": email, "password": PASSWORD}),
+        ("me", "GET", reverse("auth-me"), None),
+        ("orders", "GET", reverse("orders-list"), None),
+        ("logout", "POST", reverse("auth-logout"), {}),
+    ]
+
+
+def _access_token(step, status, content):
+    if step == "login" and status == 200:
+        return json.loads(content)["access"]
+    return None
+
+
+def run_wsgi(stats, concurrency, iterations, tag):
+    from em_auth.wsgi import application
+
+    client = WSGIClient(application)
+
+    def worker(index):
+        try:
+            for iteration in range(iterations):
+                token = None
+                for step, method, path, body in _steps(index, iteration, tag):
+                    counter = [0]
+                    reset = _current_queries.set(counter)
+                    started = time.perf_counter()
+                    try:
+                        status, content = client.request(method, path, body, token)
+                    finally:
+                        elapsed = time.perf_counter() - started
+                        _current_queries.reset(reset)
+                    stats[step].record(elapsed, counter[0], status == EXPECTED_STATUS[step])
+                    token = _access_token(step, status, content) or token
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, i) for i in range(concurrency)]:
+            future.result()
+
+
+def run_asgi(stats, concurrency, iterations, tag):
+    from em_auth.asgi import application
+
+    client = ASGIClient(application)
+
+    async def worker(index):
+        for iteration in range(iterations):
+            token = None
+            for step, method, path, body in _steps(index, iteration, tag):
+                counter = [0]
+                reset = _current_queries.set(counter)
+                started = time.perf_counter()
+                try:
+                    status, content = await client.request(method, path, body, token)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    _current_queries.reset(reset)
+                stats[step].record(elapsed, counter[0], status == EXPECTED_STATUS[step])
+                token = _access_token(step, status, content) or token
+
+    async def main():
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    asyncio.run(main())
+
+
+def run_loadtest(server="wsgi", concurrency=4, iterations=10, fast_hasher=False, use_current_db=False):
+    """
+    Прогоняет сценарий register -> login -> me -> orders -> logout
+    concurrency виртуальными пользователями по iterations раз каждый.
+
+    Возвращает отчёт (dict, сериализуемый в JSON): по каждому шагу —
+    requests, errors, throughput_rps, mean/p50/p95/p99 в мс и queries_per_request.
+    """
+    runner = {"wsgi": run_wsgi, "asgi": run_asgi}[server]
+    stats = {step: EndpointStats() for step in FLOW}
+    tag = f"{server}-{int(time.time() * 1000)}"
+    hashers = FAST_HASHERS if fast_hasher else settings.PASSWORD_HASHERS
+
+    database = nullcontext() if use_current_db else temporary_database()
+    # Все виртуальные пользователи идут с одного адреса — ограничение частоты отключено
+    with database, override_settings(PASSWORD_HASHERS=hashers, RATE_LIMITS={}):
+        if not use_current_db:
+            seed_access_rules()
+        with counting_queries():
+            started = time.perf_counter()
+            runner(stats, concurrency, iterations, tag)
+            wall_seconds = time.perf_counter() - started
+
+    total = sum(len(s.timings) for s in stats.values())
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "server": server,
+            "concurrency": concurrency,
+            "iterations": iterations,
+            "fast_hasher": fast_hasher,
+            "database": connections["default"].vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "settings": {
+                name: getattr(settings, name, None)
+                for name in ("API_ASYNC_VIEWS", "JWT_STATELESS", "JWT_EMBED_PERMISSIONS", "PASSWORD_HASHING_EXECUTOR")
+            },
+        },
+        "wall_seconds": wall_seconds,
+        "total_requests": total,
+        "throughput_rps": total / wall_seconds if wall_seconds else 0.0,
+        "endpoints": {step: stats[step].summary(wall_seconds) for step in FLOW},
+    }
+
+
+def compare_reports(current, baseline, threshold=0.10):
+    """
+    Сравнение с прошлым прогоном: строки с изменением p95 и пропускной
+    способности по шагам; регрессии (хуже больше чем на threshold) помечаются.
+    """
+    lines = []
+    regressions = 0
+    for step, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(step)
+        if not before:
+            continue
+        p95_change = _relative(now["p95_ms"], before["p95_ms"])
+        rps_change = _relative(now["throughput_rps"], before["throughput_rps"])
+        regressed = p95_change > threshold or rps_change < -threshold
+        regressions += regressed
+        lines.append(
+            f"{step}: p95 {before['p95_ms']:.2f} -> {now['p95_ms']:.2f} ms ({p95_change:+.0%}), "
+            f"rps {before['throughput_rps']:.0f} -> {now['throughput_rps']:.0f} ({rps_change:+.0%})"
+            + (" REGRESSION" if regressed else "")
+        )
+    return lines, regressions
+
+
+def _relative(now, before):
+    return (now - before) / before if before else 0.0
+
+
+def format_report(report) -> list:
+    lines = [
+        f"server={report['meta']['server']} concurrency={report['meta']['concurrency']} "
+        f"iterations={report['meta']['iterations']} wall_seconds={report['wall_seconds']:.2f} "
+        f"rps={report['throughput_rps']:.0f}"
+    ]
+    for step, s in report["endpoints"].items():
+        lines.append(
+            f"{step:<9} requests={s['requests']} errors={s['errors']} rps={s['throughput_rps']:.0f} "
+            f"p50={s['p50_ms']:.2f}ms p95={s['p95_ms']:.2f}ms p99={s['p99_ms']:.2f}ms "
+            f"queries={s['queries_per_request']:.1f}"
+        )
+    return lines
+
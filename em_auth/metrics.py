@@ -0,0 +1,350 @@
+# em_auth/metrics.py
+import hmac
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы корзин для задержек, секунды
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+class _ShardedMetric:
+    """
+    Значения метрики хранятся по потокам: каждый поток пишет только в свой
+    шард (без блокировок), сбор /metrics складывает шарды.
+
+    Блокировка берётся лишь при появлении нового потока и при сборе;
+    шарды завершившихся потоков сворачиваются в общий итог, чтобы не копиться
+    при сервере «поток на запрос».
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []  # [(поток, {labels: значение})]
+        self._retired = {}
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _add(self, total, value):
+        """
+        Складывает значения серии; total=None — серии в итоге ещё нет.
+        """
+        raise NotImplementedError
+
+    def collect(self) -> dict:
+        """
+        Сумма по всем потокам: {labels: значение}.
+        """
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self._merge_shard(self._retired, shard)
+            self._shards = alive
+
+            result = {}
+            self._merge_shard(result, self._retired)
+            for _, shard in alive:
+                # list() — поток-владелец мог добавить новую серию во время сбора
+                self._merge_shard(result, dict(list(shard.items())))
+        return result
+
+    def _merge_shard(self, target, shard):
+        for labels, value in shard.items():
+            target[labels] = self._add(target.get(labels), value)
+
+    def reset(self):
+        with self._lock:
+            for _, shard in self._shards:
+                shard.clear()
+            self._retired = {}
+
+    def _format_labels(self, labels, extra=()):
+        pairs = list(zip(self.labelnames, labels)) + list(extra)
+        if not pairs:
+            return ""
+        inner = ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs)
+        return "{" + inner + "}"
+
+    @property
+    def family(self) -> str:
+        """Имя семейства в строках # HELP / # TYPE."""
+        return self.name
+
+    def expose(self) -> list:
+        lines = [f"# HELP {self.family} {self.documentation}", f"# TYPE {self.family} {self.kind}"]
+        for labels, value in sorted(self.collect().items()):
+            lines.extend(self._expose_series(labels, value))
+        return lines
+
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    @property
+    def family(self) -> str:
+        # В формате 0.0.4 семейство счётчика называется так же, как его серии
+        return f"{self.name}_total"
+
+    def _add(self, total, value):
+        return (total or 0) + value
+
+    def _expose_series(self, labels, value):
+        return [f"{self.family}{self._format_labels(labels)} {value}"]
+
+
+class Histogram(_ShardedMetric):
+    """
+    Значение серии — [счётчики корзин..., +Inf, сумма, количество].
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = self._new_value()
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def _new_value(self):
+        return [0] * (len(self.buckets) + 1) + [0.0, 0]
+
+    def _add(self, total, value):
+        if total is None:
+            return list(value)
+        for i, item in enumerate(value):
+            total[i] += item
+        return total
+
+    def _expose_series(self, labels, value):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), value):
+            cumulative += count
+            le = bound if bound == "+Inf" else repr(float(bound))
+            lines.append(f"{self.name}_bucket{self._format_labels(labels, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{self._format_labels(labels)} {value[-2]}")
+        lines.append(f"{self.name}_count{self._format_labels(labels)} {value[-1]}")
+        return lines
+
+
+class Gauge(_ShardedMetric):
+    """
+    Текущее значение, которое читается при сборе /metrics функцией из set_function
+    (например, глубина очереди пула) — писать его на каждом событии не нужно.
+    Функция возвращает {labels: значение}; пока она не задана, серий нет.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set_function(self, function):
+        self._function = function
+
+    def collect(self) -> dict:
+        return self._function() if self._function is not None else {}
+
+    def _expose_series(self, labels, value):
+        return [f"{self.name}{self._format_labels(labels)} {value}"]
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+jwt_decode_seconds = Histogram(
+    "auth_jwt_decode_seconds",
+    "Время decode_jwt (проверка подписи и срока).",
+)
+token_lookup_seconds = Histogram(
+    "auth_token_lookup_seconds",
+    "Время поиска AuthToken / пользователя в JWTAuthentication (кэш или БД).",
+    labelnames=("source",),
+)
+rule_resolve_seconds = Histogram(
+    "access_rule_resolve_seconds",
+    "Время get_rule_for / aget_rule_for.",
+)
+password_hashing_seconds = Histogram(
+    "auth_password_hashing_seconds",
+    "Время хэширования (hash) и проверки (verify) паролей.",
+    labelnames=("operation",),
+)
+password_hashing_in_flight = Gauge(
+    "auth_password_hashing_in_flight",
+    "Задачи пула хэширования паролей: в работе (running) и в очереди (queued).",
+    labelnames=("state",),
+)
+password_hashing_rejected = Counter(
+    "auth_password_hashing_rejected",
+    "Отказы пула хэширования паролей из-за заполненной очереди (503).",
+)
+view_latency_seconds = Histogram(
+    "http_view_latency_seconds",
+    "Время обработки запроса по именам маршрутов.",
+    labelnames=("view", "method"),
+)
+auth_failures = Counter(
+    "auth_failures",
+    "Отказы JWTAuthentication по причинам.",
+    labelnames=("reason",),
+)
+access_decisions = Counter(
+    "access_decisions",
+    "Решения AccessRequiredPermission по бизнес-элементам.",
+    labelnames=("element", "decision"),
+)
+db_replica_failovers = Counter(
+    "db_replica_failovers",
+    "Сколько раз реплика для чтения признана недоступной (чтения ушли в основную БД).",
+)
+rate_limited = Counter(
+    "rate_limited",
+    "Запросы, отклонённые ограничителем частоты (429), по ведрам.",
+    labelnames=("scope",),
+)
+
+REGISTRY = (
+    jwt_decode_seconds,
+    token_lookup_seconds,
+    rule_resolve_seconds,
+    password_hashing_seconds,
+    password_hashing_in_flight,
+    password_hashing_rejected,
+    view_latency_seconds,
+    auth_failures,
+    access_decisions,
+    db_replica_failovers,
+    rate_limited,
+)
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_allowed(request) -> bool:
+    """
+    Доступ к /metrics: заголовок Authorization: Bearer <METRICS_TOKEN>
+    или REMOTE_ADDR из METRICS_ALLOWED_IPS. Без настроек — никому.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token:
+        header = request.headers.get("Authorization", "")
+        if hmac.compare_digest(header.encode(), f"Bearer {token}".encode()):
+            return True
+    return request.META.get("REMOTE_ADDR") in getattr(settings, "METRICS_ALLOWED_IPS", ())
+
+
+def metrics_view(request):
+    """
+    GET /metrics — все метрики в текстовом формате Prometheus.
+    Выключается настройкой METRICS_ENABLED; без доступа (metrics_allowed) — тоже 404,
+    чтобы не раскрывать сам эндпоинт.
+    """
+    if not getattr(settings, "METRICS_ENABLED", True) or not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+# Метка method — только из этого набора, прочие методы идут как "other":
+# иначе клиент произвольными методами создавал бы новые серии без ограничения
+KNOWN_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"})
+
+
+class MetricsMiddleware:
+    """
+    Пишет в http_view_latency_seconds время каждого запроса
+    с меткой view — именем маршрута (без id и прочих параметров пути).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, started)
+        return response
+
+    def observe(self, request, started):
+        match = request.resolver_match
+        view = match.view_name if match is not None else "unresolved"
+        method = request.method if request.method in KNOWN_METHODS else "other"
+        view_latency_seconds.observe(time.perf_counter() - started, view, method)
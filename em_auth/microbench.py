@@ -0,0 +1,178 @@
+# em_auth/microbench.py
+import io
+import math
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.test import RequestFactory
+
+# Раунд должен длиться хотя бы столько, чтобы погрешность таймера не мешала
+MIN_ROUND_SECONDS = 0.002
+
+
+def calibrate(func, min_time=MIN_ROUND_SECONDS) -> int:
+    """
+    Сколько вызовов func укладывается в один раунд не короче min_time.
+    """
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - started >= min_time:
+            return loops
+        loops *= 2
+
+
+def bench(func, rounds=20, warmup=3) -> dict:
+    """
+    Время одного вызова func по rounds раундам (как в pytest-benchmark):
+    min / mean / median / stddev в микросекундах и ops — вызовов в секунду по mean.
+    """
+    for _ in range(warmup):
+        func()
+    loops = calibrate(func)
+
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_call.append((time.perf_counter() - started) / loops)
+
+    mean = statistics.fmean(per_call)
+    return {
+        "rounds": rounds,
+        "loops": loops,
+        "min_us": min(per_call) * 1e6,
+        "mean_us": mean * 1e6,
+        "median_us": statistics.median(per_call) * 1e6,
+        "stddev_us": statistics.stdev(per_call) * 1e6 if rounds > 1 else 0.0,
+        "ops": 1 / mean if mean else math.inf,
+    }
+
+
+def core_benchmarks() -> dict:
+    """
+    Функции, которые вызываются на каждый запрос: name -> callable без аргументов.
+    Создаёт свои данные (роль, элемент, правило, пользователь, токен) в текущей БД,
+    поэтому запускается на временной БД (см. loadtest.temporary_database).
+    """
+    from django.contrib.auth import get_user_model
+
+    from access_control.models import AccessRoleRule, BusinessElement, Role, UserRole
+    from access_control.permissions import AccessRequiredPermission
+    from access_control.utils import get_rule_for
+    from accounts.authentication import JWTAuthentication
+    from accounts.serializers import UserSerializer
+    from accounts.utils import create_jwt_for_user, decode_jwt
+
+    User = get_user_model()
+
+    role = Role.objects.create(name="bench")
+    element = BusinessElement.objects.create(code="orders", name="Заказы")
+    AccessRoleRule.objects.create(role=role, element=element, read_permission=True)
+    user = User.objects.create_user(email="bench@example.com", username="bench@example.com", password=None)
+    UserRole.objects.create(user=user, role=role)
+
+    raw_token, _ = create_jwt_for_user(user)
+    authenticator = JWTAuthentication()
+    http_request = RequestFactory().get("/", headers={"Authorization": f"Bearer {raw_token}"})
+    # Прогрев: кэш токенов и матрица прав
+    user, _ = authenticator.authenticate(http_request)
+    get_rule_for(user, "orders")
+
+    permission = AccessRequiredPermission()
+    view = SimpleNamespace(element_code="orders")
+    request = SimpleNamespace(user=user, method="GET")
+
+    def has_permission():
+        # Свежий кэш решений на каждый вызов — как у нового запроса
+        request._access_cache = None
+        return permission.has_permission(request, view)
+
+    return {
+        "create_jwt_for_user": lambda: create_jwt_for_user(user),
+        "decode_jwt": lambda: decode_jwt(raw_token),
+        "JWTAuthentication.authenticate": lambda: authenticator.authenticate(http_request),
+        "get_rule_for": lambda: get_rule_for(user, "orders"),
+        "AccessRequiredPermission.has_permission": has_permission,
+        "UserSerializer.data": lambda: UserSerializer(user).data,
+    }
+
+
+# (что сравниваем, вариант DRF по умолчанию, быстрый вариант) — см. serialization_benchmarks
+SERIALIZATION_PAIRS = (
+    ("render", "rules: ModelSerializer + JSONRenderer", "rules: ValuesSerializer + FastJSONRenderer"),
+    ("parse", "rules: JSONParser", "rules: FastJSONParser"),
+)
+
+
+def serialization_benchmarks(rules=10_000) -> dict:
+    """
+    Список правил целиком (как GET /api/access/rules/?stream=1 или все страницы подряд):
+    чтение из БД + сериализация + JSON. Варианты DRF по умолчанию против
+    ValuesSerializer и FastJSONRenderer/FastJSONParser. Создаёт rules правил
+    в текущей БД — запускается на временной БД.
+    """
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from access_control.models import AccessRoleRule, BusinessElement, Role
+    from access_control.serializers import AccessRoleRuleSerializer, AccessRoleRuleValuesSerializer
+
+    from .renderers import FastJSONParser, FastJSONRenderer
+
+    elements_count = 100
+    roles_count = math.ceil(rules / elements_count)
+    Role.objects.bulk_create(Role(name=f"bench-{i}") for i in range(roles_count))
+    BusinessElement.objects.bulk_create(
+        BusinessElement(code=f"bench-{i}", name=f"Элемент {i}") for i in range(elements_count)
+    )
+    role_ids = list(Role.objects.filter(name__startswith="bench-").values_list("id", flat=True))
+    element_ids = list(BusinessElement.objects.filter(code__startswith="bench-").values_list("id", flat=True))
+    AccessRoleRule.objects.bulk_create(
+        (
+            AccessRoleRule(role_id=role_ids[i // elements_count], element_id=element_ids[i % elements_count],
+                           read_permission=True, update_permission=bool(i % 2))
+            for i in range(rules)
+        ),
+        batch_size=2000,
+    )
+
+    queryset = AccessRoleRule.objects.order_by("id")
+    body = JSONRenderer().render(AccessRoleRuleSerializer(queryset, many=True).data)
+
+    return {
+        SERIALIZATION_PAIRS[0][1]: lambda: JSONRenderer().render(
+            AccessRoleRuleSerializer(queryset.all(), many=True).data
+        ),
+        SERIALIZATION_PAIRS[0][2]: lambda: FastJSONRenderer().render(
+            AccessRoleRuleValuesSerializer.serialize(queryset.all())
+        ),
+        SERIALIZATION_PAIRS[1][1]: lambda: JSONParser().parse(io.BytesIO(body)),
+        SERIALIZATION_PAIRS[1][2]: lambda: FastJSONParser().parse(io.BytesIO(body)),
+    }
+
+
+def run_serialization_benchmarks(rules=10_000, rounds=10) -> dict:
+    """
+    Результаты bench() по вариантам и ускорение быстрых вариантов:
+    {"results": {...}, "speedup": {"render": 4.2, ...}}.
+    """
+    results = {name: bench(func, rounds=rounds, warmup=1) for name, func in serialization_benchmarks(rules).items()}
+    speedup = {
+        what: results[baseline]["mean_us"] / results[fast]["mean_us"]
+        for what, baseline, fast in SERIALIZATION_PAIRS
+    }
+    return {"rules": rules, "results": results, "speedup": speedup}
+
+
+def run_core_benchmarks(rounds=20, only=None) -> dict:
+    results = {}
+    for name, func in core_benchmarks().items():
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = bench(func, rounds=rounds)
+    return results
@@ -0,0 +1,85 @@
+# em_auth/renderers.py
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson не установлен — тот же формат через стандартный json
+    orjson = None
+
+# Типы, которых нет в JSON (Decimal, lazy-строки, QuerySet...), и datetime —
+# через энкодер DRF, чтобы формат совпадал с JSONRenderer ("...Z" вместо "+00:00")
+_encoder = JSONEncoder()
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(data) -> bytes:
+    """
+    Компактный JSON в UTF-8, как у JSONRenderer DRF с настройками по умолчанию.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        data,
+        cls=JSONEncoder,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def loads(content: bytes):
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content, parse_constant=_reject_constant)
+
+
+def _reject_constant(value):
+    # NaN / Infinity не JSON — как strict-режим JSONParser DRF
+    raise ValueError(f"Недопустимое значение {value}")
+
+
+class FastJSONRenderer(BaseRenderer):
+    """
+    Замена rest_framework.renderers.JSONRenderer: тот же media type и формат,
+    но сериализация через orjson (если установлен). Отступы (?indent) не поддерживает —
+    для чтения глазами есть BrowsableAPIRenderer.
+    """
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return dumps(data)
+
+
+class FastJSONParser(BaseParser):
+    """
+    Замена rest_framework.parsers.JSONParser на orjson.
+    """
+
+    media_type = "application/json"
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        content = stream.read() if stream is not None else b""
+        try:
+            if codecs.lookup(encoding).name != "utf-8":
+                content = content.decode(encoding).encode("utf-8")
+            return loads(content)
+        except ValueError as exc:
+            # orjson.JSONDecodeError и UnicodeDecodeError — наследники ValueError
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,56 @@
+# em_auth/serializers.py
+from operator import itemgetter
+
+
+class ValuesSerializer:
+    """
+    Read-only сериализатор для списков: строит dict прямо из строк
+    .values() / .values_list(), без экземпляров моделей и полей DRF.
+
+    fields — {ключ в JSON: поле для values()}, например {"role": "role_id"}.
+    Соответствие ключей и полей вычисляется один раз при объявлении класса.
+    Вывод совпадает с ModelSerializer для тех же полей, пока это простые
+    значения (числа, строки, bool); даты и Decimal лучше отдавать через ModelSerializer.
+    """
+
+    fields: dict = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.keys = tuple(cls.fields)
+        cls.lookups = tuple(cls.fields.values())
+        cls._renamed = cls.keys != cls.lookups
+        # itemgetter с несколькими ключами возвращает кортеж значений в порядке keys
+        cls._getter = itemgetter(*cls.lookups) if len(cls.lookups) > 1 else None
+
+    @classmethod
+    def values(cls, queryset):
+        """
+        queryset.values() с нужными полями: подходит для пагинации
+        (CursorPagination читает позицию из dict).
+        """
+        return queryset.values(*cls.lookups)
+
+    @classmethod
+    def from_rows(cls, rows) -> list:
+        """
+        Строки .values() (dict) -> список dict с ключами из fields.
+        """
+        if not cls._renamed:
+            return rows if isinstance(rows, list) else list(rows)
+        keys, getter = cls.keys, cls._getter
+        if getter is None:
+            return [{keys[0]: row[cls.lookups[0]]} for row in rows]
+        return [dict(zip(keys, getter(row))) for row in rows]
+
+    @classmethod
+    def from_tuples(cls, rows) -> list:
+        """
+        Строки .values_list(*lookups) -> список dict.
+        """
+        keys = cls.keys
+        return [dict(zip(keys, row)) for row in rows]
+
+    @classmethod
+    def serialize(cls, queryset) -> list:
+        return cls.from_tuples(queryset.values_list(*cls.lookups))
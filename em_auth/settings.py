@@ -14,6 +14,8 @@ from pathlib import Path
 from datetime import timedelta
 import os
 
+from em_auth.db_profiles import postgres_database, sqlite_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -53,6 +55,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "accounts.User"
 
 MIDDLEWARE = [
+    'em_auth.metrics.MetricsMiddleware',
+    'em_auth.db_router.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,6 +64,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'access_control.middleware.AccessDebugHeaderMiddleware',
 ]
 
 ROOT_URLCONF = 'em_auth.urls'
@@ -85,12 +90,33 @@ WSGI_APPLICATION = 'em_auth.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Профиль БД (em_auth/db_profiles.py): dev — соединение на запрос, настройки по умолчанию;
+# production — постоянные соединения с health check, для SQLite WAL-прагмы и BEGIN IMMEDIATE,
+# для PostgreSQL (если задан POSTGRES_DB) — пул соединений.
+DB_PROFILE = os.environ.get("DB_PROFILE", "dev")
+
+if os.environ.get("POSTGRES_DB"):
+    DATABASES = {'default': postgres_database(DB_PROFILE)}
+else:
+    DATABASES = {'default': sqlite_database(BASE_DIR / 'db.sqlite3', DB_PROFILE)}
+
+# Реплика для чтения (em_auth/db_router.py). Локально — второй SQLite-файл,
+# например копия db.sqlite3: DATABASE_REPLICA_NAME=replica.sqlite3.
+# В тестах реплика — зеркало основной БД.
+if os.environ.get("DATABASE_REPLICA_NAME"):
+    DATABASES["replica"] = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': BASE_DIR / os.environ["DATABASE_REPLICA_NAME"],
+        'TEST': {'MIRROR': 'default'},
     }
-}
+
+DATABASE_ROUTERS = ["em_auth.db_router.ReadReplicaRouter"]
+# Алиас реплики; None или отсутствующий в DATABASES алиас — всё читается из основной БД
+DATABASE_READ_REPLICA = "replica"
+# Приложения, чтения моделей которых идут в реплику: токены, пользователи, роли и правила
+DATABASE_REPLICA_APPS = ("accounts", "access_control")
+DATABASE_REPLICA_CHECK_INTERVAL = 5.0  # секунды между проверками соединения с репликой
+DATABASE_REPLICA_RETRY_AFTER = 30.0  # сколько секунд не ходить в реплику после ошибки
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
@@ -99,11 +125,115 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # Ведро на токен доступа (accounts/ratelimit.py, RATE_LIMITS["token"])
+    "DEFAULT_THROTTLE_CLASSES": [
+        "accounts.ratelimit.TokenThrottle",
+    ],
+    # Адрес клиента для ограничения частоты: при 0 — REMOTE_ADDR, X-Forwarded-For игнорируется
+    # (без явного значения DRF взял бы клиентский X-Forwarded-For целиком). За nginx — NUM_PROXIES=1.
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", "0")),
+    # JSON через orjson (em_auth/renderers.py); без orjson — стандартный json
+    "DEFAULT_RENDERER_CLASSES": [
+        "em_auth.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "em_auth.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
+# Под ASGI (em_auth.asgi) /api/auth/me/ и /api/orders/ можно обслуживать
+# нативными async-views (async ORM, без sync_to_async на каждый запрос).
+API_ASYNC_VIEWS = os.environ.get("API_ASYNC_VIEWS", "0") == "1"
+
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "dev-secret-change-me")
 JWT_ALGORITHM = "HS256"
 JWT_ACCESS_TOKEN_LIFETIME = timedelta(minutes=60)
+# Асимметричная подпись (RS256/EdDSA) с ротацией ключей. Пока список пуст,
+# токены подписываются HS256 + JWT_SECRET_KEY. Формат элемента:
+#   {"kid": "2026-01", "algorithm": "RS256", "private_key": "<PEM>", "public_key": "<PEM>"}
+# Ключи без private_key только проверяют подпись (старые ключи во время ротации).
+# Публичные части отдаются на /api/auth/jwks/.
+JWT_SIGNING_KEYS = []
+# Те же ключи из JSON-файла (список; PEM — в полях или файлах private_key_file / public_key_file).
+# Неизвестный или «только для проверки» JWT_ACTIVE_KID останавливает старт (ImproperlyConfigured).
+JWT_SIGNING_KEYS_FILE = os.environ.get("JWT_SIGNING_KEYS_FILE") or None
+JWT_ACTIVE_KID = os.environ.get("JWT_ACTIVE_KID") or None
+JWT_JWKS_MAX_AGE = 300
+# Stateless-режим: при логине не создаётся запись AuthToken, отзыв — через
+# эпоху User.tokens_valid_after. Токены, выпущенные в обычном режиме, продолжают работать.
+JWT_STATELESS = os.environ.get("JWT_STATELESS", "0") == "1"
+# Денилист jti для logout stateless-токенов (до истечения срока токена). Кэш должен быть общим
+# для всех воркеров (Redis/Memcached): в LocMemCache по умолчанию logout виден только своему процессу.
+JWT_DENYLIST_CACHE = "default"
+
+# Дайджест прав в токене: claim "acl" = роль, маски флагов по кодам элементов
+# и версия политики. Пока версия совпадает, права проверяются по токену.
+JWT_EMBED_PERMISSIONS = os.environ.get("JWT_EMBED_PERMISSIONS", "0") == "1"
+
+# Кэш снимков AuthToken+User в памяти процесса (accounts/cache.py).
+# TTL в секундах; дополнительно ограничивается expires_at токена. 0 — кэш выключен.
+# Снимок сверяется с версией пользователя в CACHES["default"]: с общим кэшем (Redis/Memcached)
+# logout, отзыв и деактивация видны всем воркерам сразу, с кэшем в памяти процесса —
+# другим воркерам только по истечении TTL.
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get("AUTH_TOKEN_CACHE_TTL", 5))
+AUTH_TOKEN_CACHE_MAX_SIZE = 10000
+# Готовые ответы GET /api/auth/me/ (JSON + ETag) по пользователю. 0 — кэш выключен.
+ME_RESPONSE_CACHE_TTL = int(os.environ.get("ME_RESPONSE_CACHE_TTL", 30))
+ME_RESPONSE_CACHE_MAX_SIZE = 10000
+
+# Матрица прав (access_control/matrix.py): как часто сверять её версию
+# с общим кэшем, чтобы заметить изменения правил, сделанные в другом воркере.
+ACCESS_MATRIX_CHECK_INTERVAL = 1.0  # секунды
+# Максимальный возраст снимка матрицы: счётчик версии лежит в CACHES["default"], и без общего
+# кэша (Redis/Memcached) другие воркеры видят изменения правил только после пересборки по возрасту.
+# В продакшене с несколькими воркерами нужен общий кэш; None — без ограничения возраста.
+ACCESS_MATRIX_MAX_AGE = 30.0  # секунды
+# Заголовок X-Access-Debug: сколько раз за запрос вычислялись правила и сколько было SQL-запросов
+ACCESS_DEBUG_HEADER = DEBUG
+
+# Фоновая очистка просроченных/отозванных AuthToken в процессе приложения
+# (секунды; None — выключено, используйте команду purge_auth_tokens по расписанию).
+AUTH_TOKEN_PURGE_INTERVAL = int(os.environ.get("AUTH_TOKEN_PURGE_INTERVAL", 0)) or None
+AUTH_TOKEN_PURGE_BATCH_SIZE = 1000
+
+# Пул для хэширования/проверки паролей (accounts/hashing.py).
+# "thread" | "process" | "inline"; при переполнении очереди — 503 + Retry-After.
+PASSWORD_HASHING_EXECUTOR = os.environ.get("PASSWORD_HASHING_EXECUTOR", "thread")
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", 4))
+PASSWORD_HASHING_MAX_QUEUE = 32
+PASSWORD_HASHING_RETRY_AFTER = 1  # секунды
+
+# Ограничение частоты (accounts/ratelimit.py): token bucket, "N/период" — ёмкость N,
+# пополнение N за период. Пустое ведро — 429 + Retry-After; логин отсекается до PBKDF2.
+# Адрес клиента — REMOTE_ADDR; за прокси — адрес из X-Forwarded-For, добавленный доверенным
+# прокси (REST_FRAMEWORK["NUM_PROXIES"], переменная окружения NUM_PROXIES).
+RATE_LIMITS = {
+    "login_ip": "30/min",
+    "login_email": "10/min",
+    "token": "600/min",
+    # POST /api/access/check/ — сервисный токен шлюза, отдельное ведро (AccessCheckThrottle)
+    "access_check": "6000/min",
+}
+# "local" — вёдра в памяти процесса; "cache" — дополнительно общие в CACHES[RATE_LIMIT_CACHE]
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "local")
+RATE_LIMIT_CACHE = "default"
+RATE_LIMIT_MAX_KEYS = 100_000
+
+# Метрики в формате Prometheus на /metrics и middleware задержек (em_auth/metrics.py)
+METRICS_ENABLED = True
+# Кто может читать /metrics: Bearer-токен сборщика и/или адреса (REMOTE_ADDR, без учёта
+# X-Forwarded-For). Без них /metrics отвечает 404. Адрес локального прокси в список не добавляйте —
+# через него /metrics станет доступен снаружи.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN") or None
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get("METRICS_ALLOWED_IPS", "").split(",") if ip.strip()]
+
+# Массовое создание пользователей (accounts/provisioning.py): размер пачки bulk_create.
+# Пароли API-импорта хэшируются в общем пуле (PASSWORD_HASHING_*), команда берёт свой.
+USER_PROVISIONING_BATCH_SIZE = 1000
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
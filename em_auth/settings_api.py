@@ -0,0 +1,46 @@
+"""
+Профиль настроек для API-подов (em_auth.wsgi_api / em_auth.asgi_api).
+
+Всё как в em_auth.settings, но без того, что нужно только админке и HTML:
+- приложения admin, sessions, messages, staticfiles не загружаются;
+- middleware — только то, что работает для JSON API с JWT: сессии, CSRF,
+  AuthenticationMiddleware, сообщения и X-Frame-Options не нужны
+  (JWTAuthentication не использует сессии, APIView и так csrf_exempt);
+- маршрутов /admin/ нет (em_auth.urls_api), шаблоны и BrowsableAPIRenderer не используются.
+
+Сравнение с полным профилем: python manage.py startup_report.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+API_EXCLUDED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+)
+API_EXCLUDED_MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_EXCLUDED_APPS]
+MIDDLEWARE = [name for name in MIDDLEWARE if name not in API_EXCLUDED_MIDDLEWARE]
+
+ROOT_URLCONF = 'em_auth.urls_api'
+WSGI_APPLICATION = 'em_auth.wsgi_api.application'
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": ["em_auth.renderers.FastJSONRenderer"],
+    "DEFAULT_PARSER_CLASSES": [
+        "em_auth.renderers.FastJSONParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
@@ -0,0 +1,100 @@
+# em_auth/startup.py
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Профиль -> (модуль настроек, WSGI-модуль)
+PROFILES = {
+    "full": ("em_auth.settings", "em_auth.wsgi"),
+    "api": ("em_auth.settings_api", "em_auth.wsgi_api"),
+}
+# DRF-view без БД: в замер попадают только middleware, маршрутизация и DRF
+PROBE_PATH = "/api/auth/jwks/"
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def probe(wsgi_module, rounds=20, launched_at=None) -> dict:
+    """
+    Замер в текущем процессе; вызывать до любого импорта Django.
+
+    - process_ms — от launched_at (time.time() при запуске процесса) до ответа на первый запрос;
+    - setup_ms — импорт WSGI-модуля: настройки, django.setup(), загрузка middleware;
+    - first_request_ms — первый запрос (URLconf и импорт views);
+    - request_us / bare_request_us — среднее время запроса с middleware профиля и без них;
+      разница — стоимость middleware на запрос.
+    """
+    started = time.perf_counter()
+    application = importlib.import_module(wsgi_module).application
+    setup_seconds = time.perf_counter() - started
+
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import override_settings
+
+    # Вспомогательные модули замера (django.test и т.п.) во время старта не входят
+    helpers_started = time.perf_counter()
+    from .loadtest import WSGIClient
+    from .microbench import bench
+    helpers_seconds = time.perf_counter() - helpers_started
+
+    client = WSGIClient(application)
+    started = time.perf_counter()
+    status, _ = client.request("GET", PROBE_PATH)
+    first_request_seconds = time.perf_counter() - started
+    ready_at = time.time()
+    modules = len(sys.modules)  # вместе со вспомогательными модулями замера
+
+    with_middleware = bench(lambda: client.request("GET", PROBE_PATH), rounds=rounds)
+    with override_settings(MIDDLEWARE=[]):
+        bare_client = WSGIClient(WSGIHandler())
+        bare = bench(lambda: bare_client.request("GET", PROBE_PATH), rounds=rounds)
+
+    return {
+        "status": status,
+        "process_ms": (ready_at - launched_at - helpers_seconds) * 1000 if launched_at else None,
+        "setup_ms": setup_seconds * 1000,
+        "first_request_ms": first_request_seconds * 1000,
+        "modules": modules,
+        "installed_apps": len(settings.INSTALLED_APPS),
+        "middleware": list(settings.MIDDLEWARE),
+        "request_us": with_middleware["mean_us"],
+        "bare_request_us": bare["mean_us"],
+        "middleware_us": with_middleware["mean_us"] - bare["mean_us"],
+    }
+
+
+def measure_profile(profile, runs=3, rounds=20) -> dict:
+    """
+    Холодный старт профиля: runs отдельных процессов Python, лучший результат
+    по времени от запуска интерпретатора до ответа на первый запрос.
+    """
+    settings_module, wsgi_module = PROFILES[profile]
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+    code = (
+        "import json, sys; from em_auth.startup import probe; "
+        "print(json.dumps(probe(sys.argv[1], int(sys.argv[2]), float(sys.argv[3]))))"
+    )
+
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", code, wsgi_module, str(rounds), repr(time.time())],
+            cwd=BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        if best is None or report["process_ms"] < best["process_ms"]:
+            best = report
+    return best
+
+
+def run_startup_report(runs=3, rounds=20) -> dict:
+    return {profile: measure_profile(profile, runs=runs, rounds=rounds) for profile in PROFILES}
@@ -2,11 +2,15 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
 
     path("api/", include("mock_business.urls")),
     path("api/auth/", include("accounts.urls")),
 path("api/access/", include("access_control.urls")),
+
+    path("metrics", metrics_view, name="metrics"),
 ]
 
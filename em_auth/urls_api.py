@@ -0,0 +1,13 @@
+# em_auth/urls_api.py
+from django.urls import include, path
+
+from .metrics import metrics_view
+
+# Те же маршруты, что в em_auth/urls.py, но без админки (профиль em_auth.settings_api)
+urlpatterns = [
+    path("api/", include("mock_business.urls")),
+    path("api/auth/", include("accounts.urls")),
+    path("api/access/", include("access_control.urls")),
+
+    path("metrics", metrics_view, name="metrics"),
+]
@@ -0,0 +1,12 @@
+"""
+WSGI-приложение для API-подов: профиль em_auth.settings_api
+(без админки, сессий и сообщений).
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'em_auth.settings_api')
+
+application = get_wsgi_application()
@@ -1,3 +1,28 @@
+# mock_business/models.py
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class Order(models.Model):
+    """
+    Заказ — бизнес-объект "orders". Владелец определяет область "свои" для
+    флагов read/update/delete_permission (см. access_control.filters).
+    """
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="orders",
+    )
+    title = models.CharField(max_length=200)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Заказ"
+        verbose_name_plural = "Заказы"
+        indexes = [
+            # «Свои заказы по порядку» — WHERE owner_id = ? ORDER BY id
+            models.Index(fields=["owner", "id"], name="order_owner_id_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
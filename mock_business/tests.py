@@ -1,5 +1,10 @@
 # mock_business/tests.py
+import json
+
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -10,11 +15,17 @@ from access_control.models import (
     Role,
     UserRole,
 )
-from mock_business.views import MOCK_ORDERS
+from access_control.matrix import permission_matrix
+from accounts.cache import token_cache
+from accounts.utils import create_jwt_for_user
+from mock_business.models import Order
+from mock_business.views import AsyncOrdersListView
 
 
 User = get_user_model()
 
+ORDERS_QUERY_BUDGET = 2
+
 
 class OrdersViewTests(APITestCase):
     """
@@ -47,8 +58,20 @@ class OrdersViewTests(APITestCase):
             name="Заказы",
         )
 
+        # Свои и чужие заказы
+        self.other = User.objects.create_user(
+            email="other_orders@example.com",
+            username="other_orders",
+            password="otherpass123",
+        )
+        self.own_orders = [
+            Order.objects.create(owner=self.user, title="Свой заказ 1"),
+            Order.objects.create(owner=self.user, title="Свой заказ 2"),
+        ]
+        self.other_order = Order.objects.create(owner=self.other, title="Чужой заказ")
+
         # Правило: пользователь может читать ТОЛЬКО свои заказы
-        AccessRoleRule.objects.create(
+        self.rule = AccessRoleRule.objects.create(
             role=self.role_user,
             element=self.orders_element,
             read_permission=True,
@@ -93,3 +116,137 @@ class OrdersViewTests(APITestCase):
         При read_permission=True и read_all_permission=False
         пользователь видит только свои заказы
         """
+        token = self.get_token("user_orders@example.com", "userpass123")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        response = self.client.get(self.orders_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [o["id"] for o in response.data],
+            [o.id for o in self.own_orders],
+        )
+
+    def test_orders_query_budget(self):
+        """
+        GET /api/orders/ укладывается в ORDERS_QUERY_BUDGET запросов при пустом
+        кэше токенов, сколько бы заказов ни было: AuthToken + сами заказы.
+        """
+        Order.objects.bulk_create([Order(owner=self.user, title=f"Заказ {i}") for i in range(50)])
+        token = self.get_token("user_orders@example.com", "userpass123")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        permission_matrix.build()
+        token_cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.orders_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 52)
+        self.assertLessEqual(
+            len(queries),
+            ORDERS_QUERY_BUDGET,
+            msg="\n".join(q["sql"] for q in queries.captured_queries),
+        )
+
+    def test_bulk_update_touches_only_own_orders(self):
+        """
+        С update_permission (без update_all) массовый PATCH — один UPDATE
+        только по своим заказам; чужой id из списка пропускается.
+        """
+        self.rule.update_permission = True
+        self.rule.save()
+        token = self.get_token("user_orders@example.com", "userpass123")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        ids = [self.own_orders[0].id, self.other_order.id]
+
+        response = self.client.patch(self.orders_url, {"ids": ids, "title": "Новое"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"updated": 1})
+        self.other_order.refresh_from_db()
+        self.assertEqual(self.other_order.title, "Чужой заказ")
+
+    def test_bulk_delete_with_delete_all_permission(self):
+        """
+        С delete_all_permission массовый DELETE удаляет и чужие заказы.
+        """
+        self.rule.delete_all_permission = True
+        self.rule.save()
+        token = self.get_token("user_orders@example.com", "userpass123")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        ids = [self.own_orders[0].id, self.other_order.id]
+
+        response = self.client.delete(self.orders_url, {"ids": ids}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"deleted": 2})
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class AsyncOrdersViewTests(TestCase):
+    """
+    Async-версия /api/orders/ фильтрует заказы так же, как DRF-версия.
+    """
+
+    def setUp(self):
+        role = Role.objects.create(name="user")
+        self.user = User.objects.create_user(
+            email="async_orders@example.com",
+            username="async_orders",
+            password="userpass123",
+        )
+        UserRole.objects.create(user=self.user, role=role)
+        self.element = BusinessElement.objects.create(code="orders", name="Заказы")
+        other = User.objects.create_user(email="async_other@example.com", username="async_other", password="x")
+        Order.objects.create(owner=self.user, title="Свой")
+        Order.objects.create(owner=other, title="Чужой")
+        token, _ = create_jwt_for_user(self.user)
+        self.auth = {"headers": {"Authorization": f"Bearer {token}"}}
+        self.factory = AsyncRequestFactory()
+
+    async def test_forbidden_without_rule(self):
+        request = self.factory.get("/api/orders/", **self.auth)
+        response = await AsyncOrdersListView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_returns_only_own_orders(self):
+        await AccessRoleRule.objects.acreate(
+            role_id=(await UserRole.objects.aget(user=self.user)).role_id,
+            element=self.element,
+            read_permission=True,
+        )
+        request = self.factory.get("/api/orders/", **self.auth)
+        response = await AsyncOrdersListView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        owners = {o["owner_id"] for o in json.loads(response.content)}
+        self.assertEqual(owners, {self.user.id})
+
+    async def test_bulk_patch_and_delete(self):
+        role_id = (await UserRole.objects.aget(user=self.user)).role_id
+        await AccessRoleRule.objects.acreate(
+            role_id=role_id,
+            element=self.element,
+            update_permission=True,
+            delete_permission=True,
+        )
+        ids = [order_id async for order_id in Order.objects.values_list("id", flat=True)]
+        view = AsyncOrdersListView.as_view()
+
+        def request(method, data):
+            return getattr(self.factory, method)(
+                "/api/orders/", data=json.dumps(data), content_type="application/json", **self.auth
+            )
+
+        response = await view(request("patch", {"ids": ids, "title": "Новое"}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), {"updated": 1})
+
+        response = await view(request("delete", {"ids": []}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await view(request("delete", {"ids": ids}))
+        self.assertEqual(json.loads(response.content), {"deleted": 1})
+        self.assertEqual(await Order.objects.filter(title="Чужой").acount(), 1)
@@ -1,8 +1,14 @@
 # mock_business/urls.py
+from django.conf import settings
 from django.urls import path
 
-from .views import OrdersListView
+from .views import AsyncOrdersListView, OrdersListView
+
+if getattr(settings, "API_ASYNC_VIEWS", False):
+    orders_view = AsyncOrdersListView.as_view()
+else:
+    orders_view = OrdersListView.as_view()
 
 urlpatterns = [
-    path("orders/", OrdersListView.as_view(), name="orders-list"),
+    path("orders/", orders_view, name="orders-list"),
 ]
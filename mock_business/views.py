@@ -1,38 +1,141 @@
 # mock_business/views.py
-from rest_framework.response import Response
-from rest_framework.views import APIView
+import json
+
+from rest_framework import serializers, status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from access_control.filters import METHOD_ACTIONS, AccessScopeFilterBackend, scope_queryset
 from access_control.permissions import AccessRequiredPermission
-from access_control.utils import get_rule_for
+from access_control.utils import aget_request_rule
+from accounts.views import AsyncJWTView
+from em_auth.metrics import access_decisions
+
+from .models import Order
+
+ORDER_FIELDS = ("id", "owner_id", "title")
+
+
+class OrderBulkUpdateSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    title = serializers.CharField(max_length=200)
+
 
-MOCK_ORDERS = [
-    {"id": 1, "owner_id": 1, "title": "Заказ 1 пользователя 1"},
-    {"id": 2, "owner_id": 2, "title": "Заказ 2 пользователя 2"},
-    {"id": 3, "owner_id": 1, "title": "Заказ 3 пользователя 1"},
-]
+class OrderBulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
 
 
-class OrdersListView(APIView):
+class OrdersListView(GenericAPIView):
     """
     Бизнес-объект "orders".
 
+    GET /api/orders/      — список заказов
+    PATCH /api/orders/    — массовое обновление {"ids": [...], "title": "..."}
+    DELETE /api/orders/   — массовое удаление {"ids": [...]}
+
     Доступ:
       - 401, если не аутентифицирован (обрабатывает DRF + JWTAuthentication)
-      - 403, если прав на чтение нет (AccessRequiredPermission)
-      - если есть read_all_permission — видит все заказы
-      - если только read_permission — видит только свои
+      - 403, если прав на действие нет (AccessRequiredPermission)
+      - с *_all_permission — действие над всеми заказами
+      - только с *_permission — над своими (owner = пользователь)
+
+    Область «свои/все» превращается в WHERE (AccessScopeFilterBackend),
+    так что массовые PATCH/DELETE — один UPDATE/DELETE без проверки по объектам.
+    Заказы из ids, не попавшие в область, молча пропускаются — в ответе
+    число реально затронутых строк.
     """
     permission_classes = [IsAuthenticated, AccessRequiredPermission]
+    filter_backends = [AccessScopeFilterBackend]
+    queryset = Order.objects.order_by("id")
     element_code = "orders"
 
     def get(self, request):
-        rule = get_rule_for(request.user, self.element_code)
+        data = list(self.filter_queryset(self.get_queryset()).values(*ORDER_FIELDS))
+        return Response(data)
 
-        if rule and rule.read_all_permission:
-            data = MOCK_ORDERS
-        else:
-            user_id = request.user.id
-            data = [o for o in MOCK_ORDERS if o["owner_id"] == user_id]
+    def patch(self, request):
+        serializer = OrderBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        return Response(data)
+        updated = self.filter_queryset(self.get_queryset()).filter(
+            id__in=serializer.validated_data["ids"],
+        ).update(title=serializer.validated_data["title"])
+
+        return Response({"updated": updated})
+
+    def delete(self, request):
+        serializer = OrderBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        deleted, _ = self.filter_queryset(self.get_queryset()).filter(
+            id__in=serializer.validated_data["ids"],
+        ).delete()
+
+        return Response({"deleted": deleted})
+
+
+class AsyncOrdersListView(AsyncJWTView):
+    """
+    Async-версия /api/orders/ для ASGI (GET, массовые PATCH и DELETE): правило
+    из матрицы, те же 401/403/400 и та же фильтрация в БД, что у DRF-версии.
+    """
+    element_code = "orders"
+
+    async def get(self, request):
+        queryset = await self.scoped_queryset(request)
+        if queryset is None:
+            return self.forbidden()
+
+        data = [order async for order in queryset.values(*ORDER_FIELDS)]
+        return self.json_response(data)
+
+    async def patch(self, request):
+        queryset = await self.scoped_queryset(request)
+        if queryset is None:
+            return self.forbidden()
+
+        serializer = self.bulk_serializer(request, OrderBulkUpdateSerializer)
+        if not serializer.is_valid():
+            return self.json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        updated = await queryset.filter(id__in=serializer.validated_data["ids"]).aupdate(
+            title=serializer.validated_data["title"],
+        )
+        return self.json_response({"updated": updated})
+
+    async def delete(self, request):
+        queryset = await self.scoped_queryset(request)
+        if queryset is None:
+            return self.forbidden()
+
+        serializer = self.bulk_serializer(request, OrderBulkDeleteSerializer)
+        if not serializer.is_valid():
+            return self.json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        deleted, _ = await queryset.filter(id__in=serializer.validated_data["ids"]).adelete()
+        return self.json_response({"deleted": deleted})
+
+    async def scoped_queryset(self, request):
+        """
+        Заказы, доступные по правилу для действия HTTP-метода; None — прав нет (403).
+        """
+        rule = await aget_request_rule(request, self.element_code)
+        allowed = AccessRequiredPermission.is_allowed(rule, request.method)
+        access_decisions.inc(self.element_code, "allow" if allowed else "deny")
+        if not allowed:
+            return None
+        return scope_queryset(Order.objects.order_by("id"), request.user, rule, METHOD_ACTIONS[request.method])
+
+    def bulk_serializer(self, request, serializer_class):
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            data = None
+        return serializer_class(data=data)
 
+    def forbidden(self):
+        return self.json_response(
+            {"detail": PermissionDenied.default_detail},
+            status=status.HTTP_403_FORBIDDEN,
+        )